@@ -0,0 +1,118 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from backend_client import DEFAULT_TIMEOUT, ENDPOINT_TIMEOUTS, IDEMPOTENT_METHODS, BackendClient
+from instrumentation import debug, metrics
+
+load_dotenv()
+
+RETRYABLE_STATUS = frozenset({502, 503, 504})
+
+
+class AsyncBackendClient:
+    """Cliente HTTP no bloqueante con pool keep-alive para las herramientas async"""
+
+    def __init__(self, base_url: Optional[str] = None,
+                 pool_size: Optional[int] = None,
+                 max_retries: Optional[int] = None,
+                 backoff_factor: Optional[float] = None):
+        self.base_url = (base_url or os.getenv('BACKEND_URL', 'http://localhost:3000')).rstrip('/')
+        # En modo async muchas sesiones comparten el loop, por eso el pool es más grande
+        self.pool_size = pool_size or int(os.getenv('BACKEND_ASYNC_POOL_SIZE', '100'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('BACKEND_MAX_RETRIES', '2'))
+        self.backoff_factor = backoff_factor if backoff_factor is not None else float(os.getenv('BACKEND_RETRY_BACKOFF', '0.2'))
+
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'User-Agent': 'Shopping-Agent/1.0'},
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+            ),
+        )
+
+    @staticmethod
+    def _timeout(endpoint: Optional[str]) -> httpx.Timeout:
+        connect, read = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+        return httpx.Timeout(read, connect=connect)
+
+    async def request(self, method: str, path: str, endpoint: Optional[str] = None,
+                      **kwargs) -> httpx.Response:
+        """Ejecuta una petición; reintenta con backoff solo los métodos idempotentes"""
+        kwargs.setdefault('timeout', self._timeout(endpoint))
+        retries = self.max_retries if method.upper() in IDEMPOTENT_METHODS else 0
+        if metrics.enabled:
+            return await self._timed_request(method, path, endpoint, retries, **kwargs)
+        return await self._request(method, path, retries, **kwargs)
+
+    async def _timed_request(self, method: str, path: str, endpoint: Optional[str],
+                             retries: int, **kwargs) -> httpx.Response:
+        # httpcore resuelve el DNS dentro de connect_tcp: en async DNS y connect van juntos
+        phases = {}
+
+        async def trace(event: str, info: dict):
+            if event.startswith("connection.") and event.endswith(".started"):
+                phases[event[:-len(".started")]] = time.perf_counter()
+            elif event.startswith("connection.") and event.endswith(".complete"):
+                name = event[:-len(".complete")]
+                phases[name] = time.perf_counter() - phases.get(name, time.perf_counter())
+
+        kwargs.setdefault('extensions', {})['trace'] = trace
+        start = time.perf_counter()
+        response = await self._request(method, path, retries, **kwargs)
+        total = time.perf_counter() - start
+        connect = phases.get("connection.connect_tcp", 0.0) + phases.get("connection.start_tls", 0.0)
+        BackendClient._record_timing(endpoint or path, response.status_code, total, None, connect)
+        debug("backend.request", method=method, url=response.url, status=response.status_code,
+              ms=round(total * 1000, 1))
+        return response
+
+    async def _request(self, method: str, path: str, retries: int, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, path, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS or attempt >= retries:
+                    return response
+                await response.aclose()
+            except (httpx.ConnectError, httpx.ReadTimeout, httpx.RemoteProtocolError):
+                if attempt >= retries:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+            attempt += 1
+
+    async def get(self, path: str, endpoint: Optional[str] = None, **kwargs) -> httpx.Response:
+        return await self.request('GET', path, endpoint=endpoint, **kwargs)
+
+    async def post(self, path: str, endpoint: Optional[str] = None, **kwargs) -> httpx.Response:
+        return await self.request('POST', path, endpoint=endpoint, **kwargs)
+
+    async def patch(self, path: str, endpoint: Optional[str] = None, **kwargs) -> httpx.Response:
+        return await self.request('PATCH', path, endpoint=endpoint, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_clients: dict = {}
+
+
+def get_async_backend_client() -> AsyncBackendClient:
+    """
+    Retorna el cliente async del event loop actual.
+    httpx.AsyncClient queda ligado al loop donde abrió sus conexiones,
+    así que se mantiene uno por loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # Descartar clientes de loops que ya se cerraron
+        for stale in [l for l in _clients if l.is_closed()]:
+            del _clients[stale]
+        client = _clients[loop] = AsyncBackendClient()
+    return client
@@ -0,0 +1,369 @@
+from datetime import datetime
+from typing import List
+
+import httpx
+from langchain_core.tools import tool, ToolException
+
+from async_backend_client import get_async_backend_client
+from cart_batching import AsyncCartCoalescer
+from cart_mirror import cart_mirror
+from prefetch import AsyncProductPrefetcher, current_session
+from formatters import format_search_results, format_product_details, format_cart_details, format_ranked_products
+from normalization import anormalize_search_params
+from product_index import aget_product_index
+from ranking import aget_ranking_index
+from response_cache import search_cache, product_cache, next_page_cursor, remember_next_cursor
+from schemas import BulkCartUpdateParams, CartOperation, ProductSearchParams
+
+# Versiones no bloqueantes de las herramientas de shopping_agent.py.
+# Mismos nombres y schemas, para que el LLM vea exactamente las mismas herramientas.
+
+
+async def _fetch_product(product_id: str) -> dict:
+    response = await get_async_backend_client().get(f"/products/{product_id}", endpoint="products.detail")
+    response.raise_for_status()
+    return response.json()
+
+
+product_prefetcher = AsyncProductPrefetcher(_fetch_product, lambda product_id: product_id in product_cache)
+
+
+@tool(args_schema=ProductSearchParams)
+async def search_products(category: str = None, name: str = None, color: str = None,
+                          size: str = None, min_price: float = None,
+                          max_price: float = None, page: int = 1) -> str:
+    """
+    Busca productos en el backend con filtros avanzados.
+    Soporta paginación y múltiples filtros simultáneos.
+    Cada producto trae su mejor variante disponible (con stock, del color y talla
+    pedidos) con su ID, que sirve directo para add_item_to_cart.
+    """
+    backend = get_async_backend_client()
+
+    try:
+        search_params = await anormalize_search_params(ProductSearchParams(
+            category=category, name=name, color=color, size=size,
+            min_price=min_price, max_price=max_price, page=page
+        ))
+        # Con LOCAL_PRODUCT_INDEX activo la búsqueda se resuelve en memoria
+        index = await aget_product_index()
+        cache_key = search_params.cache_key()
+        if index is not None:
+            data = index.search(search_params)
+        else:
+            data = search_cache.get(cache_key)
+
+        if data is None:
+            response = await backend.get(
+                "/products/search",
+                endpoint="products.search",
+                # "siguiente página" de una búsqueda ya vista va por keyset con el cursor
+                params=search_params.to_query_params(next_page_cursor(search_params))
+            )
+            response.raise_for_status()
+
+            data = response.json()
+            search_cache.set(cache_key, data, size=len(response.content))
+            remember_next_cursor(search_params, data)
+
+        # PRODUCT_PREFETCH: el detalle de los primeros resultados se pide en segundo plano
+        product_prefetcher.schedule(current_session(), data)
+        return format_search_results(data, **search_params.variant_filters())
+
+    except httpx.TimeoutException:
+        raise ToolException("La búsqueda tardó demasiado. Intenta de nuevo.")
+    except httpx.ConnectError:
+        raise ToolException("No se pudo conectar al servidor. Verifica tu conexión.")
+    except httpx.HTTPStatusError as e:
+        raise ToolException(f"Error del servidor: {e.response.status_code}")
+    except Exception as e:
+        raise ToolException(f"Error inesperado en la búsqueda: {str(e)}")
+
+
+@tool
+async def rank_products(query: str, limit: int = 5) -> str:
+    """
+    Busca productos por una descripción en texto libre ("algo cómodo para correr",
+    "ropa para una fiesta") cuando el usuario no da nombre, categoría, color ni talla.
+    Retorna los productos más relevantes con nombre y categoría para usar en search_products.
+
+    Args:
+        query: lo que pidió el usuario, con sus palabras
+        limit: cantidad máxima de productos a retornar
+    """
+    try:
+        # Ranking BM25 local (ranking.py): no consulta al backend
+        index = await aget_ranking_index()
+        hits = index.search(query, limit=limit)
+    except Exception as e:
+        raise ToolException(f"Error inesperado en la búsqueda por relevancia: {str(e)}")
+    return format_ranked_products(query, hits)
+
+
+@tool
+async def get_product_details(product_id: str) -> str:
+    """
+    Obtiene detalles completos de un producto específico.
+    Incluye descripción, especificaciones, disponibilidad y reseñas.
+    Para comparar varios productos pide todos en el mismo turno: se consultan en paralelo.
+    """
+    backend = get_async_backend_client()
+
+    try:
+        product = await product_prefetcher.lookup(current_session(), product_id) or product_cache.get(str(product_id))
+        if product is None:
+            response = await backend.get(
+                f"/products/{product_id}",
+                endpoint="products.detail"
+            )
+            response.raise_for_status()
+
+            product = response.json()
+            product_cache.set(str(product_id), product, size=len(response.content))
+
+        return format_product_details(product)
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise ToolException(f"No se encontró el producto con ID {product_id}")
+        else:
+            raise ToolException(f"Error obteniendo producto: {e.response.status_code}")
+    except Exception as e:
+        raise ToolException(f"Error inesperado obteniendo producto: {str(e)}")
+
+
+@tool
+async def create_cart() -> str:
+    """
+    Crea un nuevo carrito de compras para el usuario.
+    Retorna el ID del carrito creado.
+    """
+    backend = get_async_backend_client()
+
+    try:
+        response = await backend.post(
+            "/carts",
+            endpoint="carts.create",
+            json={'created_at': datetime.now().isoformat()}
+        )
+        response.raise_for_status()
+
+        cart_id = response.json().get('id')
+
+        return f"🛒 ¡Carrito creado exitosamente! ID: {cart_id}\nYa puedes empezar a agregar productos."
+
+    except httpx.HTTPStatusError as e:
+        raise ToolException(f"Error creando carrito: {e.response.status_code}")
+    except Exception as e:
+        raise ToolException(f"Error inesperado creando carrito: {str(e)}")
+
+
+async def _send_cart_operation(cart_id: str, operation: dict) -> None:
+    """Envía una operación de carrito a su endpoint individual"""
+    backend = get_async_backend_client()
+    if operation['op'] == 'add':
+        response = await backend.post(
+            f"/carts/{cart_id}/items",
+            endpoint="carts.add_item",
+            json={
+                'product_variant_id': operation['product_variant_id'],
+                'qty': operation['qty']
+            }
+        )
+    else:
+        response = await backend.patch(
+            f"/carts/{cart_id}/items/{operation['item_id']}",
+            endpoint="carts.update_item",
+            json={'qty': operation['qty']}
+        )
+    response.raise_for_status()
+    # POST y PATCH devuelven el carrito completo: su ETag cubre también precios y stock
+    cart_mirror.store(cart_id, response.json(), response.headers.get('ETag'))
+
+
+async def _send_cart_bulk(cart_id: str, operations: List[dict]) -> dict:
+    """Aplica varias operaciones en una sola transacción y retorna el carrito actualizado"""
+    response = await get_async_backend_client().post(
+        f"/carts/{cart_id}/items/bulk",
+        endpoint="carts.bulk",
+        json={'operations': operations}
+    )
+    response.raise_for_status()
+    cart = response.json()
+    cart_mirror.store(cart_id, cart, response.headers.get('ETag'))
+    return cart
+
+
+cart_coalescer = AsyncCartCoalescer(_send_cart_bulk, _send_cart_operation)
+
+
+@tool
+async def add_item_to_cart(cart_id: str, product_variant_id: int, qty: int = 1) -> str:
+    """
+    Agrega un item específico al carrito usando el ID de la variante del producto.
+    Para agregar varias variantes haz todas las llamadas en el mismo turno: se ejecutan en paralelo.
+
+    Args:
+        cart_id: ID del carrito
+        product_variant_id: ID de la variante del producto a agregar
+        qty: Cantidad del producto (por defecto 1)
+    """
+    if not cart_id:
+        raise ToolException("Necesitas proporcionar un cart_id válido.")
+
+    try:
+        await cart_coalescer.submit(str(cart_id), {
+            'op': 'add',
+            'product_variant_id': product_variant_id,
+            'qty': qty
+        })
+
+        return f"✅ Item agregado al carrito ID {cart_id}: Variante {product_variant_id} (cantidad: {qty})"
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise ToolException("Carrito o variante de producto no encontrada")
+        else:
+            raise ToolException(f"Error agregando item al carrito: {e.response.status_code}")
+    except Exception as e:
+        raise ToolException(f"Error inesperado agregando item: {str(e)}")
+
+
+@tool
+async def update_cart_item(cart_id: str, item_id: int, qty: int) -> str:
+    """
+    Actualiza la cantidad de un item específico en el carrito.
+
+    Args:
+        cart_id: ID del carrito
+        item_id: ID del item en el carrito(es el id del cart-item, no del product-variant)
+        qty: Nueva cantidad del item
+    """
+    if not cart_id:
+        raise ToolException("Necesitas proporcionar un cart_id válido.")
+
+    try:
+        await cart_coalescer.submit(str(cart_id), {'op': 'update', 'item_id': item_id, 'qty': qty})
+
+        return f"✅ Item actualizado en carrito ID {cart_id}: Item {item_id} ahora tiene cantidad {qty}"
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise ToolException("Carrito o item no encontrado")
+        else:
+            raise ToolException(f"Error actualizando item: {e.response.status_code}")
+    except Exception as e:
+        raise ToolException(f"Error inesperado actualizando item: {str(e)}")
+
+
+@tool(args_schema=BulkCartUpdateParams)
+async def bulk_update_cart(cart_id: str, operations: List[CartOperation]) -> str:
+    """
+    Aplica varias operaciones al carrito en una sola llamada y una sola transacción:
+    agregar variantes (add), cambiar cantidades (update) y quitar items (remove).
+    Úsala en lugar de varias llamadas a add_item_to_cart / update_cart_item.
+    Si una operación falla no se aplica ninguna. Retorna el carrito actualizado.
+    """
+    if not cart_id:
+        raise ToolException("Necesitas proporcionar un cart_id válido.")
+
+    try:
+        payload = [CartOperation.model_validate(op).to_payload() for op in operations]
+        cart = await _send_cart_bulk(str(cart_id), payload)
+
+        return f"✅ {len(payload)} operaciones aplicadas al carrito ID {cart_id}\n" + format_cart_details(str(cart_id), cart)
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise ToolException("Carrito, item o variante no encontrada. No se aplicó ningún cambio.")
+        elif e.response.status_code == 400:
+            raise ToolException(f"Operaciones inválidas: {e.response.text}")
+        else:
+            raise ToolException(f"Error actualizando carrito: {e.response.status_code}")
+    except Exception as e:
+        raise ToolException(f"Error inesperado actualizando carrito: {str(e)}")
+
+
+@tool
+async def update_cart_metadata(cart_id: str, cart_data: dict) -> str:
+    """
+    Actualiza los metadatos del carrito (no los items).
+
+    Args:
+        cart_id: ID del carrito
+        cart_data: Datos del carrito a actualizar (ej: metadatos, fechas, etc.)
+    """
+    backend = get_async_backend_client()
+
+    if not cart_id:
+        raise ToolException("Necesitas proporcionar un cart_id válido.")
+
+    try:
+        response = await backend.patch(
+            f"/carts/{cart_id}",
+            endpoint="carts.update",
+            json=cart_data
+        )
+        response.raise_for_status()
+
+        return f"✅ Carrito ID {cart_id} actualizado correctamente"
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise ToolException("Carrito no encontrado")
+        else:
+            raise ToolException(f"Error actualizando carrito: {e.response.status_code}")
+    except Exception as e:
+        raise ToolException(f"Error inesperado actualizando carrito: {str(e)}")
+
+
+@tool
+async def get_cart_details(cart_id: str) -> str:
+    """
+    Obtiene el estado completo y detallado del carrito de compras.
+    Incluye todos los items, cantidades, precios y totales.
+
+    Args:
+        cart_id: ID del carrito a consultar
+    """
+    backend = get_async_backend_client()
+
+    if not cart_id:
+        raise ToolException("Necesitas proporcionar un cart_id válido.")
+
+    try:
+        # GET condicional: con 304 se responde desde la copia local del carrito
+        response = await backend.get(
+            f"/carts/{cart_id}",
+            endpoint="carts.detail",
+            headers=cart_mirror.request_headers(cart_id)
+        )
+        if response.status_code == 304:
+            cached = cart_mirror.cached_details(cart_id)
+            if cached is not None:
+                return cached
+            response = await backend.get(f"/carts/{cart_id}", endpoint="carts.detail")
+        response.raise_for_status()
+
+        return cart_mirror.refresh(cart_id, response)
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise ToolException("Carrito no encontrado")
+        else:
+            raise ToolException(f"Error obteniendo carrito: {e.response.status_code}")
+    except Exception as e:
+        raise ToolException(f"Error inesperado obteniendo carrito: {str(e)}")
+
+
+ASYNC_TOOLS = [
+    search_products,
+    rank_products,
+    get_product_details,
+    create_cart,
+    add_item_to_cart,
+    update_cart_item,
+    bulk_update_cart,
+    update_cart_metadata,
+    get_cart_details
+]
@@ -0,0 +1,193 @@
+import os
+import socket
+import threading
+import time
+from typing import Optional, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+from instrumentation import connection_timing, debug, metrics
+
+load_dotenv()
+
+# Timeouts por endpoint: (connect, read) en segundos
+DEFAULT_TIMEOUT = (3.05, 10)
+ENDPOINT_TIMEOUTS: Dict[str, tuple] = {
+    "products.search": (3.05, 10),
+    "products.detail": (3.05, 5),
+    "carts.create": (3.05, 5),
+    "carts.add_item": (3.05, 5),
+    "carts.update_item": (3.05, 5),
+    "carts.bulk": (3.05, 10),
+    "carts.update": (3.05, 5),
+    "carts.detail": (3.05, 5),
+}
+
+# Solo se reintentan métodos idempotentes; un POST repetido duplicaría carritos o items
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class _TimedConnectionMixin:
+    """Separa la resolución DNS del connect TCP al abrir una conexión nueva"""
+
+    def _new_conn(self):
+        if not metrics.enabled:
+            return super()._new_conn()
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            address = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        except socket.gaierror:
+            # Que urllib3 genere su NameResolutionError de siempre
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        self._dns_host = address
+        try:
+            sock = super()._new_conn()
+        except OSError:
+            # Solo se fijó la primera dirección: ante un fallo se deja a urllib3 probar todas
+            self._dns_host = host
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        connection_timing.dns = resolved - start
+        connection_timing.connect = time.perf_counter() - resolved
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class BackendClient:
+    """Cliente HTTP compartido con pool de conexiones keep-alive hacia el backend"""
+
+    def __init__(self, base_url: Optional[str] = None,
+                 pool_size: Optional[int] = None,
+                 max_retries: Optional[int] = None,
+                 backoff_factor: Optional[float] = None):
+        self.base_url = (base_url or os.getenv('BACKEND_URL', 'http://localhost:3000')).rstrip('/')
+        self.pool_size = pool_size or int(os.getenv('BACKEND_POOL_SIZE', '10'))
+        if max_retries is None:
+            max_retries = int(os.getenv('BACKEND_MAX_RETRIES', '2'))
+        if backoff_factor is None:
+            backoff_factor = float(os.getenv('BACKEND_RETRY_BACKOFF', '0.2'))
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False,
+        )
+        self._adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        self._adapter.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Shopping-Agent/1.0'})
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+
+    def request(self, method: str, path: str, endpoint: Optional[str] = None,
+                **kwargs) -> requests.Response:
+        """Ejecuta una petición reutilizando conexiones del pool"""
+        kwargs.setdefault('timeout', ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT))
+        if not metrics.enabled:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            debug("backend.request", method=method, url=response.url, status=response.status_code)
+            return response
+
+        connection_timing.dns = connection_timing.connect = 0.0
+        start = time.perf_counter()
+        response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        total = time.perf_counter() - start
+        self._record_timing(endpoint or path, response.status_code, total,
+                            connection_timing.dns, connection_timing.connect)
+        debug("backend.request", method=method, url=response.url, status=response.status_code,
+              ms=round(total * 1000, 1))
+        return response
+
+    @staticmethod
+    def _record_timing(endpoint: str, status: int, total: float, dns: Optional[float], connect: float):
+        # dns/connect solo existen si la petición abrió una conexión nueva
+        if connect:
+            if dns is not None:
+                metrics.observe("backend_dns_seconds", dns, endpoint=endpoint)
+            metrics.observe("backend_connect_seconds", connect, endpoint=endpoint)
+        # transfer: envío de la petición hasta el último byte de la respuesta
+        metrics.observe("backend_transfer_seconds", total - (dns or 0.0) - connect, endpoint=endpoint)
+        metrics.observe("backend_request_seconds", total, endpoint=endpoint)
+        metrics.inc("backend_requests_total", endpoint=endpoint, status=status)
+
+    def get(self, path: str, endpoint: Optional[str] = None, **kwargs) -> requests.Response:
+        return self.request('GET', path, endpoint=endpoint, **kwargs)
+
+    def post(self, path: str, endpoint: Optional[str] = None, **kwargs) -> requests.Response:
+        return self.request('POST', path, endpoint=endpoint, **kwargs)
+
+    def patch(self, path: str, endpoint: Optional[str] = None, **kwargs) -> requests.Response:
+        return self.request('PATCH', path, endpoint=endpoint, **kwargs)
+
+    def pool_stats(self) -> dict:
+        """
+        Contadores del pool: una petición que no abrió una conexión nueva
+        reutilizó una existente (hit); cada conexión nueva cuenta como miss.
+        """
+        requests_count = 0
+        connections = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_count += pool.num_requests
+            connections += pool.num_connections
+        return {
+            "requests": requests_count,
+            "hits": requests_count - connections,
+            "misses": connections,
+            "pool_size": self.pool_size,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_client: Optional[BackendClient] = None
+_client_lock = threading.Lock()
+
+
+def get_backend_client() -> BackendClient:
+    """Retorna el cliente compartido por todas las herramientas del agente"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = BackendClient()
+    return _client
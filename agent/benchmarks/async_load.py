@@ -0,0 +1,94 @@
+"""
+Benchmark de carga del runtime async: N sesiones simuladas comparten un
+event loop contra el backend falso, con un LLM guionado.
+
+    cd agent && python -m benchmarks.async_load --sessions 200 --llm-latency-ms 300 --backend-latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(label: str, latencies: List[float], elapsed: float, turns: int):
+    print(f"\n{label}")
+    print(f"  turnos:       {turns}")
+    print(f"  tiempo total: {elapsed:.2f} s")
+    print(f"  throughput:   {turns / elapsed:.1f} turnos/s")
+    print(f"  p50:          {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"  p99:          {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"  media:        {statistics.fmean(latencies) * 1000:.1f} ms")
+
+
+async def run_session(agent, session_id: str, messages: List[str], latencies: List[float]):
+    for message in messages:
+        start = time.perf_counter()
+        await agent.achat(message, session_id=session_id)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_async(agent, sessions: int, messages: List[str]):
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(agent, f"bench_session_{i}", messages, latencies)
+        for i in range(sessions)
+    ))
+    return latencies, time.perf_counter() - start
+
+
+def run_sync(agent, sessions: int, messages: List[str]):
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for i in range(sessions):
+        for message in messages:
+            turn_start = time.perf_counter()
+            agent.chat(message, session_id=f"bench_sync_session_{i}")
+            latencies.append(time.perf_counter() - turn_start)
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de sesiones concurrentes del agente async')
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--llm-latency-ms', type=float, default=200.0)
+    parser.add_argument('--backend-latency-ms', type=float, default=10.0)
+    parser.add_argument('--compare-sync', action='store_true',
+                        help='Corre también las sesiones en serie con chat() como referencia')
+    args = parser.parse_args()
+
+    from benchmarks.stub_backend import start_stub_backend
+
+    server, url = start_stub_backend(latency_ms=args.backend_latency_ms)
+    # Los clientes HTTP leen BACKEND_URL al crearse
+    os.environ['BACKEND_URL'] = url
+
+    from benchmarks.fake_llm import ScriptedChatModel, SHOPPING_SCRIPT, SHOPPING_MESSAGES
+    from shopping_agent import ShoppingAgent
+
+    llm = ScriptedChatModel(script=SHOPPING_SCRIPT, latency=args.llm_latency_ms / 1000.0)
+
+    agent = ShoppingAgent(llm=llm, async_mode=True)
+    latencies, elapsed = asyncio.run(run_async(agent, args.sessions, SHOPPING_MESSAGES))
+    report(f"async: {args.sessions} sesiones concurrentes", latencies, elapsed, len(latencies))
+
+    if args.compare_sync:
+        sync_agent = ShoppingAgent(llm=llm)
+        latencies, elapsed = run_sync(sync_agent, args.sessions, SHOPPING_MESSAGES)
+        report(f"sync: {args.sessions} sesiones en serie", latencies, elapsed, len(latencies))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
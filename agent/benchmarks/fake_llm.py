@@ -0,0 +1,133 @@
+"""
+Chat model falso y determinista para correr el agente sin Gemini.
+
+Cada turno del guion es la lista de tool calls que el "LLM" emite, un paso
+ReAct por elemento (o varias tool calls en paralelo si el elemento es una lista);
+al agotarse responde con texto final. Los argumentos
+pueden usar "{cart_id}", que se resuelve con el último carrito creado en el
+historial.
+"""
+import asyncio
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+CART_ID_PATTERN = re.compile(r"Carrito creado exitosamente! ID: (\d+)")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Reproduce un guion de tool calls por turno con latencia simulada"""
+
+    script: List[list] = []
+    latency: float = 0.0
+    # Pausa entre tokens del texto final cuando se consume en streaming
+    token_latency: float = 0.0
+    final_text: str = "Listo, ¿algo más?"
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        # El guion ya decide qué herramientas llamar
+        return self
+
+    @staticmethod
+    def _resolve(value: Any, messages: List[BaseMessage]) -> Any:
+        if isinstance(value, str) and "{cart_id}" in value:
+            for message in reversed(messages):
+                if isinstance(message, ToolMessage):
+                    match = CART_ID_PATTERN.search(str(message.content))
+                    if match:
+                        return value.replace("{cart_id}", match.group(1))
+        return value
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        human_indexes = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        turn = len(human_indexes) - 1
+        step = sum(1 for m in messages[human_indexes[-1]:] if isinstance(m, AIMessage)) if human_indexes else 0
+
+        calls = self.script[turn % len(self.script)] if self.script else []
+        if step >= len(calls):
+            return AIMessage(content=self.final_text)
+
+        # Un elemento que es una lista se emite como varias tool calls en el mismo paso
+        step_calls = calls[step] if isinstance(calls[step], list) else [calls[step]]
+        return AIMessage(content="", tool_calls=[{
+            "name": call["name"],
+            "args": {k: self._resolve(v, messages) for k, v in call.get("args", {}).items()},
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+        } for call in step_calls])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self._next_message(messages)
+        # Sin streaming se espera igual la generación completa del texto
+        time.sleep(self._generation_time(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        message = self._next_message(messages)
+        await asyncio.sleep(self._generation_time(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generation_time(self, message: AIMessage) -> float:
+        return self.token_latency * (len(self._chunks(message)) - 1)
+
+    def _chunks(self, message: AIMessage) -> List[AIMessageChunk]:
+        """Texto final palabra por palabra; las tool calls en un solo chunk, como Gemini"""
+        if message.tool_calls:
+            return [AIMessageChunk(content="", tool_calls=message.tool_calls)]
+        words = message.content.split(" ")
+        return [AIMessageChunk(content=w if i == 0 else " " + w) for i, w in enumerate(words)]
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        for i, chunk in enumerate(self._chunks(self._next_message(messages))):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for i, chunk in enumerate(self._chunks(self._next_message(messages))):
+            if i and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+
+# Sesión típica: buscar, ver detalle, crear carrito, agregar y revisar el carrito
+SHOPPING_SCRIPT = [
+    [{"name": "search_products", "args": {"name": "Camiseta"}}],
+    [{"name": "get_product_details", "args": {"product_id": "2"}}],
+    [
+        {"name": "create_cart", "args": {}},
+        {"name": "add_item_to_cart", "args": {"cart_id": "{cart_id}", "product_variant_id": 2, "qty": 50}},
+    ],
+    [{"name": "get_cart_details", "args": {"cart_id": "{cart_id}"}}],
+]
+
+SHOPPING_MESSAGES = [
+    "Busco camisetas",
+    "Muéstrame el detalle del producto 2",
+    "Agrega 50 unidades de la variante 2 a un carrito nuevo",
+    "¿Cómo va mi carrito?",
+]
@@ -0,0 +1,50 @@
+"""
+Compara el tamaño de las salidas de herramientas en cada modo de formato
+(verbose, compact, kv) sobre respuestas armadas con el catálogo de products.csv.
+
+    cd agent && python -m benchmarks.output_tokens
+"""
+from langchain_core.messages import ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from benchmarks.stub_backend import StubStore
+from formatters import OUTPUT_MODES, format_cart_details, format_product_details, format_search_results
+
+
+def sample_outputs(store: StubStore, mode: str) -> dict:
+    """Salidas representativas: una búsqueda, el detalle de cada producto y un carrito"""
+    search = store.search({})
+    cart = store.carts[1]
+    return {
+        "search_products": [format_search_results(search, mode)],
+        "get_product_details": [format_product_details(p, mode) for p in store.products],
+        "get_cart_details": [format_cart_details(str(cart['id']), cart, mode)],
+    }
+
+
+def tokens(text: str) -> int:
+    return count_tokens_approximately([ToolMessage(content=text, tool_call_id="bench")])
+
+
+def main():
+    store = StubStore()
+    cart_id = store.create_cart()['id']
+    for variant_id in list(store.variants_by_id)[:10]:
+        store.add_item(cart_id, variant_id, 50)
+
+    results = {mode: sample_outputs(store, mode) for mode in OUTPUT_MODES}
+    baseline = results["verbose"]
+
+    print(f"{'herramienta':<22}{'modo':<9}{'bytes/llamada':>15}{'tokens/llamada':>16}{'reducción':>11}")
+    for tool_name in baseline:
+        base_tokens = sum(tokens(t) for t in baseline[tool_name]) / len(baseline[tool_name])
+        for mode in OUTPUT_MODES:
+            outputs = results[mode][tool_name]
+            avg_bytes = sum(len(t.encode()) for t in outputs) / len(outputs)
+            avg_tokens = sum(tokens(t) for t in outputs) / len(outputs)
+            reduction = 1 - avg_tokens / base_tokens if base_tokens else 0
+            print(f"{tool_name:<22}{mode:<9}{avg_bytes:>15.0f}{avg_tokens:>16.0f}{reduction:>10.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Latencia de un turno con N tool calls independientes (agregar N variantes al
+carrito), ejecutadas en serie (max_concurrency=1) y en paralelo. En paralelo
+las llamadas se agrupan en POST /carts/{id}/items/bulk (CART_COALESCE_WINDOW_MS=0
+para medir sin agrupar).
+
+    cd agent && python -m benchmarks.parallel_tools --items 8 --backend-latency-ms 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+
+def multi_item_script(items: int) -> List[list]:
+    """Turno 1: crear carrito. Turno 2: N add_item_to_cart en un solo paso del LLM"""
+    return [
+        [{"name": "create_cart", "args": {}}],
+        [[
+            {"name": "add_item_to_cart", "args": {"cart_id": "{cart_id}", "product_variant_id": v, "qty": 50}}
+            for v in range(1, items + 1)
+        ]],
+    ]
+
+
+def run_sync(agent, rounds: int) -> List[float]:
+    latencies = []
+    for i in range(rounds):
+        agent.chat("Crea un carrito", session_id=f"parallel_{i}")
+        start = time.perf_counter()
+        agent.chat("Agrega todas estas variantes", session_id=f"parallel_{i}")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_async(agent, rounds: int) -> List[float]:
+    latencies = []
+    for i in range(rounds):
+        await agent.achat("Crea un carrito", session_id=f"parallel_async_{i}")
+        start = time.perf_counter()
+        await agent.achat("Agrega todas estas variantes", session_id=f"parallel_async_{i}")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label: str, latencies: List[float], items: int, rtt: float):
+    mean = statistics.fmean(latencies)
+    print(f"  {label:<28} media={mean * 1000:8.1f} ms   ~{mean / rtt:4.1f} RTT para {items} items")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de tool calls en paralelo dentro de un turno')
+    parser.add_argument('--items', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--backend-latency-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    from benchmarks.stub_backend import start_stub_backend
+
+    server, url = start_stub_backend(latency_ms=args.backend_latency_ms)
+    os.environ['BACKEND_URL'] = url
+
+    from benchmarks.fake_llm import ScriptedChatModel
+    from shopping_agent import ShoppingAgent
+
+    llm = ScriptedChatModel(script=multi_item_script(args.items))
+    rtt = args.backend_latency_ms / 1000.0
+
+    print(f"{args.items} add_item_to_cart por turno, backend a {args.backend_latency_ms:.0f} ms")
+    report("sync, max_concurrency=1", run_sync(ShoppingAgent(llm=llm, max_concurrency=1), args.rounds), args.items, rtt)
+    report(f"sync, max_concurrency={args.items}",
+           run_sync(ShoppingAgent(llm=llm, max_concurrency=args.items), args.rounds), args.items, rtt)
+    async_agent = ShoppingAgent(llm=llm, async_mode=True)
+    report("async (asyncio.gather)", asyncio.run(run_async(async_agent, args.rounds)), args.items, rtt)
+    print(f"  agrupado en bulk (async): {async_agent.cart_coalescer.stats.as_dict()}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Latencia del turno que pide el detalle de un producto después de una búsqueda,
+con y sin prefetch especulativo (PRODUCT_PREFETCH), más hit rate y fetches
+desperdiciados para elegir PRODUCT_PREFETCH_TOP_K.
+
+    cd agent && python -m benchmarks.prefetch --top-k 1 3 6 --backend-latency-ms 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+
+def search_then_details(rank: int) -> List[list]:
+    """Turno 1: búsqueda. Turno 2: detalle del producto en la posición `rank` del listado"""
+    return [
+        [{"name": "search_products", "args": {}}],
+        [{"name": "get_product_details", "args": {"product_id": str(rank)}}],
+    ]
+
+
+def run_sync(agent, rounds: int, think_time: float) -> List[float]:
+    latencies = []
+    for i in range(rounds):
+        agent.chat("¿Qué productos tienen?", session_id=f"prefetch_{i}")
+        time.sleep(think_time)
+        start = time.perf_counter()
+        agent.chat("Muéstrame el detalle", session_id=f"prefetch_{i}")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_async(agent, rounds: int, think_time: float) -> List[float]:
+    latencies = []
+    for i in range(rounds):
+        await agent.achat("¿Qué productos tienen?", session_id=f"prefetch_async_{i}")
+        await asyncio.sleep(think_time)
+        start = time.perf_counter()
+        await agent.achat("Muéstrame el detalle", session_id=f"prefetch_async_{i}")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del prefetch de detalles después de una búsqueda')
+    parser.add_argument('--top-k', type=int, nargs='+', default=[1, 3, 6])
+    parser.add_argument('--rank', type=int, default=2, help='Posición del producto que se pide en el turno 2')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--backend-latency-ms', type=float, default=50.0)
+    parser.add_argument('--think-time-ms', type=float, default=100.0,
+                        help='Tiempo entre turnos (el LLM respondiendo y el usuario leyendo)')
+    args = parser.parse_args()
+
+    from benchmarks.stub_backend import start_stub_backend
+
+    server, url = start_stub_backend(latency_ms=args.backend_latency_ms)
+    os.environ['BACKEND_URL'] = url
+
+    import async_tools
+    import shopping_agent
+    from benchmarks.fake_llm import ScriptedChatModel
+    from response_cache import product_cache
+
+    llm = ScriptedChatModel(script=search_then_details(args.rank))
+    think_time = args.think_time_ms / 1000.0
+    print(f"detalle del producto #{args.rank} después de buscar, backend a {args.backend_latency_ms:.0f} ms")
+    print(f"  {'modo':<7}{'top_k':>6}{'media':>11}{'p50':>11}{'hit_rate':>10}{'fetched':>9}{'wasted':>8}")
+
+    configs = [(False, 0)] + [(True, k) for k in args.top_k]
+    for async_mode in (False, True):
+        for enabled, top_k in configs:
+            agent = shopping_agent.ShoppingAgent(llm=llm, async_mode=async_mode)
+            prefetcher = async_tools.product_prefetcher if async_mode else shopping_agent.product_prefetcher
+            prefetcher.enabled, prefetcher.top_k = enabled, top_k
+            prefetcher.stats.__init__()
+            # Sin la cache de detalles, para medir solo el efecto del prefetch
+            product_cache.ttl = 0
+            product_cache.clear()
+            if async_mode:
+                latencies = asyncio.run(run_async(agent, args.rounds, think_time))
+            else:
+                latencies = run_sync(agent, args.rounds, think_time)
+            for i in range(args.rounds):
+                prefetcher.store.drop_session(f"prefetch_async_{i}" if async_mode else f"prefetch_{i}")
+            stats = prefetcher.report()
+            print(f"  {'async' if async_mode else 'sync':<7}{top_k if enabled else 'off':>6}"
+                  f"{statistics.fmean(latencies) * 1000:>8.1f} ms{statistics.median(latencies) * 1000:>8.1f} ms"
+                  f"{stats['hit_rate']:>10.0%}{stats['fetched']:>9}{stats['wasted']:>8}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Microbenchmark de pricing.quote_cart sobre carritos de miles de líneas armados
+con las variantes de products.csv: cotización por tramo, what-if de 50/100/200
+unidades y, como referencia, el loop anterior (float, siempre price50U).
+
+    cd agent && python -m benchmarks.pricing --lines 1000 5000 20000
+"""
+import argparse
+import random
+import statistics
+import time
+from decimal import Decimal
+from typing import Callable, List
+
+from catalog import load_catalog_csv
+from pricing import TIERS, format_cents, quote_cart, tier_for
+
+
+def build_cart(variants: List[dict], lines: int, seed: int = 7) -> dict:
+    """Carrito con `lines` items de cantidades mezcladas entre los tres tramos"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(lines):
+        variant = rng.choice(variants)
+        items.append({'id': i + 1, 'qty': rng.choice((10, 50, 75, 100, 150, 200, 500)), 'productVariant': variant})
+    return {'id': 1, 'cartItems': items}
+
+
+def float_total(cart: dict) -> float:
+    """El cálculo que hacía format_cart_details antes de pricing.py"""
+    total = 0
+    for item in cart['cartItems']:
+        total += float(item['productVariant'].get('price50U', 0)) * item.get('qty', 0)
+    return total
+
+
+def decimal_total(cart: dict) -> Decimal:
+    """Referencia exacta, línea por línea con Decimal, para validar quote_cart"""
+    total = Decimal(0)
+    for item in cart['cartItems']:
+        field = tier_for(item['qty'])[1]
+        total += Decimal(str(item['productVariant'][field])) * item['qty']
+    return total
+
+
+def timed(fn: Callable, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark de cotización de carritos por tramo')
+    parser.add_argument('--lines', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    variants = [v for p in load_catalog_csv() for v in p['variants']]
+    print(f"{'líneas':>8}{'quote_cart':>14}{'what_if x3':>13}{'decimal':>12}{'float (ant.)':>15}{'líneas/s':>14}")
+    for lines in args.lines:
+        cart = build_cart(variants, lines)
+        quote = quote_cart(cart)
+        if Decimal(format_cents(quote.total_cents)) != decimal_total(cart):
+            raise SystemExit(f"quote_cart no coincide con la referencia Decimal para {lines} líneas")
+
+        quote_s = timed(lambda: quote_cart(cart), args.rounds)
+        what_if_s = timed(lambda: quote.what_if(), args.rounds)
+        decimal_s = timed(lambda: decimal_total(cart), max(1, args.rounds // 4))
+        float_s = timed(lambda: float_total(cart), args.rounds)
+        print(f"{lines:>8}{quote_s * 1000:>11.2f} ms{what_if_s * 1e6:>10.1f} µs{decimal_s * 1000:>9.2f} ms"
+              f"{float_s * 1000:>12.2f} ms{lines / quote_s:>14,.0f}")
+    print(f"tramos: {', '.join(f'desde {q} u. -> {field}' for q, field in TIERS)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Latencia de ranking.RankingIndex.search() contra el presupuesto RANKING_BUDGET_MS,
+sobre el catálogo de products.csv y sobre catálogos sintéticos más grandes
+(mismos nombres, categorías y descripciones combinados con palabras de relleno).
+
+    cd agent && python -m benchmarks.ranking --products 100 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+from benchmarks.async_load import percentile
+from catalog import load_catalog_csv
+from ranking import BUDGET_MS, RankingIndex, build_index
+
+QUERIES = [
+    "algo cómodo para correr",
+    "ropa para una fiesta",
+    "pantalones deportivos",
+    "algo liviano para el calor",
+    "chaqueta para el frío",
+    "camisa elegante para la oficina",
+    "falda casual",
+    "buzo",
+]
+FILLER = ("algodón", "poliéster", "clásico", "urbano", "resistente", "suave", "moderno",
+          "térmico", "básico", "premium", "unisex", "ajustado", "holgado", "estampado")
+
+
+def synthetic_catalog(base: List[dict], size: int, seed: int = 11) -> List[dict]:
+    rng = random.Random(seed)
+    products = []
+    for i in range(size):
+        source = base[i % len(base)]
+        words = " ".join(rng.sample(FILLER, 3))
+        products.append({
+            'id': i + 1,
+            'name': f"{source['name']} {rng.choice(FILLER)} {i}",
+            'category': source['category'],
+            'description': f"{source['description']} {words}",
+        })
+    return products
+
+
+def measure(products: List[dict], rounds: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="ranking_bench_") as directory:
+        return _measure(products, rounds, os.path.join(directory, "ranking.idx"))
+
+
+def _measure(products: List[dict], rounds: int, path: str) -> dict:
+    start = time.perf_counter()
+    build_index(products, path)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = RankingIndex(path)
+    open_s = time.perf_counter() - start
+
+    index.search(QUERIES[0])  # calentamiento
+    latencies = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            index.search(query)
+            latencies.append(time.perf_counter() - start)
+    stats = index.stats()
+    index.close()
+    size_kib = os.path.getsize(path) / 1024
+    return {
+        "products": len(products),
+        "build_s": build_s,
+        "open_ms": open_s * 1000,
+        "size_kib": size_kib,
+        "terms": stats["terms"],
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del ranking BM25 de productos')
+    parser.add_argument('--products', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    base = load_catalog_csv()
+    catalogs = [("products.csv", base)] + [
+        (f"sintético", synthetic_catalog(base, size)) for size in args.products
+    ]
+    print(f"presupuesto por consulta: {BUDGET_MS} ms")
+    print(f"{'catálogo':<14}{'productos':>10}{'términos':>10}{'build':>10}{'open':>10}"
+          f"{'archivo':>11}{'p50':>10}{'p99':>10}")
+    for label, products in catalogs:
+        r = measure(products, args.rounds)
+        flag = "" if r["p99_ms"] <= BUDGET_MS else "  > presupuesto"
+        print(f"{label:<14}{r['products']:>10}{r['terms']:>10}{r['build_s']:>9.2f}s{r['open_ms']:>8.2f}ms"
+              f"{r['size_kib']:>8.0f}KiB{r['p50_ms']:>8.3f}ms{r['p99_ms']:>8.3f}ms{flag}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Reproduce escenarios grabados (benchmarks/scenarios.json) contra el backend
+falso y el LLM guionado, sin red ni Gemini, y reporta throughput, latencia por
+turno y asignaciones de memoria de ShoppingAgent.chat().
+
+    cd agent && python -m benchmarks.scenarios --sessions 20
+    cd agent && python -m benchmarks.scenarios --scenario browse --json > actual.json
+    cd agent && python -m benchmarks.scenarios --baseline base.json --tolerance 0.2
+
+Con --baseline sale con código 1 si el p50 o las asignaciones por turno de
+algún escenario empeoran más que la tolerancia.
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+from benchmarks.async_load import percentile
+
+SCENARIOS_PATH = os.path.join(os.path.dirname(__file__), 'scenarios.json')
+
+
+def load_scenarios(path: str = SCENARIOS_PATH) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        scenarios = json.load(f)
+    for scenario in scenarios:
+        if len(scenario['script']) != len(scenario['messages']):
+            raise ValueError(f"Escenario {scenario['name']}: el guion debe tener un turno por mensaje")
+    return scenarios
+
+
+def run_sessions(agent, scenario: Dict, sessions: int, prefix: str) -> List[float]:
+    latencies = []
+    for i in range(sessions):
+        for message in scenario['messages']:
+            start = time.perf_counter()
+            agent.chat(message, session_id=f"{prefix}_{scenario['name']}_{i}")
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def measure_allocations(agent, scenario: Dict, sessions: int) -> Dict:
+    """Pico de memoria por turno y memoria retenida por sesión (tracemalloc, corrida aparte)"""
+    gc.collect()
+    tracemalloc.start()
+    peaks = []
+    baseline, _ = tracemalloc.get_traced_memory()
+    for i in range(sessions):
+        for message in scenario['messages']:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            agent.chat(message, session_id=f"alloc_{scenario['name']}_{i}")
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "peak_kib_per_turn": round(statistics.fmean(peaks) / 1024, 1),
+        "retained_kib_per_session": round((retained - baseline) / sessions / 1024, 1),
+    }
+
+
+def run_scenario(scenario: Dict, sessions: int, llm_latency: float, allocations: bool) -> Dict:
+    from benchmarks.fake_llm import ScriptedChatModel
+    from shopping_agent import ShoppingAgent
+
+    agent = ShoppingAgent(llm=ScriptedChatModel(script=scenario['script'], latency=llm_latency))
+    # Calentamiento: imports perezosos, pool de conexiones, caches del normalizador
+    run_sessions(agent, scenario, 1, "warmup")
+
+    start = time.perf_counter()
+    latencies = run_sessions(agent, scenario, sessions, "bench")
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "scenario": scenario['name'],
+        "turns": len(latencies),
+        "throughput_turns_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+    }
+    if allocations:
+        result.update(measure_allocations(agent, scenario, max(1, sessions // 4)))
+    return result
+
+
+def report(result: Dict):
+    print(f"\n{result['scenario']}")
+    print(f"  turnos:       {result['turns']}")
+    print(f"  throughput:   {result['throughput_turns_s']} turnos/s")
+    print(f"  p50 / p95:    {result['p50_ms']} / {result['p95_ms']} ms")
+    print(f"  p99:          {result['p99_ms']} ms")
+    if 'peak_kib_per_turn' in result:
+        print(f"  memoria:      {result['peak_kib_per_turn']} KiB pico por turno, "
+              f"{result['retained_kib_per_session']} KiB retenidos por sesión")
+
+
+def regressions(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    previous = {r['scenario']: r for r in baseline}
+    found = []
+    for result in results:
+        base = previous.get(result['scenario'])
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'peak_kib_per_turn'):
+            if metric in result and base.get(metric) and result[metric] > base[metric] * (1 + tolerance):
+                found.append(f"{result['scenario']}: {metric} {base[metric]} -> {result[metric]}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de escenarios grabados del agente, sin red')
+    parser.add_argument('--file', default=SCENARIOS_PATH, help='JSON con los escenarios')
+    parser.add_argument('--scenario', action='append', help='Solo estos escenarios (repetible)')
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0)
+    parser.add_argument('--backend-latency-ms', type=float, default=0.0)
+    parser.add_argument('--no-alloc', action='store_true', help='No medir memoria con tracemalloc')
+    parser.add_argument('--json', action='store_true', help='Imprime los resultados como JSON')
+    parser.add_argument('--baseline', help='JSON de una corrida anterior (--json) para comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    from benchmarks.stub_backend import start_stub_backend
+
+    server, url = start_stub_backend(latency_ms=args.backend_latency_ms)
+    os.environ['BACKEND_URL'] = url
+
+    scenarios = load_scenarios(args.file)
+    if args.scenario:
+        scenarios = [s for s in scenarios if s['name'] in args.scenario]
+
+    results = []
+    for scenario in scenarios:
+        result = run_scenario(scenario, args.sessions, args.llm_latency_ms / 1000.0, not args.no_alloc)
+        results.append(result)
+        if not args.json:
+            report(result)
+    server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESIÓN {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
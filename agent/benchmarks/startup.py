@@ -0,0 +1,91 @@
+"""
+Tiempo de arranque en frío del agente: cada medición corre en un proceso
+nuevo (import de shopping_agent, ShoppingAgent() y el primer turno hasta el
+grafo compilado), con y sin FAST_START. No llama a Gemini: el primer turno
+usa warm_up(), que crea el cliente y compila el grafo.
+
+    cd agent && python -m benchmarks.startup --runs 5
+    cd agent && python -m benchmarks.startup --top 15   # módulos más lentos (python -X importtime)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Corre en el proceso hijo; imprime los tiempos como JSON en la última línea
+PROBE = """
+import json, time
+start = time.perf_counter()
+import shopping_agent
+imported = time.perf_counter()
+agent = shopping_agent.ShoppingAgent()
+ready = time.perf_counter()
+agent.warm_up()
+warm = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "init": ready - imported,
+    "first_turn": warm - ready,
+    "total": warm - start,
+}))
+"""
+
+
+def probe(fast_start: bool) -> Dict[str, float]:
+    env = dict(os.environ, FAST_START='on' if fast_start else 'off')
+    # El cliente de Gemini solo valida que haya una clave, no se conecta al crearse
+    env.setdefault('GEMINI_API_KEY', 'benchmark')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=AGENT_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def top_imports(limit: int) -> List[tuple]:
+    """Módulos con mayor tiempo acumulado de import, según python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import shopping_agent'],
+        cwd=AGENT_DIR, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def report(label: str, samples: List[Dict[str, float]]):
+    print(f"\n{label}")
+    for phase in ('import', 'init', 'first_turn', 'total'):
+        values = [s[phase] for s in samples]
+        print(f"  {phase:<11} mediana={statistics.median(values) * 1000:8.1f} ms   "
+              f"min={min(values) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arranque en frío del agente')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=0, help='Lista los N imports más lentos')
+    args = parser.parse_args()
+
+    report("FAST_START=off (grafo compilado en ShoppingAgent())",
+           [probe(False) for _ in range(args.runs)])
+    report("FAST_START=on (grafo compilado en el primer turno)",
+           [probe(True) for _ in range(args.runs)])
+
+    if args.top:
+        print(f"\nimports más lentos de shopping_agent (acumulado):")
+        for microseconds, module in top_imports(args.top):
+            print(f"  {microseconds / 1000:8.1f} ms  {module}")
+
+
+if __name__ == '__main__':
+    main()
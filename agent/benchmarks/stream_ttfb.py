@@ -0,0 +1,82 @@
+"""
+Tiempo hasta el primer byte: chat() bloqueante contra stream_events(), sobre
+el guion de compras con un LLM guionado que genera por tokens.
+
+    cd agent && python -m benchmarks.stream_ttfb --sessions 20 --llm-latency-ms 300 --token-latency-ms 15
+"""
+import argparse
+import os
+import time
+from typing import Dict, List
+
+from benchmarks.async_load import percentile
+
+
+def run_blocking(agent, sessions: int, messages: List[str]) -> Dict[str, List[float]]:
+    totals: List[float] = []
+    for i in range(sessions):
+        for message in messages:
+            start = time.perf_counter()
+            agent.chat(message, session_id=f"ttfb_chat_{i}")
+            totals.append(time.perf_counter() - start)
+    # Sin streaming el primer byte llega con la respuesta completa
+    return {"primer evento": totals, "primer token": totals, "total": totals}
+
+
+def run_streaming(agent, sessions: int, messages: List[str]) -> Dict[str, List[float]]:
+    samples: Dict[str, List[float]] = {"primer evento": [], "primer token": [], "total": []}
+    for i in range(sessions):
+        for message in messages:
+            start = time.perf_counter()
+            first_event = first_text = None
+            for event in agent.stream_events(message, session_id=f"ttfb_stream_{i}"):
+                now = time.perf_counter() - start
+                if first_event is None:
+                    first_event = now
+                if first_text is None and event["type"] in ("token", "final"):
+                    first_text = now
+            total = time.perf_counter() - start
+            samples["primer evento"].append(first_event if first_event is not None else total)
+            samples["primer token"].append(first_text if first_text is not None else total)
+            samples["total"].append(total)
+    return samples
+
+
+def report(label: str, samples: Dict[str, List[float]]):
+    print(f"\n{label}")
+    for name, values in samples.items():
+        print(f"  {name:<14} p50={percentile(values, 50) * 1000:8.1f} ms   p99={percentile(values, 99) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de time-to-first-byte con y sin streaming')
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--llm-latency-ms', type=float, default=300.0)
+    parser.add_argument('--token-latency-ms', type=float, default=15.0)
+    parser.add_argument('--backend-latency-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    from benchmarks.stub_backend import start_stub_backend
+
+    server, url = start_stub_backend(latency_ms=args.backend_latency_ms)
+    os.environ['BACKEND_URL'] = url
+
+    from benchmarks.fake_llm import ScriptedChatModel, SHOPPING_SCRIPT, SHOPPING_MESSAGES
+    from shopping_agent import ShoppingAgent
+
+    llm = ScriptedChatModel(
+        script=SHOPPING_SCRIPT,
+        latency=args.llm_latency_ms / 1000.0,
+        token_latency=args.token_latency_ms / 1000.0,
+        final_text="Listo, ya revisé el catálogo y el carrito con lo que pediste. ¿Quieres agregar algo más?",
+    )
+    agent = ShoppingAgent(llm=llm)
+
+    report(f"chat(): {args.sessions} sesiones", run_blocking(agent, args.sessions, SHOPPING_MESSAGES))
+    report(f"stream_events(): {args.sessions} sesiones", run_streaming(agent, args.sessions, SHOPPING_MESSAGES))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Backend falso en memoria para benchmarks sin NestJS ni Postgres.
+
+Sirve /products/search, /products/{id} y /carts/* con la misma forma de
+respuesta que el backend real, a partir de backend/doc/products.csv.
+
+    python -m benchmarks.stub_backend --port 3001 --latency-ms 20
+"""
+import argparse
+import base64
+import hashlib
+import json
+import math
+import re
+import socket
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from catalog import load_catalog_csv
+
+
+class StubStore:
+    """Catálogo y carritos en memoria"""
+
+    def __init__(self, csv_path: Optional[str] = None):
+        self.products = load_catalog_csv(csv_path)
+        self.products_by_id = {p['id']: p for p in self.products}
+        self.variants_by_id = {}
+        for product in self.products:
+            summary = {k: v for k, v in product.items() if k != 'variants'}
+            for variant in product['variants']:
+                self.variants_by_id[variant['id']] = dict(variant, product=summary)
+        self.carts = {}
+        self._next_cart_id = 1
+        self._next_item_id = 1
+        self._lock = threading.Lock()
+
+    def search(self, query: dict) -> dict:
+        category = query.get('category', [None])[0]
+        color = query.get('color', [None])[0]
+        size = query.get('size', [None])[0]
+        name = query.get('name', [None])[0]
+        min_price = float(query['minPrice'][0]) if 'minPrice' in query else None
+        max_price = float(query['maxPrice'][0]) if 'maxPrice' in query else None
+        page = int(query.get('page', ['1'])[0])
+        take = int(query.get('take', ['10'])[0])
+        if 'cursor' in query:
+            # El backend real usa keyset; acá basta con que el cursor lleve la página
+            page = json.loads(base64.urlsafe_b64decode(query['cursor'][0]))['page']
+
+        matches = []
+        for product in self.products:
+            # Como el backend: category, color y size exactos; name sin distinguir mayúsculas
+            if category and product['category'] != category:
+                continue
+            if name and name.lower() not in product['name'].lower():
+                continue
+            variants = [
+                v for v in product['variants']
+                if (not color or v['color'] == color)
+                and (not size or v['size'] == size)
+                and (min_price is None or float(v['price50U']) >= min_price)
+                and (max_price is None or float(v['price50U']) <= max_price)
+            ]
+            if (color or size or min_price is not None or max_price is not None) and not variants:
+                continue
+            matches.append(dict(product, variants=variants))
+
+        item_count = len(matches)
+        page_count = math.ceil(item_count / take)
+        return {
+            'data': matches[(page - 1) * take:page * take],
+            'meta': {
+                'page': page,
+                'take': take,
+                'itemCount': item_count,
+                'pageCount': page_count,
+                'hasPreviousPage': page > 1,
+                'hasNextPage': page < page_count,
+                'nextCursor': base64.urlsafe_b64encode(json.dumps({'page': page + 1}).encode()).decode()
+                if page < page_count else None,
+            },
+        }
+
+    def create_cart(self) -> dict:
+        with self._lock:
+            now = datetime.now().isoformat()
+            cart = {'id': self._next_cart_id, 'createdAt': now, 'updatedAt': now, 'cartItems': []}
+            self.carts[cart['id']] = cart
+            self._next_cart_id += 1
+            return {k: v for k, v in cart.items() if k != 'cartItems'}
+
+    def add_item(self, cart_id: int, product_variant_id: int, qty: int) -> Optional[dict]:
+        with self._lock:
+            cart = self.carts.get(cart_id)
+            variant = self.variants_by_id.get(product_variant_id)
+            if cart is None or variant is None:
+                return None
+            now = datetime.now().isoformat()
+            cart['cartItems'].append({
+                'id': self._next_item_id,
+                'cart_id': cart_id,
+                'product_variant_id': product_variant_id,
+                'qty': qty,
+                'createdAt': now,
+                'updatedAt': now,
+                'productVariant': variant,
+            })
+            self._next_item_id += 1
+            return cart
+
+    def update_item(self, cart_id: int, item_id: int, qty: int) -> Optional[dict]:
+        with self._lock:
+            cart = self.carts.get(cart_id)
+            if cart is None:
+                return None
+            for item in cart['cartItems']:
+                if item['id'] == item_id:
+                    item['qty'] = qty
+                    item['updatedAt'] = datetime.now().isoformat()
+                    return cart
+            return None
+
+    def etag(self, cart_id: int) -> Optional[str]:
+        """Misma receta que cartVersionTag: carrito, items y precio/stock de sus variantes"""
+        cart = self.carts.get(cart_id)
+        if cart is None:
+            return None
+        digest = hashlib.sha1(f"{cart_id}|{cart['updatedAt']}".encode())
+        for item in sorted(cart['cartItems'], key=lambda i: i['id']):
+            variant = item['productVariant']
+            digest.update("|".join(str(value) for value in (
+                item['id'], item['qty'], item['updatedAt'], variant.get('id'),
+                variant.get('price50U'), variant.get('price100U'), variant.get('price200U'),
+                variant.get('stock'), variant.get('isAvailable'), variant.get('updatedAt'),
+            )).encode())
+        return f'W/"{cart_id}-{digest.hexdigest()[:20]}"'
+
+    def bulk(self, cart_id: int, operations: list) -> Optional[dict]:
+        """Como CartsService.bulkUpdate: valida todo antes de aplicar, todas o ninguna"""
+        with self._lock:
+            cart = self.carts.get(cart_id)
+            if cart is None:
+                return None
+            item_ids = {item['id'] for item in cart['cartItems']}
+            for operation in operations:
+                if operation['op'] == 'add' and operation.get('product_variant_id') not in self.variants_by_id:
+                    return None
+                if operation['op'] != 'add' and operation.get('item_id') not in item_ids:
+                    return None
+        for operation in operations:
+            if operation['op'] == 'add':
+                self.add_item(cart_id, operation['product_variant_id'], operation['qty'])
+            elif operation['op'] == 'update':
+                self.update_item(cart_id, operation['item_id'], operation['qty'])
+            else:
+                with self._lock:
+                    cart['cartItems'] = [i for i in cart['cartItems'] if i['id'] != operation['item_id']]
+        return cart
+
+
+ROUTES = [
+    ('GET', re.compile(r'^/products/search$'), 'search'),
+    ('GET', re.compile(r'^/products/(\d+)$'), 'product'),
+    ('POST', re.compile(r'^/carts$'), 'create_cart'),
+    ('GET', re.compile(r'^/carts/(\d+)$'), 'cart'),
+    ('PATCH', re.compile(r'^/carts/(\d+)$'), 'update_cart'),
+    ('POST', re.compile(r'^/carts/(\d+)/items$'), 'add_item'),
+    ('POST', re.compile(r'^/carts/(\d+)/items/bulk$'), 'bulk'),
+    ('PATCH', re.compile(r'^/carts/(\d+)/items/(\d+)$'), 'update_item'),
+]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, como el backend real
+    store: StubStore = None
+    latency: float = 0.0
+
+    def setup(self):
+        super().setup()
+        # Headers y body salen en dos writes: sin TCP_NODELAY, Nagle + delayed ACK
+        # suman ~40 ms a cada respuesta con body y distorsionan las mediciones
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body=None, etag: Optional[str] = None):
+        payload = b'' if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _dispatch(self, method: str):
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlparse(self.path)
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                return getattr(self, f'_handle_{name}')(url, *map(int, match.groups()))
+        self._send(404, {'message': 'Not Found', 'statusCode': 404})
+
+    def _handle_search(self, url):
+        self._send(200, self.store.search(parse_qs(url.query)))
+
+    def _handle_product(self, url, product_id):
+        product = self.store.products_by_id.get(product_id)
+        self._send(200, product) if product else self._send(404, {'statusCode': 404})
+
+    def _handle_create_cart(self, url):
+        self._body()
+        self._send(201, self.store.create_cart())
+
+    def _handle_cart(self, url, cart_id):
+        cart = self.store.carts.get(cart_id)
+        if cart is None:
+            return self._send(404, {'statusCode': 404})
+        etag = self.store.etag(cart_id)
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, etag=etag)
+        self._send(200, cart, etag)
+
+    def _handle_update_cart(self, url, cart_id):
+        self._body()
+        cart = self.store.carts.get(cart_id)
+        if cart is not None:
+            cart['updatedAt'] = datetime.now().isoformat()
+        self._send(200 if cart is not None else 404)
+
+    def _handle_add_item(self, url, cart_id):
+        body = self._body()
+        cart = self.store.add_item(cart_id, int(body.get('product_variant_id', 0)), int(body.get('qty', 1)))
+        self._send(201, cart, self.store.etag(cart_id)) if cart else self._send(404, {'statusCode': 404})
+
+    def _handle_update_item(self, url, cart_id, item_id):
+        cart = self.store.update_item(cart_id, item_id, int(self._body().get('qty', 1)))
+        self._send(200, cart, self.store.etag(cart_id)) if cart else self._send(404, {'statusCode': 404})
+
+    def _handle_bulk(self, url, cart_id):
+        cart = self.store.bulk(cart_id, self._body().get('operations', []))
+        self._send(201, cart, self.store.etag(cart_id)) if cart else self._send(404, {'statusCode': 404})
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+
+def start_stub_backend(port: int = 0, latency_ms: float = 0.0,
+                       csv_path: Optional[str] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """Levanta el backend falso en un hilo y retorna (server, base_url)"""
+    handler = type('BoundStubHandler', (StubHandler,), {
+        'store': StubStore(csv_path),
+        'latency': latency_ms / 1000.0,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backend falso para benchmarks del agente')
+    parser.add_argument('--port', type=int, default=3001)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--csv', default=None)
+    args = parser.parse_args()
+
+    server, url = start_stub_backend(args.port, args.latency_ms, args.csv)
+    print(f"Stub backend escuchando en {url} (latencia {args.latency_ms} ms)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
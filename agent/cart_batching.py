@@ -0,0 +1,226 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cuando el LLM pide varios add_item_to_cart / update_cart_item en un mismo paso,
+# el ToolNode los ejecuta en paralelo. La primera mutación de un carrito se envía
+# en el acto, sola; las que llegan mientras esa está en curso (las demás del
+# mismo paso) se juntan durante CART_COALESCE_WINDOW_MS y viajan en un solo
+# POST /carts/{id}/items/bulk. Una mutación sola nunca espera la ventana.
+# Si el lote se rechaza sin aplicarse (4xx: validación, o el backend no tiene el
+# endpoint) cada llamada se reintenta por separado, así cada una recibe su propio
+# resultado o error. Si falla sin saber si se aplicó (timeout, conexión, 5xx) no
+# se reenvía nada: el POST puede haberse confirmado y se duplicarían los items;
+# cada llamada recibe ese error.
+COALESCE_WINDOW = float(os.getenv('CART_COALESCE_WINDOW_MS', '5')) / 1000.0
+
+_FALLBACK = object()
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    response = getattr(exc, 'response', None)
+    return response.status_code if response is not None else None
+
+
+def route_missing(exc: Exception) -> bool:
+    """True si el backend no tiene el endpoint bulk (respuesta por defecto de Nest)"""
+    return _status_code(exc) in (404, 405) and 'Cannot POST' in (exc.response.text or '')
+
+
+def rejected(exc: Exception) -> bool:
+    """True si el backend respondió 4xx: el lote no se aplicó y se puede reenviar por partes"""
+    status = _status_code(exc)
+    return status is not None and 400 <= status < 500
+
+
+class CoalescerStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = 0
+        self.batches = 0
+        self.batched_operations = 0
+        self.fallbacks = 0
+
+    def record(self, operations: int = 0, batched: int = 0, fallback: bool = False):
+        with self._lock:
+            self.operations += operations
+            if batched:
+                self.batches += 1
+                self.batched_operations += batched
+            if fallback:
+                self.fallbacks += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "operations": self.operations,
+                "bulk_requests": self.batches,
+                "batched_operations": self.batched_operations,
+                "requests_saved": self.batched_operations - self.batches,
+                "fallbacks": self.fallbacks,
+            }
+
+
+class CartCoalescer:
+    """Agrupa mutaciones concurrentes de un mismo carrito (herramientas sync, una por hilo)"""
+
+    def __init__(self, send_bulk: Callable[[str, List[Dict]], object],
+                 send_one: Callable[[str, Dict], object], window: float = COALESCE_WINDOW):
+        self.send_bulk = send_bulk
+        self.send_one = send_one
+        self.window = window
+        self.bulk_supported = True
+        self.stats = CoalescerStats()
+        self._lock = threading.Lock()
+        # Carritos con una mutación en curso y lotes que se están juntando para ellos
+        self._active: Set[str] = set()
+        self._pending: Dict[str, List[Tuple[Dict, Future]]] = {}
+
+    def submit(self, cart_id: str, operation: Dict) -> None:
+        """Aplica la operación, sola o dentro de un lote; propaga el error de esta operación"""
+        self.stats.record(operations=1)
+        if self.window <= 0 or not self.bulk_supported:
+            self.send_one(cart_id, operation)
+            return
+
+        future: Future = Future()
+        with self._lock:
+            direct = cart_id not in self._active
+            if direct:
+                self._active.add(cart_id)
+            else:
+                batch = self._pending.get(cart_id)
+                leader = batch is None
+                if leader:
+                    batch = self._pending[cart_id] = []
+                batch.append((operation, future))
+
+        if direct:
+            try:
+                self.send_one(cart_id, operation)
+            finally:
+                with self._lock:
+                    self._active.discard(cart_id)
+            return
+
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                del self._pending[cart_id]
+            self._flush(cart_id, batch)
+
+        if future.result() is _FALLBACK:
+            self.send_one(cart_id, operation)
+
+    def _flush(self, cart_id: str, batch: List[Tuple[Dict, Future]]) -> None:
+        if len(batch) == 1:
+            batch[0][1].set_result(_FALLBACK)
+            return
+        try:
+            self.send_bulk(cart_id, [operation for operation, _ in batch])
+        except Exception as e:
+            if not rejected(e):
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            if route_missing(e):
+                self.bulk_supported = False
+            self.stats.record(fallback=True)
+            outcome = _FALLBACK
+        else:
+            self.stats.record(batched=len(batch))
+            outcome = None
+        for _, future in batch:
+            future.set_result(outcome)
+
+
+class _LoopBatches:
+    __slots__ = ("active", "pending")
+
+    def __init__(self):
+        self.active: Set[str] = set()
+        self.pending: Dict[str, List[Tuple[Dict, asyncio.Future]]] = {}
+
+
+class AsyncCartCoalescer:
+    """Versión asyncio de CartCoalescer: los lotes se arman dentro de cada event loop"""
+
+    def __init__(self, send_bulk: Callable[[str, List[Dict]], Awaitable],
+                 send_one: Callable[[str, Dict], Awaitable], window: float = COALESCE_WINDOW):
+        self.send_bulk = send_bulk
+        self.send_one = send_one
+        self.window = window
+        self.bulk_supported = True
+        self.stats = CoalescerStats()
+        # Por loop (el objeto, no id(), que se reusa): carritos con una mutación
+        # en curso y lotes abiertos. Los futures referencian a su loop, así que
+        # además se descartan los loops ya cerrados.
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopBatches]" = weakref.WeakKeyDictionary()
+
+    def _state(self, loop: asyncio.AbstractEventLoop) -> "_LoopBatches":
+        state = self._loops.get(loop)
+        if state is None:
+            for stale in [l for l in list(self._loops.keys()) if l.is_closed()]:
+                self._loops.pop(stale, None)
+            state = self._loops[loop] = _LoopBatches()
+        return state
+
+    async def submit(self, cart_id: str, operation: Dict) -> None:
+        self.stats.record(operations=1)
+        if self.window <= 0 or not self.bulk_supported:
+            await self.send_one(cart_id, operation)
+            return
+
+        loop = asyncio.get_running_loop()
+        state = self._state(loop)
+        if cart_id not in state.active:
+            state.active.add(cart_id)
+            try:
+                await self.send_one(cart_id, operation)
+            finally:
+                state.active.discard(cart_id)
+            return
+
+        future = loop.create_future()
+        batch = state.pending.get(cart_id)
+        leader = batch is None
+        if leader:
+            batch = state.pending[cart_id] = []
+        batch.append((operation, future))
+
+        if leader:
+            await asyncio.sleep(self.window)
+            del state.pending[cart_id]
+            await self._flush(cart_id, batch)
+
+        if await future is _FALLBACK:
+            await self.send_one(cart_id, operation)
+
+    async def _flush(self, cart_id: str, batch: List[Tuple[Dict, asyncio.Future]]) -> None:
+        if len(batch) == 1:
+            batch[0][1].set_result(_FALLBACK)
+            return
+        try:
+            await self.send_bulk(cart_id, [operation for operation, _ in batch])
+        except Exception as e:
+            if not rejected(e):
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            if route_missing(e):
+                self.bulk_supported = False
+            self.stats.record(fallback=True)
+            outcome = _FALLBACK
+        else:
+            self.stats.record(batched=len(batch))
+            outcome = None
+        for _, future in batch:
+            future.set_result(outcome)
@@ -0,0 +1,104 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from formatters import format_cart_details
+
+load_dotenv()
+
+# Copia local de cada carrito (cada sesión trabaja sobre el suyo) con su ETag.
+# get_cart_details revalida con If-None-Match: si el backend responde 304 se
+# reutiliza la copia, y el texto ya formateado, sin descargar el carrito con
+# sus variantes y productos anidados. El ETag cambia también si cambia el
+# precio o el stock de una variante del carrito. Las escrituras del agente
+# (alta, cambio de cantidad y bulk) devuelven el carrito completo con su ETag
+# y reemplazan la copia, así el siguiente "ver carrito" es un 304.
+MAX_CARTS = int(os.getenv('CART_MIRROR_MAX_CARTS', '1024'))
+ENABLED = os.getenv('CART_MIRROR', 'on').lower() not in ('off', '0', 'false')
+
+
+class _MirroredCart:
+    __slots__ = ("etag", "data", "formatted")
+
+    def __init__(self, etag: Optional[str], data: Dict):
+        self.etag = etag
+        self.data = data
+        self.formatted: Optional[str] = None
+
+
+class CartMirror:
+    """Carritos conocidos por ETag, con desalojo LRU"""
+
+    def __init__(self, max_carts: int = MAX_CARTS, enabled: bool = ENABLED):
+        self.max_carts = max_carts
+        self.enabled = enabled
+        self._carts: "OrderedDict[str, _MirroredCart]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        self.full_fetches = 0
+        self.invalidations = 0
+
+    def request_headers(self, cart_id: str) -> Dict[str, str]:
+        """Headers para el GET del carrito: If-None-Match si hay una copia válida"""
+        with self._lock:
+            entry = self._carts.get(str(cart_id))
+            if entry is None or entry.etag is None:
+                return {}
+            return {'If-None-Match': entry.etag}
+
+    def cached_details(self, cart_id: str) -> Optional[str]:
+        """Texto de la copia local después de un 304, o None si ya no está"""
+        with self._lock:
+            entry = self._carts.get(str(cart_id))
+            if entry is None:
+                return None
+            self._carts.move_to_end(str(cart_id))
+            self.not_modified += 1
+            if entry.formatted is None:
+                entry.formatted = format_cart_details(str(cart_id), entry.data)
+            return entry.formatted
+
+    def refresh(self, cart_id: str, response) -> str:
+        """Guarda el carrito descargado (200) como copia y retorna su texto"""
+        data = response.json()
+        formatted = format_cart_details(str(cart_id), data)
+        with self._lock:
+            self.full_fetches += 1
+        self.store(cart_id, data, response.headers.get('ETag'), formatted)
+        return formatted
+
+    def store(self, cart_id: str, data: Dict, etag: Optional[str], formatted: Optional[str] = None):
+        """Reemplaza la copia por el carrito completo que devolvió el backend"""
+        if not self.enabled or etag is None:
+            self.invalidate(cart_id)
+            return
+        entry = _MirroredCart(etag, data)
+        entry.formatted = formatted
+        with self._lock:
+            self._carts[str(cart_id)] = entry
+            self._carts.move_to_end(str(cart_id))
+            while len(self._carts) > self.max_carts:
+                self._carts.popitem(last=False)
+
+    def invalidate(self, cart_id: str):
+        with self._lock:
+            if self._carts.pop(str(cart_id), None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            fetches = self.not_modified + self.full_fetches
+            return {
+                "carts": len(self._carts),
+                "not_modified": self.not_modified,
+                "full_fetches": self.full_fetches,
+                "invalidations": self.invalidations,
+                "revalidation_rate": round(self.not_modified / fetches, 4) if fetches else 0.0,
+            }
+
+
+# Compartido por las herramientas sync y async
+cart_mirror = CartMirror()
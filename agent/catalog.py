@@ -0,0 +1,70 @@
+import csv
+import os
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+# Catálogo fuente del backend (ver backend/doc/products.sql)
+DEFAULT_CATALOG_CSV = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'doc', 'products.csv'
+)
+
+
+def fold_text(value: str) -> str:
+    """Minúsculas y sin acentos: 'Pantalón' -> 'pantalon'"""
+    decomposed = unicodedata.normalize('NFKD', value.strip().lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def iter_catalog_rows(path: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """Lee el CSV del catálogo fila por fila, sin cargarlo completo en memoria"""
+    with open(path or DEFAULT_CATALOG_CSV, newline='', encoding='utf-8-sig') as f:
+        yield from csv.DictReader(f)
+
+
+def parse_available(value: str) -> bool:
+    """Columna DISPONIBLE del CSV: 'Sí' / 'No'"""
+    return value.strip().lower() in ('sí', 'si', 'true', '1')
+
+
+def _price(value: str) -> str:
+    # El backend serializa las columnas decimal de Postgres como string
+    return f"{float(value):.2f}"
+
+
+def load_catalog_csv(path: Optional[str] = None) -> List[dict]:
+    """
+    Agrupa las filas del CSV en productos con variantes, con la misma forma
+    que devuelven /products/search y /products/{id}.
+    Igual que products.sql, cada TIPO_PRENDA es un producto y cada fila una variante.
+    """
+    now = datetime.now().isoformat()
+    products: Dict[str, dict] = {}
+
+    for row in iter_catalog_rows(path):
+        name = row['TIPO_PRENDA'].strip()
+        product = products.get(name)
+        if product is None:
+            product = products[name] = {
+                'id': len(products) + 1,
+                'name': name,
+                'description': row['DESCRIPCIÓN'].strip(),
+                'category': row['CATEGORÍA'].strip(),
+                'createdAt': now,
+                'updatedAt': now,
+                'variants': [],
+            }
+        product['variants'].append({
+            'id': int(row['ID']),
+            'size': row['TALLA'].strip(),
+            'color': row['COLOR'].strip(),
+            'stock': int(row['CANTIDAD_DISPONIBLE']),
+            'price50U': _price(row['PRECIO_50_U']),
+            'price100U': _price(row['PRECIO_100_U']),
+            'price200U': _price(row['PRECIO_200_U']),
+            'isAvailable': parse_available(row['DISPONIBLE']),
+            'createdAt': now,
+            'updatedAt': now,
+        })
+
+    return list(products.values())
@@ -0,0 +1,296 @@
+"""
+Carga products.csv (o un catálogo real de millones de filas con las mismas
+columnas) en las tablas products / product_variants del backend.
+
+    cd agent && python catalog_loader.py ../backend/doc/products.csv --mode copy
+    cd agent && python catalog_loader.py catalogo.csv --mode upsert --batch-size 20000
+    cd agent && python catalog_loader.py catalogo.csv --dry-run
+
+El CSV se lee como generador y se procesa por lotes, así la memoria depende del
+tamaño del lote y de la cantidad de productos distintos, no de las filas:
+  copy:    COPY de cada lote directo a product_variants (carga inicial, tabla vacía)
+  upsert:  COPY del lote a una tabla temporal y INSERT ... ON CONFLICT que solo
+           escribe las variantes nuevas o con algún valor distinto
+Cada fila del CSV es una variante (su ID se respeta como product_variants.id) y
+cada TIPO_PRENDA un producto, igual que products.sql. Los valores solo se
+canonicalizan de forma exacta ('verde' -> 'Verde', 'green' -> 'Verde'); un valor
+nuevo ('Short', 'XXXL') se escribe tal cual, nunca se "corrige" a uno parecido.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from catalog import DEFAULT_CATALOG_CSV, iter_catalog_rows, parse_available
+from instrumentation import logger
+from normalization import get_normalizer
+from pricing import format_cents, to_cents
+
+load_dotenv()
+
+BATCH_SIZE = int(os.getenv('CATALOG_LOADER_BATCH_SIZE', '10000'))
+
+VARIANT_COLUMNS = (
+    'id', 'product_id', 'size', 'color', 'stock',
+    'price_50_u', 'price_100_u', 'price_200_u', 'is_available',
+)
+# Columnas que deciden si una variante cambió (todas menos el id)
+_COMPARED = VARIANT_COLUMNS[1:]
+
+_UPSERT_VARIANTS = f"""
+INSERT INTO product_variants ({', '.join(VARIANT_COLUMNS)}, created_at, updated_at)
+SELECT DISTINCT ON (id) {', '.join(VARIANT_COLUMNS)}, NOW(), NOW()
+FROM catalog_stage
+ORDER BY id, seq DESC
+ON CONFLICT (id) DO UPDATE SET
+    {', '.join(f'{c} = EXCLUDED.{c}' for c in _COMPARED)},
+    updated_at = NOW()
+WHERE ({', '.join(f'product_variants.{c}' for c in _COMPARED)})
+    IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in _COMPARED)})
+RETURNING (xmax = 0)
+"""
+
+_UPSERT_PRODUCTS = """
+INSERT INTO products (name, description, category, created_at, updated_at)
+VALUES %s
+ON CONFLICT (name) DO UPDATE SET
+    description = EXCLUDED.description,
+    category = EXCLUDED.category,
+    updated_at = NOW()
+WHERE (products.description, products.category)
+    IS DISTINCT FROM (EXCLUDED.description, EXCLUDED.category)
+"""
+
+
+class CatalogRowError(ValueError):
+    pass
+
+
+class LoadStats:
+    """Contadores de una carga; rows_per_second sobre las filas leídas del CSV"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.rejected = 0
+        self.batches = 0
+        self.products = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "products": self.products,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "elapsed_s": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+@lru_cache(maxsize=65536)
+def _normalized(field: str, value: str) -> str:
+    # Los catálogos repiten pocos valores distintos millones de veces
+    value = " ".join(value.split())
+    return get_normalizer().canonical(field, value) or value
+
+
+def parse_row(row: Dict[str, str]) -> Tuple[Tuple[str, str, str], tuple]:
+    """
+    Fila del CSV -> ((nombre, descripción, categoría) del producto, variante con
+    el nombre del producto en lugar de product_id). CatalogRowError si no se puede leer.
+    """
+    try:
+        product = (
+            _normalized('name', row['TIPO_PRENDA']),
+            row['DESCRIPCIÓN'].strip(),
+            _normalized('category', row['CATEGORÍA']),
+        )
+        variant = (
+            int(row['ID']),
+            product[0],
+            _normalized('size', row['TALLA']),
+            _normalized('color', row['COLOR']),
+            int(row['CANTIDAD_DISPONIBLE']),
+            format_cents(to_cents(row['PRECIO_50_U'])),
+            format_cents(to_cents(row['PRECIO_100_U'])),
+            format_cents(to_cents(row['PRECIO_200_U'])),
+            parse_available(row['DISPONIBLE']),
+        )
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise CatalogRowError(f"Fila inválida {row.get('ID')!r}: {e}") from e
+    return product, variant
+
+
+def iter_batches(rows: Iterable[Dict[str, str]], size: int, stats: LoadStats) -> Iterator[List[tuple]]:
+    """Lotes de filas ya parseadas; las filas inválidas se cuentan y se saltean"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        parsed = []
+        for row in chunk:
+            stats.rows += 1
+            try:
+                parsed.append(parse_row(row))
+            except CatalogRowError as e:
+                stats.rejected += 1
+                if stats.rejected <= 10:
+                    logger.warning("%s", e)
+        yield parsed
+
+
+def database_dsn() -> str:
+    """CATALOG_DATABASE_URL o las mismas variables TYPEORM_* que usa el backend"""
+    url = os.getenv('CATALOG_DATABASE_URL')
+    if url:
+        return url
+    return (
+        f"host={os.getenv('TYPEORM_HOST', 'localhost')} port={os.getenv('TYPEORM_PORT', '5432')} "
+        f"user={os.getenv('TYPEORM_USERNAME', 'postgres')} password={os.getenv('TYPEORM_PASSWORD', '')} "
+        f"dbname={os.getenv('TYPEORM_DATABASE', 'postgres')}"
+    )
+
+
+class CatalogLoader:
+    """Escribe lotes de (producto, variante) en Postgres con COPY o upsert incremental"""
+
+    def __init__(self, connection, mode: str = 'upsert'):
+        if mode not in ('copy', 'upsert'):
+            raise ValueError(f"Modo de carga desconocido: {mode}")
+        self.connection = connection
+        self.mode = mode
+        # nombre -> id; lo único que crece con el catálogo (uno por producto, no por fila)
+        self.product_ids: Dict[str, int] = {}
+        if mode == 'upsert':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS catalog_stage ("
+                    "seq bigint, id integer, product_id integer, size varchar(50), color varchar(50), "
+                    "stock integer, price_50_u numeric(10,2), price_100_u numeric(10,2), "
+                    "price_200_u numeric(10,2), is_available boolean)"
+                )
+
+    def _ensure_products(self, cursor, batch: List[tuple], stats: LoadStats):
+        from psycopg2.extras import execute_values
+
+        new = {}
+        for product, _ in batch:
+            if product[0] not in self.product_ids and product[0] not in new:
+                new[product[0]] = product
+        if not new:
+            return
+        # La primera fila de cada producto define su descripción y categoría
+        execute_values(cursor, _UPSERT_PRODUCTS, list(new.values()),
+                       template="(%s, %s, %s, NOW(), NOW())")
+        cursor.execute("SELECT name, id FROM products WHERE name = ANY(%s)", (list(new),))
+        self.product_ids.update(cursor.fetchall())
+        stats.products += len(new)
+
+    def _copy(self, cursor, table: str, columns: Iterable[str], rows: Iterable[tuple]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    def write_batch(self, batch: List[tuple], stats: LoadStats):
+        with self.connection.cursor() as cursor:
+            self._ensure_products(cursor, batch, stats)
+            ids = self.product_ids
+            if self.mode == 'copy':
+                self._copy(cursor, 'product_variants', VARIANT_COLUMNS,
+                           ((v[0], ids[v[1]]) + v[2:] for _, v in batch))
+                stats.inserted += len(batch)
+            else:
+                cursor.execute("TRUNCATE catalog_stage")
+                self._copy(cursor, 'catalog_stage', ('seq',) + VARIANT_COLUMNS,
+                           ((seq, v[0], ids[v[1]]) + v[2:] for seq, (_, v) in enumerate(batch)))
+                cursor.execute(_UPSERT_VARIANTS)
+                written = cursor.fetchall()
+                inserted = sum(1 for (is_insert,) in written if is_insert)
+                stats.inserted += inserted
+                stats.updated += len(written) - inserted
+                stats.unchanged += len(batch) - len(written)
+        self.connection.commit()
+        stats.batches += 1
+
+    def finish(self):
+        # Las variantes llevan el ID del CSV: la secuencia sigue desde el máximo
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence('product_variants', 'id'), "
+                "COALESCE((SELECT MAX(id) FROM product_variants), 1))"
+            )
+        self.connection.commit()
+
+
+def load_catalog(path: str, mode: str = 'upsert', batch_size: int = BATCH_SIZE,
+                 connection=None, dry_run: bool = False, progress_every: int = 10) -> LoadStats:
+    """
+    Carga el CSV por lotes. Con dry_run solo lee, normaliza y agrupa (sirve para
+    validar un archivo o medir el parseo sin base de datos).
+    """
+    stats = LoadStats()
+    loader = None
+    if not dry_run:
+        if connection is None:
+            import psycopg2
+            connection = psycopg2.connect(database_dsn())
+        loader = CatalogLoader(connection, mode)
+
+    seen_products = set()
+    for batch in iter_batches(iter_catalog_rows(path), batch_size, stats):
+        if loader is not None:
+            loader.write_batch(batch, stats)
+        else:
+            for product, _ in batch:
+                if product[0] not in seen_products:
+                    seen_products.add(product[0])
+                    stats.products += 1
+            stats.batches += 1
+        if progress_every and stats.batches % progress_every == 0:
+            print(f"{stats.rows} filas, {stats.rows_per_second:,.0f} filas/s", file=sys.stderr)
+
+    if loader is not None:
+        loader.finish()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga el catálogo CSV en Postgres por lotes')
+    parser.add_argument('csv', nargs='?', default=DEFAULT_CATALOG_CSV)
+    parser.add_argument('--mode', choices=('copy', 'upsert'), default='upsert')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help='Solo leer y normalizar, sin escribir')
+    args = parser.parse_args()
+
+    stats = load_catalog(args.csv, args.mode, args.batch_size, dry_run=args.dry_run)
+    for key, value in stats.as_dict().items():
+        print(f"{key:<16}{value}")
+
+
+if __name__ == '__main__':
+    main()
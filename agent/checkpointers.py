@@ -0,0 +1,419 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Set, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+load_dotenv()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    channel_versions TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpointer persistente en SQLite.
+
+    Cada checkpoint guarda solo la metadata y las versiones de los canales; los
+    valores de cada canal se escriben en checkpoint_blobs una vez por versión,
+    así un paso del grafo solo persiste los canales que cambió. Ojo: el valor
+    del canal `messages` es la lista completa, de modo que cada versión nueva
+    guarda todo el historial y no solo los mensajes agregados; lo que acota el
+    almacenamiento de una conversación larga es el pruning.
+
+    Por thread se conservan los últimos `keep_last` checkpoints; los blobs que
+    dejan de estar referenciados se borran en el mismo pruning.
+    """
+
+    def __init__(self, path: str, keep_last: int = 10, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_last = keep_last
+        # Una conexión por proceso; el lock serializa los hilos y WAL + busy_timeout
+        # permiten varios procesos escribiendo la misma base
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _write(self, fn, *args):
+        """Ejecuta fn dentro de una transacción de escritura"""
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(cursor, *args)
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            return result
+
+    # --- escritura ---
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint,
+            metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")
+
+        # Serializar fuera del lock: es la parte cara
+        blobs = [
+            (thread_id, checkpoint_ns, channel, str(version),
+             *(self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)))
+            for channel, version in new_versions.items()
+        ]
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(c)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        channel_versions = json.dumps({k: str(v) for k, v in checkpoint["channel_versions"].items()})
+        row = (
+            thread_id, checkpoint_ns, checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            checkpoint_type, checkpoint_blob, metadata_type, metadata_blob, channel_versions,
+        )
+
+        def _put(cursor):
+            cursor.executemany(
+                "INSERT OR IGNORE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?)", blobs
+            )
+            cursor.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+            )
+            self._prune(cursor, thread_id, checkpoint_ns)
+
+        self._write(_put)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple],
+                   task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = [
+            (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+             channel, *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        # Las escrituras especiales (errores, interrupts) reemplazan; el resto son idempotentes
+        verb = "INSERT OR REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "INSERT OR IGNORE"
+
+        def _put_writes(cursor):
+            cursor.executemany(
+                f"{verb} INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+        self._write(_put_writes)
+
+    def _prune(self, cursor, thread_id: str, checkpoint_ns: str):
+        """Conserva los últimos keep_last checkpoints del thread y sus blobs"""
+        if self.keep_last <= 0:
+            return
+        stale = cursor.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last),
+        ).fetchall()
+        if not stale:
+            return
+        cursor.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            [(thread_id, checkpoint_ns, row[0]) for row in stale],
+        )
+        cursor.executemany(
+            "DELETE FROM checkpoint_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            [(thread_id, checkpoint_ns, row[0]) for row in stale],
+        )
+        cursor.execute(
+            """
+            DELETE FROM checkpoint_blobs
+            WHERE thread_id = ? AND checkpoint_ns = ?
+              AND NOT EXISTS (
+                SELECT 1 FROM checkpoints c, json_each(c.channel_versions) v
+                WHERE c.thread_id = checkpoint_blobs.thread_id
+                  AND c.checkpoint_ns = checkpoint_blobs.checkpoint_ns
+                  AND v.key = checkpoint_blobs.channel
+                  AND v.value = checkpoint_blobs.version
+              )
+            """,
+            (thread_id, checkpoint_ns),
+        )
+
+    def delete_thread(self, thread_id: str) -> None:
+        def _delete(cursor):
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                cursor.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+        self._write(_delete)
+
+    # --- lectura ---
+
+    def _load_tuple(self, row) -> CheckpointTuple:
+        (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+         checkpoint_type, checkpoint_blob, metadata_type, metadata_blob, channel_versions) = row
+        checkpoint: Checkpoint = self.serde.loads_typed((checkpoint_type, checkpoint_blob))
+        versions = json.loads(channel_versions)
+
+        with self._lock:
+            blob_rows = self.conn.execute(
+                "SELECT channel, version, type, blob FROM checkpoint_blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel IN (%s)"
+                % ",".join("?" * len(versions)),
+                (thread_id, checkpoint_ns, *versions.keys()),
+            ).fetchall() if versions else []
+            write_rows = self.conn.execute(
+                "SELECT task_id, channel, type, blob FROM checkpoint_writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+                "ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+
+        channel_values = {
+            channel: self.serde.loads_typed((blob_type, blob))
+            for channel, version, blob_type, blob in blob_rows
+            if versions.get(channel) == version and blob_type != "empty"
+        }
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((write_type, blob)))
+                for task_id, channel, write_type, blob in write_rows
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if checkpoint_id:
+                row = self.conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                # Los ids de checkpoint (uuid6) ordenan cronológicamente
+                row = self.conn.execute(
+                    "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+        return self._load_tuple(row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = "SELECT * FROM checkpoints"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[6], row[7]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._load_tuple(row)
+
+    # --- versiones async: SQLite es local, se delega a un hilo ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple],
+                          task_id: str, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class PruningMemorySaver(MemorySaver):
+    """
+    MemorySaver que conserva solo los últimos `keep_last` checkpoints de cada
+    thread. MemorySaver guarda todos los checkpoints de la conversación con sus
+    blobs, así que sin pruning la memoria de una sesión larga crece sin límite
+    aunque trim_history acote los mensajes del estado actual.
+    """
+
+    def __init__(self, keep_last: int = 10, serde=None):
+        super().__init__(serde=serde)
+        self.keep_last = keep_last
+        self._prune_lock = threading.Lock()
+        # (thread_id, checkpoint_ns) -> checkpoint_id -> versiones de sus canales
+        self._versions: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        # (thread_id, checkpoint_ns) -> claves de self.blobs del thread
+        self._blob_keys: Dict[Tuple[str, str], Set[tuple]] = defaultdict(set)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint,
+            metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._prune_lock:
+            key = (thread_id, checkpoint_ns)
+            self._versions[key][checkpoint["id"]] = dict(checkpoint["channel_versions"])
+            self._blob_keys[key].update(
+                (thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items()
+            )
+            self._prune(thread_id, checkpoint_ns)
+        return result
+
+    def _prune(self, thread_id: str, checkpoint_ns: str):
+        """Conserva los últimos keep_last checkpoints del thread y sus blobs"""
+        key = (thread_id, checkpoint_ns)
+        versions = self._versions[key]
+        if self.keep_last <= 0 or len(versions) <= self.keep_last:
+            return
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        # Los ids de checkpoint (uuid6) ordenan cronológicamente
+        for checkpoint_id in sorted(versions)[:-self.keep_last]:
+            del versions[checkpoint_id]
+            checkpoints.pop(checkpoint_id, None)
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        referenced = {
+            (channel, version)
+            for channel_versions in versions.values()
+            for channel, version in channel_versions.items()
+        }
+        blob_keys = self._blob_keys[key]
+        for blob_key in [k for k in blob_keys if (k[2], k[3]) not in referenced]:
+            blob_keys.discard(blob_key)
+            self.blobs.pop(blob_key, None)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self._prune_lock:
+            for key in [k for k in self._versions if k[0] == thread_id]:
+                del self._versions[key]
+            for key in [k for k in self._blob_keys if k[0] == thread_id]:
+                del self._blob_keys[key]
+
+
+def make_checkpointer(backend: Optional[str] = None) -> BaseCheckpointSaver:
+    """
+    Crea el checkpointer configurado en CHECKPOINT_BACKEND:
+    'memory' (por defecto, se pierde al reiniciar) o 'sqlite'. Ambos
+    conservan los últimos CHECKPOINT_KEEP_LAST checkpoints por thread.
+    """
+    backend = (backend or os.getenv('CHECKPOINT_BACKEND', 'memory')).lower()
+    keep_last = int(os.getenv('CHECKPOINT_KEEP_LAST', '10'))
+    if backend == 'memory':
+        return PruningMemorySaver(keep_last=keep_last)
+    if backend == 'sqlite':
+        return SQLiteCheckpointSaver(
+            os.getenv('CHECKPOINT_DB_PATH', 'agent_checkpoints.sqlite'),
+            keep_last=keep_last,
+        )
+    raise ValueError(f"CHECKPOINT_BACKEND desconocido: {backend}")
@@ -0,0 +1,171 @@
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+
+load_dotenv()
+
+CART_CREATED_PATTERN = re.compile(r"Carrito creado exitosamente! ID: (\w+)")
+# Argumentos de search_products que definen el contexto de búsqueda activo
+FILTER_KEYS = ("category", "color", "size", "name", "min_price", "max_price", "page")
+
+
+class CompactionStats:
+    """Tokens (aproximados) del prompt antes y después de compactar"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.last_before = 0
+        self.last_after = 0
+
+    def record(self, before: int, after: int):
+        with self._lock:
+            self.calls += 1
+            self.tokens_before += before
+            self.tokens_after += after
+            self.last_before = before
+            self.last_after = after
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "last_tokens_before": self.last_before,
+                "last_tokens_after": self.last_after,
+                "total_tokens_before": self.tokens_before,
+                "total_tokens_after": self.tokens_after,
+                "saved_ratio": round(1 - self.tokens_after / self.tokens_before, 4) if self.tokens_before else 0.0,
+            }
+
+
+compaction_stats = CompactionStats()
+
+
+def extract_session_facts(messages: List[BaseMessage], state: Optional[dict] = None) -> Dict:
+    """
+    Recorre el historial y recupera lo que no debe perderse al compactar:
+    el carrito activo, los últimos filtros de búsqueda y las preferencias.
+    """
+    state = state or {}
+    cart_id = state.get("cart_id")
+    active_filters = dict(state.get("active_filters") or {})
+    preferences = dict(state.get("user_preferences") or {})
+
+    for message in messages:
+        if isinstance(message, AIMessage):
+            for call in message.tool_calls:
+                args = call.get("args") or {}
+                if args.get("cart_id"):
+                    cart_id = str(args["cart_id"])
+                if call.get("name") == "search_products":
+                    active_filters = {k: v for k, v in args.items() if k in FILTER_KEYS and v is not None}
+                    if args.get("color"):
+                        preferences["preferred_color"] = args["color"]
+                    if args.get("size"):
+                        preferences["preferred_size"] = args["size"]
+        elif isinstance(message, ToolMessage) and message.name == "create_cart":
+            match = CART_CREATED_PATTERN.search(str(message.content))
+            if match:
+                cart_id = match.group(1)
+
+    return {
+        "cart_id": cart_id,
+        "active_filters": active_filters,
+        "user_preferences": preferences,
+    }
+
+
+def _summarize_tool_output(message: ToolMessage, max_chars: int) -> ToolMessage:
+    content = str(message.content)
+    if len(content) <= max_chars:
+        return message
+    head = content[:max_chars].rsplit("\n", 1)[0]
+    return ToolMessage(
+        content=f"{head}\n[resultado anterior de {message.name} compactado: {len(content)} caracteres]",
+        tool_call_id=message.tool_call_id,
+        name=message.name,
+        id=message.id,
+    )
+
+
+def compact_messages(messages: List[BaseMessage], budget: int,
+                     keep_tool_results: int = 2, summary_chars: int = 200) -> List[BaseMessage]:
+    """
+    Reduce el historial que se envía al LLM:
+    1. Los resultados de herramientas de turnos anteriores, salvo los últimos
+       keep_tool_results, se recortan a un resumen de summary_chars. Los del
+       turno actual (después del último mensaje humano) nunca se recortan:
+       el LLM todavía no los leyó.
+    2. Si aún se excede el presupuesto, se descartan turnos completos desde
+       el más viejo (siempre cortando en un mensaje humano).
+    """
+    current_turn = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+    tool_indexes = [i for i, m in enumerate(messages[:current_turn]) if isinstance(m, ToolMessage)]
+    stale = set(tool_indexes[:-keep_tool_results] if keep_tool_results else tool_indexes)
+    compacted = [
+        _summarize_tool_output(m, summary_chars) if i in stale else m
+        for i, m in enumerate(messages)
+    ]
+
+    full = compacted
+    turn_starts = [i for i, m in enumerate(full) if isinstance(m, HumanMessage)]
+    for start in turn_starts[1:]:
+        if count_tokens_approximately(compacted) <= budget:
+            break
+        compacted = full[start:]
+    return compacted
+
+
+def _facts_message(facts: Dict) -> Optional[SystemMessage]:
+    lines = []
+    if facts.get("cart_id"):
+        lines.append(f"- Carrito activo: ID {facts['cart_id']}")
+    if facts.get("active_filters"):
+        filters = ", ".join(f"{k}={v}" for k, v in facts["active_filters"].items())
+        lines.append(f"- Últimos filtros de búsqueda: {filters}")
+    if facts.get("user_preferences"):
+        prefs = ", ".join(f"{k}={v}" for k, v in facts["user_preferences"].items())
+        lines.append(f"- Preferencias del usuario: {prefs}")
+    if not lines:
+        return None
+    return SystemMessage(content="Contexto de la sesión de compras:\n" + "\n".join(lines))
+
+
+def make_compaction_hook(budget: Optional[int] = None, keep_tool_results: Optional[int] = None):
+    """
+    Crea el nodo pre_model_hook del grafo ReAct: compacta el historial que ve
+    el LLM (sin tocar el historial guardado) y actualiza cart_id,
+    active_filters y user_preferences en ShoppingSessionState.
+    """
+    budget = budget or int(os.getenv('PROMPT_TOKEN_BUDGET', '4000'))
+    if keep_tool_results is None:
+        keep_tool_results = int(os.getenv('KEEP_TOOL_RESULTS', '2'))
+
+    def compaction_hook(state: dict) -> dict:
+        messages = state["messages"]
+        facts = extract_session_facts(messages, state)
+
+        compacted = compact_messages(messages, budget, keep_tool_results)
+        facts_message = _facts_message(facts)
+        llm_input = ([facts_message] if facts_message else []) + compacted
+
+        compaction_stats.record(
+            count_tokens_approximately(messages),
+            count_tokens_approximately(llm_input),
+        )
+        return {"llm_input_messages": llm_input, **facts}
+
+    return compaction_hook
@@ -0,0 +1,266 @@
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import ToolException
+
+from catalog import fold_text
+from compaction import extract_session_facts
+from formatters import user_facing
+from instrumentation import metrics
+from normalization import normalize_search_params
+from product_index import get_product_index
+from response_cache import next_page_cursor, search_cache
+from schemas import ProductSearchParams
+
+load_dotenv()
+
+# Comandos sin ambigüedad que no necesitan al LLM. Se comparan contra el
+# mensaje en minúsculas, sin acentos y sin puntuación final.
+_QTY = r"(\d+|un|una|uno|dos|tres|cuatro|cinco|seis|siete|ocho|nueve|diez)"
+CART_PATTERN = re.compile(
+    r"^(?:(?:ver|mostrar|muestrame|mostrame|revisar|que hay en)\s+)?(?:el\s+|mi\s+)?carrito$"
+)
+NEXT_PAGE_PATTERN = re.compile(
+    r"^(?:(?:ver|mostrar)\s+)?(?:la\s+)?(?:siguiente|proxima)\s+pagina$|^(?:ver\s+)?mas\s+resultados$"
+)
+PREVIOUS_PAGE_PATTERN = re.compile(r"^(?:(?:ver|volver a)\s+)?(?:la\s+)?pagina\s+anterior$")
+GOTO_PAGE_PATTERN = re.compile(r"^(?:(?:ir\s+a|ver)\s+)?(?:la\s+)?pagina\s+(\d+)$")
+ADD_ITEM_PATTERN = re.compile(
+    rf"^(?:agrega|agregar|agregame|anade|anadir|suma|sumar|pon|pone)\s+{_QTY}\s+"
+    r"(?:unidad(?:es)?\s+)?(?:del?|de\s+la)\s+(?:variante\s+)?(?:id\s*)?(\d+)(?:\s+al\s+carrito)?$"
+)
+COMMAND_PATTERNS = (CART_PATTERN, NEXT_PAGE_PATTERN, PREVIOUS_PAGE_PATTERN, GOTO_PAGE_PATTERN, ADD_ITEM_PATTERN)
+NUMBER_WORDS = {
+    "un": 1, "una": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10,
+}
+
+
+def _clean(message: str) -> str:
+    return " ".join(fold_text(message).strip(" .!?¡¿").split())
+
+
+def _quantity(token: str) -> int:
+    return NUMBER_WORDS.get(token) or int(token)
+
+
+def _has_next_page(filters: Dict) -> bool:
+    """
+    Si la última página vista con estos filtros tenía siguiente: hay cursor
+    para la próxima, o lo dice el meta de la búsqueda (cache o índice local).
+    Sin ese dato no se sabe y "siguiente página" queda para el LLM.
+    """
+    try:
+        params = normalize_search_params(ProductSearchParams(**filters))
+    except ValueError:
+        return False
+    if next_page_cursor(params.model_copy(update={"page": (params.page or 1) + 1})):
+        return True
+    index = get_product_index()
+    data = index.search(params) if index is not None else search_cache.get(params.cache_key())
+    return bool(data and (data.get('meta') or {}).get('hasNextPage'))
+
+
+UNEXPECTED_ERROR_REPLY = "No pude completar la operación por un error del servidor, intenta de nuevo en un momento."
+
+
+def _tool_error(e: Exception) -> Tuple[str, str]:
+    """
+    (contenido del ToolMessage, respuesta al usuario) para un error de la
+    herramienta; el contenido es el mismo que deja ToolNode(handle_tool_errors=True)
+    """
+    if isinstance(e, ToolException):
+        return str(e), user_facing(str(e))
+    from langgraph.prebuilt.tool_node import TOOL_CALL_ERROR_TEMPLATE
+    return TOOL_CALL_ERROR_TEMPLATE.format(error=repr(e)), UNEXPECTED_ERROR_REPLY
+
+
+class FastPathStats:
+    """Aciertos del router y latencia comparada contra los turnos que pasan por el LLM"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.hits = 0
+        self.by_intent: Dict[str, int] = {}
+        self.fast_seconds = 0.0
+        self.llm_turns = 0
+        self.llm_seconds = 0.0
+
+    def record_hit(self, intent: str, elapsed: float):
+        with self._lock:
+            self.messages += 1
+            self.hits += 1
+            self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+            self.fast_seconds += elapsed
+        metrics.observe("agent_turn_seconds", elapsed, path="fast_path")
+
+    def record_llm_turn(self, elapsed: float):
+        with self._lock:
+            self.messages += 1
+            self.llm_turns += 1
+            self.llm_seconds += elapsed
+        metrics.observe("agent_turn_seconds", elapsed, path="llm")
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            avg_fast = self.fast_seconds / self.hits if self.hits else 0.0
+            avg_llm = self.llm_seconds / self.llm_turns if self.llm_turns else 0.0
+            return {
+                "messages": self.messages,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.messages, 4) if self.messages else 0.0,
+                "by_intent": dict(self.by_intent),
+                "avg_fast_ms": round(avg_fast * 1000, 2),
+                "avg_llm_turn_ms": round(avg_llm * 1000, 2),
+                # Estimado con el promedio de los turnos que sí pasaron por el LLM
+                "estimated_saved_s": round(max(avg_llm - avg_fast, 0.0) * self.hits, 3) if self.llm_turns else None,
+            }
+
+
+class FastPathRouter:
+    """
+    Resuelve comandos simples ("ver carrito", "siguiente página", "agrega 2 del
+    ID 15") llamando directo a las herramientas, con el cart_id y los filtros
+    activos de la sesión. El intercambio se guarda en el thread como una tool
+    call normal, así el LLM lo ve en los turnos siguientes.
+    Todo lo demás (o si falta contexto) sigue por el grafo ReAct.
+    """
+
+    def __init__(self, get_graph: Callable[[], object], tools: List, enabled: Optional[bool] = None):
+        # El grafo se pide al usarlo: con FAST_START se compila recién en el primer turno
+        self._get_graph = get_graph
+        self.tools = {t.name: t for t in tools}
+        if enabled is None:
+            enabled = os.getenv('FAST_PATH', 'on').lower() not in ('off', '0', 'false')
+        self.enabled = enabled
+        self.stats = FastPathStats()
+
+    @property
+    def graph(self):
+        return self._get_graph()
+
+    def match(self, message: str, facts: Dict) -> Optional[Tuple[str, str, Dict]]:
+        """(intent, herramienta, args) si el mensaje es un comando resoluble, si no None"""
+        text = _clean(message)
+        cart_id = facts.get("cart_id")
+        filters = dict(facts.get("active_filters") or {})
+        page = int(filters.get("page") or 1)
+
+        if CART_PATTERN.match(text) and cart_id:
+            return "view_cart", "get_cart_details", {"cart_id": str(cart_id)}
+
+        if filters:
+            if NEXT_PAGE_PATTERN.match(text) and _has_next_page(filters):
+                return "next_page", "search_products", dict(filters, page=page + 1)
+            if PREVIOUS_PAGE_PATTERN.match(text) and page > 1:
+                return "previous_page", "search_products", dict(filters, page=page - 1)
+            goto = GOTO_PAGE_PATTERN.match(text)
+            if goto and int(goto.group(1)) >= 1:
+                return "goto_page", "search_products", dict(filters, page=int(goto.group(1)))
+
+        add = ADD_ITEM_PATTERN.match(text)
+        if add and cart_id:
+            args = {"cart_id": str(cart_id), "product_variant_id": int(add.group(2)), "qty": _quantity(add.group(1))}
+            if args["qty"] > 0:
+                return "add_item", "add_item_to_cart", args
+        return None
+
+    @staticmethod
+    def _is_command(message: str) -> bool:
+        """Chequeo barato antes de leer el estado: la mayoría de los mensajes van al LLM"""
+        text = _clean(message)
+        return any(pattern.match(text) for pattern in COMMAND_PATTERNS)
+
+    @staticmethod
+    def _facts(values: Dict) -> Dict:
+        return extract_session_facts(values.get("messages", []), values)
+
+    def _record(self, message: str, call_id: str, tool_name: str, args: Dict, output: str,
+                status: str, reply: str, facts: Dict) -> dict:
+        if tool_name == "search_products" and status == "success":
+            facts = dict(facts, active_filters=args)
+        return {
+            "messages": [
+                HumanMessage(content=message),
+                AIMessage(content="", tool_calls=[{"name": tool_name, "args": args, "id": call_id}]),
+                ToolMessage(content=output, name=tool_name, tool_call_id=call_id, status=status),
+                AIMessage(content=reply),
+            ],
+            "cart_id": facts.get("cart_id"),
+            "active_filters": facts.get("active_filters") or {},
+        }
+
+    def resolve(self, message: str, config: dict) -> Optional[Dict]:
+        """
+        Ejecuta el comando si corresponde al camino rápido. Retorna {"intent",
+        "tool", "args", "call_id", "output", "status", "reply"} o None para
+        delegar en el LLM. Un error de la herramienta queda en el ToolMessage,
+        igual que en el grafo.
+        """
+        if not self.enabled or not self._is_command(message):
+            return None
+        start = time.perf_counter()
+        facts = self._facts(self.graph.get_state(config).values)
+        matched = self.match(message, facts)
+        if matched is None:
+            return None
+        intent, tool_name, args = matched
+        call_id, status = f"fastpath_{uuid.uuid4().hex[:12]}", "success"
+        try:
+            # Con el configurable del turno las herramientas ven el thread_id (prefetch por sesión)
+            output = self.tools[tool_name].invoke(args, {"configurable": config["configurable"]})
+            reply = user_facing(output)
+        except Exception as e:
+            (output, reply), status = _tool_error(e), "error"
+        self.graph.update_state(
+            config, self._record(message, call_id, tool_name, args, output, status, reply, facts), as_node="agent"
+        )
+        self.stats.record_hit(intent, time.perf_counter() - start)
+        return self._result(intent, call_id, tool_name, args, output, status, reply)
+
+    @staticmethod
+    def _result(intent: str, call_id: str, tool_name: str, args: Dict, output: str,
+                status: str, reply: str) -> Dict:
+        return {
+            "intent": intent, "tool": tool_name, "args": args, "call_id": call_id,
+            "output": output, "status": status, "reply": reply,
+        }
+
+    async def aresolve(self, message: str, config: dict) -> Optional[Dict]:
+        """Versión async de resolve()"""
+        if not self.enabled or not self._is_command(message):
+            return None
+        start = time.perf_counter()
+        facts = self._facts((await self.graph.aget_state(config)).values)
+        matched = self.match(message, facts)
+        if matched is None:
+            return None
+        intent, tool_name, args = matched
+        call_id, status = f"fastpath_{uuid.uuid4().hex[:12]}", "success"
+        try:
+            output = await self.tools[tool_name].ainvoke(args, {"configurable": config["configurable"]})
+            reply = user_facing(output)
+        except Exception as e:
+            (output, reply), status = _tool_error(e), "error"
+        await self.graph.aupdate_state(
+            config, self._record(message, call_id, tool_name, args, output, status, reply, facts), as_node="agent"
+        )
+        self.stats.record_hit(intent, time.perf_counter() - start)
+        return self._result(intent, call_id, tool_name, args, output, status, reply)
+
+    def route(self, message: str, config: dict) -> Optional[str]:
+        """Respuesta del camino rápido, o None para delegar en el LLM"""
+        result = self.resolve(message, config)
+        return result["reply"] if result is not None else None
+
+    async def aroute(self, message: str, config: dict) -> Optional[str]:
+        """Versión async de route()"""
+        result = await self.aresolve(message, config)
+        return result["reply"] if result is not None else None
@@ -0,0 +1,314 @@
+import json
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from catalog import fold_text
+from pricing import format_cents, quote_cart, what_if_line
+
+load_dotenv()
+
+# Formateo de respuestas del backend, compartido por las herramientas sync y async.
+# Todo lo que devuelve una herramienta vuelve al LLM en cada paso siguiente, así que
+# además del formato original (verbose) hay dos modos densos:
+#   compact: tabla con separador '|' y variantes agrupadas por color
+#   kv:      una línea key=value por registro
+OUTPUT_MODES = ("verbose", "compact", "kv")
+_output_mode = os.getenv('TOOL_OUTPUT_MODE', 'verbose').lower()
+MAX_ITEMS = int(os.getenv('TOOL_OUTPUT_MAX_ITEMS', '20'))
+# Separa la parte para el usuario del JSON crudo que el formato verbose agrega para el agente
+AGENT_CONTEXT_MARKER = "\n\n🔍 **Datos completos del carrito:**"
+
+
+def set_output_mode(mode: str) -> None:
+    global _output_mode
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"Modo de salida desconocido: {mode}")
+    _output_mode = mode
+
+
+def get_output_mode() -> str:
+    return _output_mode
+
+
+def _is_available(variant: dict) -> bool:
+    return bool(variant.get('isAvailable', False)) and variant.get('stock', 0) > 0
+
+
+def _truncated(lines: list, limit: int) -> list:
+    if len(lines) <= limit:
+        return lines
+    return lines[:limit] + [f"(+{len(lines) - limit} más)"]
+
+
+def _page_line(meta: dict) -> str:
+    line = f"pag={meta.get('page', 1)}/{meta.get('pageCount', 1)} total={meta.get('itemCount', 0)}"
+    if meta.get('hasNextPage'):
+        line += " hay_mas=si"
+    return line
+
+
+def _price50(variant: dict) -> float:
+    try:
+        return float(variant.get('price50U'))
+    except (TypeError, ValueError):
+        return float('inf')
+
+
+def best_variant(variants: list, color: Optional[str] = None, size: Optional[str] = None) -> Optional[dict]:
+    """
+    Variante a mostrar para un producto de la búsqueda, en una sola pasada:
+    disponible, con stock y del color/talla pedidos. Entre esas gana la de
+    menor precio50 y, a igual precio, la de más stock. None si ninguna se
+    puede comprar.
+    """
+    color = fold_text(color) if color else None
+    size = fold_text(size) if size else None
+    best, best_rank = None, None
+    for variant in variants or ():
+        if not _is_available(variant):
+            continue
+        if color and fold_text(variant.get('color') or '') != color:
+            continue
+        if size and fold_text(variant.get('size') or '') != size:
+            continue
+        rank = (_price50(variant), -variant.get('stock', 0))
+        if best_rank is None or rank < best_rank:
+            best, best_rank = variant, rank
+    return best
+
+
+def format_search_results(data: dict, mode: Optional[str] = None,
+                          color: Optional[str] = None, size: Optional[str] = None) -> str:
+    """
+    Formatea la respuesta paginada de /products/search con la mejor variante
+    comprable de cada producto (ver best_variant), así el agente puede
+    agregarla al carrito sin pedir el detalle.
+    """
+    mode = mode or _output_mode
+    if mode == "compact":
+        return _compact_search_results(data, color, size)
+    if mode == "kv":
+        return _kv_search_results(data, color, size)
+    if not data.get('data'):
+        return "No se encontraron productos con los filtros especificados."
+
+    products = []
+    for item in data['data']:
+        variant = best_variant(item.get('variants'), color, size)
+        line = f"• {item.get('name', 'Sin nombre')} (ID: {item.get('id')})"
+        if variant is None:
+            line += f" - Sin variantes disponibles - {item.get('category', '')}"
+        else:
+            line += (f" - {item.get('category', '')} - Variante ID {variant.get('id')}:"
+                     f" Talla {variant.get('size', 'N/A')} - {variant.get('color', 'N/A')}"
+                     f" - ${variant.get('price50U', 'N/A')} - Stock: {variant.get('stock', 0)}")
+        products.append(line)
+
+    # Información de paginación según example.json
+    meta = data.get('meta', {})
+    total_pages = meta.get('pageCount', 1)
+    current_page = meta.get('page', 1)
+    item_count = meta.get('itemCount', 0)
+
+    result = f"Productos encontrados ({item_count} resultados):\n"
+    result += "\n".join(products)
+    result += f"\n\nPágina {current_page} de {total_pages}"
+
+    if meta.get('hasNextPage'):
+        result += f"\n💡 Hay más resultados. Puedes pedir 'siguiente página' para ver más."
+
+    return result
+
+
+def _compact_search_results(data: dict, color: Optional[str] = None, size: Optional[str] = None) -> str:
+    if not data.get('data'):
+        return "sin resultados"
+    rows = ["id|nombre|categoria|variant_id|talla|color|precio50|stock"]
+    for item in data['data']:
+        variant = best_variant(item.get('variants'), color, size) or {}
+        rows.append(
+            f"{item.get('id')}|{item.get('name', '')}|{item.get('category', '')}|{variant.get('id', '-')}"
+            f"|{variant.get('size', '-')}|{variant.get('color', '-')}|{variant.get('price50U', '-')}|{variant.get('stock', 0)}"
+        )
+    return "\n".join(_truncated(rows, MAX_ITEMS + 1) + [_page_line(data.get('meta', {}))])
+
+
+def _kv_search_results(data: dict, color: Optional[str] = None, size: Optional[str] = None) -> str:
+    if not data.get('data'):
+        return "sin resultados"
+    rows = []
+    for item in data['data']:
+        row = f"id={item.get('id')} name={item.get('name', '')} cat={item.get('category', '')}"
+        variant = best_variant(item.get('variants'), color, size)
+        if variant is None:
+            row += " sin_stock=si"
+        else:
+            row += (f" variant_id={variant.get('id')} size={variant.get('size', '-')} color={variant.get('color', '-')}"
+                    f" price={variant.get('price50U', '-')} stock={variant.get('stock', 0)}")
+        rows.append(row)
+    return "\n".join(_truncated(rows, MAX_ITEMS) + [_page_line(data.get('meta', {}))])
+
+
+def format_ranked_products(query: str, hits: list, mode: Optional[str] = None) -> str:
+    """Formatea los RankedHit de ranking.py con los filtros para search_products"""
+    mode = mode or _output_mode
+    if not hits:
+        return "sin resultados" if mode != "verbose" else f"No encontré productos relacionados con \"{query}\"."
+    if mode == "compact":
+        rows = ["id|nombre|categoria|score"]
+        rows += [f"{h.product_id}|{h.name}|{h.category}|{h.score}" for h in hits]
+        return "\n".join(rows)
+    if mode == "kv":
+        return "\n".join(f"id={h.product_id} name={h.name} cat={h.category} score={h.score}" for h in hits)
+
+    lines = [f"Productos relacionados con \"{query}\" (más relevante primero):"]
+    for hit in hits:
+        lines.append(f"• {hit.name} (ID: {hit.product_id}) - {hit.category} - relevancia {hit.score}")
+    lines.append("💡 Usa search_products con el nombre y la categoría para ver variantes y precios.")
+    return "\n".join(lines)
+
+
+def format_product_details(product: dict, mode: Optional[str] = None) -> str:
+    """Formatea el detalle de /products/{id} con sus variantes"""
+    mode = mode or _output_mode
+    if mode == "compact":
+        return _compact_product_details(product)
+    if mode == "kv":
+        return _kv_product_details(product)
+    details = f"""
+📦 **{product.get('name', 'Sin nombre')}**
+📂 Categoría: {product.get('category', 'N/A')}
+📋 Descripción: {product.get('description', 'Sin descripción')}
+
+🎽 **Variantes disponibles:**
+"""
+
+    # Parsear variants correctamente
+    variants = product.get('variants', [])
+    if variants:
+        # Agrupar por talla y color para mostrar disponibilidad
+        available_variants = []
+        unavailable_variants = []
+
+        for variant in variants:
+            variant_info = f"  • Talla {variant.get('size', 'N/A')} - {variant.get('color', 'N/A')} - ${variant.get('price50U', 'N/A')} - Stock: {variant.get('stock', 0)}"
+
+            if variant.get('isAvailable', False) and variant.get('stock', 0) > 0:
+                available_variants.append(variant_info + " ✅")
+            else:
+                unavailable_variants.append(variant_info + " ❌")
+
+        if available_variants:
+            details += "\n🟢 **Disponibles:**\n" + "\n".join(available_variants)
+
+        if unavailable_variants:
+            details += "\n\n🔴 **No disponibles:**\n" + "\n".join(unavailable_variants)
+    else:
+        details += "\nNo hay variantes disponibles"
+
+    return details.strip()
+
+
+def _compact_product_details(product: dict) -> str:
+    """Variantes disponibles agrupadas por color: talla:variant_id:precio:stock"""
+    lines = [f"{product.get('name', '')} id={product.get('id')} cat={product.get('category', '')}"]
+    by_color = OrderedDict()
+    unavailable = 0
+    for variant in product.get('variants', []):
+        if not _is_available(variant):
+            unavailable += 1
+            continue
+        by_color.setdefault(variant.get('color', '-'), []).append(
+            f"{variant.get('size', '-')}:{variant.get('id')}:{variant.get('price50U', '-')}:{variant.get('stock', 0)}"
+        )
+    if by_color:
+        lines.append("color|talla:variant_id:precio50:stock")
+        rows = [f"{color}|{' '.join(sizes)}" for color, sizes in by_color.items()]
+        lines.extend(_truncated(rows, MAX_ITEMS))
+    else:
+        lines.append("sin variantes disponibles")
+    if unavailable:
+        lines.append(f"no_disponibles={unavailable}")
+    return "\n".join(lines)
+
+
+def _kv_product_details(product: dict) -> str:
+    lines = [f"id={product.get('id')} name={product.get('name', '')} cat={product.get('category', '')}"]
+    available = [v for v in product.get('variants', []) if _is_available(v)]
+    rows = [
+        f"variant_id={v.get('id')} size={v.get('size', '-')} color={v.get('color', '-')} price={v.get('price50U', '-')} stock={v.get('stock', 0)}"
+        for v in available
+    ]
+    lines.extend(_truncated(rows, MAX_ITEMS) or ["sin variantes disponibles"])
+    unavailable = len(product.get('variants', [])) - len(available)
+    if unavailable:
+        lines.append(f"no_disponibles={unavailable}")
+    return "\n".join(lines)
+
+
+def format_cart_details(cart_id: str, cart_data: dict, mode: Optional[str] = None) -> str:
+    """Formatea el carrito de /carts/{id} con subtotales y total estimado"""
+    mode = mode or _output_mode
+    if mode in ("compact", "kv"):
+        return _dense_cart_details(cart_id, cart_data, mode)
+    if not cart_data.get('cartItems'):
+        return f"🛒 El carrito ID {cart_id} está vacío."
+
+    quote = quote_cart(cart_data)
+    cart_details = f"""
+🛒 **Carrito ID {cart_id}:**
+- Total de items: {len(quote.lines)}
+- Items detallados:"""
+
+    for line in quote.lines:
+        variant = line.variant
+        product = variant.get('product', {})
+
+        cart_details += f"""
+  • {product.get('name', 'Producto')} (ID: {product.get('id', 'N/A')})
+    Variante: Talla {variant.get('size', 'N/A')} - Color {variant.get('color', 'N/A')}
+    Cantidad: {line.qty} × ${format_cents(line.unit_cents)} (precio desde {line.tier} u.) = ${format_cents(line.subtotal_cents)}"""
+
+    cart_details += f"\n\n💰 **Total estimado: ${quote.total}**"
+    cart_details += f"\n📊 Si cada item fuera de {what_if_line(quote.what_if())}"
+
+    # Agregar contexto completo para el agente
+    cart_details += f"{AGENT_CONTEXT_MARKER} {json.dumps(cart_data, indent=2)}"
+
+    return cart_details
+
+
+def user_facing(output: str) -> str:
+    """Salida de una herramienta sin el contexto que solo necesita el agente"""
+    return output.split(AGENT_CONTEXT_MARKER, 1)[0].strip()
+
+
+def _dense_cart_details(cart_id: str, cart_data: dict, mode: str) -> str:
+    items = cart_data.get('cartItems') or []
+    if not items:
+        return f"carrito={cart_id} vacio"
+
+    rows = ["item_id|variant_id|producto|talla|color|qty|precio_u|subtotal"] if mode == "compact" else []
+    quote = quote_cart(cart_data)
+    for line in quote.lines:
+        item, variant = line.item, line.variant
+        product = variant.get('product', {})
+        if mode == "compact":
+            rows.append(
+                f"{item.get('id')}|{variant.get('id', item.get('product_variant_id'))}|{product.get('name', '-')}"
+                f"|{variant.get('size', '-')}|{variant.get('color', '-')}|{line.qty}"
+                f"|{format_cents(line.unit_cents)}|{format_cents(line.subtotal_cents)}"
+            )
+        else:
+            rows.append(
+                f"item_id={item.get('id')} variant_id={variant.get('id', item.get('product_variant_id'))}"
+                f" name={product.get('name', '-')} size={variant.get('size', '-')} color={variant.get('color', '-')}"
+                f" qty={line.qty} price={format_cents(line.unit_cents)} subtotal={format_cents(line.subtotal_cents)}"
+            )
+    header = 1 if mode == "compact" else 0
+    lines = [f"carrito={cart_id} items={len(items)}"] + rows[:header] + _truncated(rows[header:], MAX_ITEMS)
+    lines.append(f"total={quote.total}")
+    return "\n".join(lines)
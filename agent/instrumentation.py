@@ -0,0 +1,244 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+# Métricas del loop del agente: latencia por herramienta y por llamada al LLM,
+# tokens, pasos ReAct por turno y tiempos HTTP del backend (DNS, connect, transfer).
+# Con INSTRUMENTATION=off (default) cada observe() retorna en el primer if.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HISTOGRAM_BUCKETS: Dict[str, Tuple[float, ...]] = {
+    "agent_react_steps": (1, 2, 3, 4, 5, 6, 8, 10, 15, 25),
+}
+
+logger = logging.getLogger("shopping_agent")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos, como los de Prometheus"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class Metrics:
+    """Registro de histogramas y contadores con labels, exportable a JSON o Prometheus"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(HISTOGRAM_BUCKETS.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            histograms: Dict[str, list] = {}
+            for (name, labels), h in sorted(self._histograms.items()):
+                histograms.setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "mean": round(h.sum / h.count, 6) if h.count else 0.0,
+                    "buckets": {str(b): c for b, c in zip(list(h.buckets) + ["+Inf"], h.cumulative())},
+                })
+            counters: Dict[str, list] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            return {"histograms": histograms, "counters": counters}
+
+    def to_prometheus(self) -> str:
+        """Formato de texto de exposición de Prometheus"""
+        def fmt(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(labels) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            typed = set()
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                for bound, count in zip(list(h.buckets) + ["+Inf"], h.cumulative()):
+                    lines.append(f"{name}_bucket{fmt(labels, ('le', str(bound)))} {count}")
+                lines.append(f"{name}_sum{fmt(labels)} {h.sum:.6f}")
+                lines.append(f"{name}_count{fmt(labels)} {h.count}")
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{fmt(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str):
+        """Escribe las métricas en path: JSON si termina en .json, si no Prometheus"""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.as_dict(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+
+
+metrics = Metrics(enabled=os.getenv('INSTRUMENTATION', 'off').lower() in ('on', '1', 'true'))
+
+if metrics.enabled and os.getenv('INSTRUMENTATION_EXPORT'):
+    atexit.register(metrics.export, os.getenv('INSTRUMENTATION_EXPORT'))
+
+
+def debug(event: str, **fields):
+    """Eventos de depuración por logging (nivel DEBUG del logger shopping_agent), no por stdout"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s %s", event, " ".join(f"{k}={v}" for k, v in fields.items()))
+
+
+# Tiempos de la conexión abierta por la petición en curso (los escribe
+# backend_client.TimedHTTPConnection en el mismo hilo que hace la petición)
+connection_timing = threading.local()
+
+
+class InstrumentationCallbackHandler(BaseCallbackHandler):
+    """Latencia y tokens de cada llamada al LLM y latencia/errores de cada herramienta"""
+
+    # Solo toma tiempos: se ejecuta en línea también en runs async
+    run_inline = True
+
+    def __init__(self, registry: Metrics = metrics):
+        self.metrics = registry
+        self._lock = threading.Lock()
+        self._runs: Dict[UUID, tuple] = {}
+
+    def _start(self, run_id: UUID, *info):
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(),) + info
+
+    def _finish(self, run_id: UUID) -> Optional[tuple]:
+        with self._lock:
+            started = self._runs.pop(run_id, None)
+        if started is None:
+            return None
+        return (time.perf_counter() - started[0],) + started[1:]
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self._start(run_id, model, messages[0] if messages else [])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        finished = self._finish(run_id)
+        if finished is None:
+            return
+        elapsed, model, prompt = finished
+        self.metrics.observe("agent_llm_seconds", elapsed, model=model)
+
+        message = None
+        if response.generations and response.generations[0]:
+            message = getattr(response.generations[0][0], "message", None)
+        usage = getattr(message, "usage_metadata", None) or {}
+        if usage:
+            input_tokens, output_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        else:
+            # Modelos sin usage_metadata: mismo conteo aproximado que la compactación
+            from langchain_core.messages.utils import count_tokens_approximately
+            input_tokens = count_tokens_approximately(prompt)
+            output_tokens = count_tokens_approximately([message]) if message is not None else 0
+        self.metrics.inc("agent_llm_tokens_total", input_tokens, model=model, kind="input")
+        self.metrics.inc("agent_llm_tokens_total", output_tokens, model=model, kind="output")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        finished = self._finish(run_id)
+        if finished is not None:
+            self.metrics.inc("agent_llm_errors_total", model=finished[1])
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, (serialized or {}).get("name") or kwargs.get("name") or "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        finished = self._finish(run_id)
+        if finished is not None:
+            elapsed, tool_name = finished
+            status = getattr(output, "status", "success")
+            self.metrics.observe("agent_tool_seconds", elapsed, tool=tool_name)
+            if status == "error":
+                self.metrics.inc("agent_tool_errors_total", tool=tool_name)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        finished = self._finish(run_id)
+        if finished is not None:
+            elapsed, tool_name = finished
+            self.metrics.observe("agent_tool_seconds", elapsed, tool=tool_name)
+            self.metrics.inc("agent_tool_errors_total", tool=tool_name)
+
+
+def react_steps(messages: list) -> int:
+    """Llamadas al LLM del último turno: mensajes del agente después del último mensaje humano"""
+    steps = 0
+    for message in reversed(messages):
+        if message.type == "human":
+            break
+        if message.type == "ai":
+            steps += 1
+    return steps
@@ -0,0 +1,335 @@
+import asyncio
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from catalog import fold_text, load_catalog_csv
+from instrumentation import logger
+from schemas import ProductSearchParams
+
+load_dotenv()
+
+# Campos que filtra /products/search. category, size y color son comparaciones
+# exactas en el backend, así que cualquier variación ("verde", "Pantalon",
+# "grande") termina en una búsqueda vacía y en otro paso del LLM.
+FIELDS = ("category", "color", "size", "name")
+# Si el catálogo no se pudo cargar (backend o índice caídos) se reintenta
+# después de estos segundos; mientras tanto las búsquedas pasan sin normalizar
+RETRY_SECONDS = float(os.getenv('NORMALIZATION_RETRY_SECONDS', '30'))
+
+# Sinónimos y traducciones -> valor del catálogo. Solo se usan si el valor
+# destino existe en el vocabulario construido desde el catálogo.
+SYNONYMS: Dict[str, Dict[str, str]] = {
+    "color": {
+        "red": "Rojo", "blue": "Azul", "green": "Verde", "black": "Negro",
+        "white": "Blanco", "gray": "Gris", "grey": "Gris", "yellow": "Amarillo",
+        "celeste": "Azul", "plomo": "Gris",
+    },
+    "size": {
+        "chico": "S", "pequeño": "S", "small": "S",
+        "mediano": "M", "medium": "M",
+        "grande": "L", "large": "L",
+        "extra grande": "XL", "extra-grande": "XL", "extra large": "XL",
+        "doble extra grande": "XXL", "xx-large": "XXL",
+    },
+    "category": {
+        "deporte": "Deportivo", "deportes": "Deportivo", "sport": "Deportivo",
+        "deportiva": "Deportivo", "elegante": "Formal", "vestir": "Formal",
+        "informal": "Casual",
+    },
+    "name": {
+        "pantalones": "Pantalón", "jeans": "Pantalón", "pants": "Pantalón",
+        "remera": "Camiseta", "playera": "Camiseta", "polera": "Camiseta", "t-shirt": "Camiseta",
+        "camisas": "Camisa", "shirt": "Camisa",
+        "buzo": "Sudadera", "hoodie": "Sudadera", "poleron": "Sudadera",
+        "campera": "Chaqueta", "chamarra": "Chaqueta", "jacket": "Chaqueta",
+        "pollera": "Falda", "skirt": "Falda",
+    },
+}
+
+# Campos que solo aceptan coincidencia exacta o un sinónimo explícito: entre
+# tallas una letra de diferencia es otra talla ("XXXL" no es "XXL")
+EXACT_FIELDS = {"size"}
+
+# Términos que no filtran nada: todo el catálogo es ropa
+GENERIC_TERMS = {"ropa", "vestimenta", "prenda", "prendas", "clothing", "todo", "todos", "cualquiera"}
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Distancia de Damerau-Levenshtein (transposiciones adyacentes), cortando en limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = 0 if ca == cb else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _max_distance(term: str) -> int:
+    # Términos cortos con más de un error ya son otra palabra ("gris" vs "azul")
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 5 else 2
+
+
+class _FieldVocabulary:
+    """
+    Vocabulario de un campo con un índice de trigramas precalculado. La
+    corrección aproximada se busca solo entre los valores del catálogo, nunca
+    entre los sinónimos: "short" está a un error de "shirt", pero no es una Camisa.
+    """
+
+    def __init__(self, canonical: Iterable[str], synonyms: Dict[str, str], fuzzy: bool = True):
+        self.terms: Dict[str, str] = {}
+        for value in canonical:
+            self.terms[fold_text(value)] = value
+        canonical_terms = list(self.terms)
+        for alias, value in synonyms.items():
+            # Un sinónimo a un valor que no está en el catálogo solo rompería la búsqueda
+            if fold_text(value) in self.terms:
+                self.terms.setdefault(fold_text(alias), self.terms[fold_text(value)])
+
+        self.fuzzy = fuzzy
+        self.by_trigram: Dict[str, Set[str]] = {}
+        for term in canonical_terms if fuzzy else ():
+            for gram in _trigrams(term):
+                self.by_trigram.setdefault(gram, set()).add(term)
+
+    def lookup(self, folded: str) -> Tuple[Optional[str], bool]:
+        """(valor canónico, fue corrección aproximada) o (None, False)"""
+        if folded in self.terms:
+            return self.terms[folded], False
+        # Plurales simples: "faldas", "camisetas", "pantalones"
+        for suffix in ("es", "s"):
+            if folded.endswith(suffix) and folded[:-len(suffix)] in self.terms:
+                return self.terms[folded[:-len(suffix)]], False
+
+        limit = _max_distance(folded) if self.fuzzy else 0
+        if not limit:
+            return None, False
+        overlap: Dict[str, int] = {}
+        for gram in _trigrams(folded):
+            for term in self.by_trigram.get(gram, ()):
+                overlap[term] = overlap.get(term, 0) + 1
+
+        best, best_distance, tied = None, limit + 1, False
+        for term in overlap:
+            distance = _edit_distance(folded, term, limit)
+            if distance < best_distance:
+                best, best_distance, tied = term, distance, False
+            elif distance == best_distance and distance <= limit:
+                tied = True
+        # Dos valores a la misma distancia: adivinar mandaría un filtro equivocado
+        if best is None or tied:
+            return None, False
+        return self.terms[best], True
+
+
+class Normalizer:
+    """
+    Normaliza los filtros de búsqueda a los valores reales del catálogo:
+    acentos y mayúsculas, sinónimos, plurales y errores de tipeo (trigramas +
+    distancia de edición, salvo en EXACT_FIELDS). Un valor sin coincidencia, o
+    con dos correcciones igual de cercanas, se deja como vino. Las consultas se
+    memoizan por (campo, valor).
+    """
+
+    def __init__(self, products: Iterable[dict], cache_size: int = 4096):
+        products = list(products)
+        canonical = {
+            "category": {p.get('category') for p in products if p.get('category')},
+            "name": {p.get('name') for p in products if p.get('name')},
+            "color": {v.get('color') for p in products for v in p.get('variants', []) if v.get('color')},
+            "size": {v.get('size') for p in products for v in p.get('variants', []) if v.get('size')},
+        }
+        self.vocabularies = {
+            field: _FieldVocabulary(canonical[field], SYNONYMS.get(field, {}), fuzzy=field not in EXACT_FIELDS)
+            for field in FIELDS
+        }
+        self._lookup = lru_cache(maxsize=cache_size)(self._resolve)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.exact = 0
+        self.corrected = 0
+        self.unmatched = 0
+
+    def _resolve(self, field: str, folded: str) -> Tuple[Optional[str], bool]:
+        return self.vocabularies[field].lookup(folded)
+
+    def normalize(self, field: str, value: Optional[str]) -> Optional[str]:
+        """Valor del catálogo para el campo; si no hay coincidencia se deja tal cual"""
+        if value is None or field not in self.vocabularies:
+            return value
+        folded = " ".join(fold_text(value).split())
+        if not folded:
+            return None
+        match, corrected = self._lookup(field, folded)
+        with self._lock:
+            self.lookups += 1
+            if match is None:
+                self.unmatched += 1
+            elif corrected:
+                self.corrected += 1
+            else:
+                self.exact += 1
+        return match if match is not None else value.strip()
+
+    def canonical(self, field: str, value: str) -> Optional[str]:
+        """
+        Valor del catálogo solo por coincidencia exacta, salvo acentos y
+        mayúsculas, o por un sinónimo explícito; sin plurales ni corrección de
+        tipeo. None si no corresponde a nada conocido.
+        """
+        folded = " ".join(fold_text(value).split())
+        return self.vocabularies[field].terms.get(folded) if folded else None
+
+    def match(self, field: str, value: str) -> Optional[str]:
+        """Como normalize(), pero None si el valor no corresponde a nada del catálogo"""
+        folded = " ".join(fold_text(value).split())
+        return self._lookup(field, folded)[0] if folded else None
+
+    def normalize_search(self, params: ProductSearchParams) -> ProductSearchParams:
+        """
+        Normaliza todos los filtros de una búsqueda. Además reubica valores que
+        el LLM puso en el campo equivocado (category="pantalones" es un nombre)
+        y separa nombres compuestos como "pantalón azul" en name + color.
+        """
+        values = {field: getattr(params, field) for field in FIELDS}
+
+        if values["category"] and fold_text(values["category"]) in GENERIC_TERMS:
+            values["category"] = None
+        if values["category"] and not self.match("category", values["category"]):
+            as_name = self.match("name", values["category"])
+            if as_name and not values["name"]:
+                values["category"], values["name"] = None, as_name
+
+        if values["name"] and not self.match("name", values["name"]):
+            values.update(self._split_name(values))
+
+        for field in FIELDS:
+            values[field] = self.normalize(field, values[field])
+        return params.model_copy(update=values)
+
+    def _split_name(self, values: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+        words = values["name"].split()
+        if len(words) < 2:
+            return {}
+        found: Dict[str, Optional[str]] = {}
+        for word in words:
+            for field in ("name", "color", "size", "category"):
+                if field in found or (field != "name" and values.get(field)):
+                    continue
+                matched = self.match(field, word)
+                if matched:
+                    found[field] = matched
+                    break
+        if "name" not in found:
+            # Sin un nombre de producto reconocible es mejor no tocar la búsqueda
+            return {}
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            info = self._lookup.cache_info()
+            return {
+                "lookups": self.lookups,
+                "exact": self.exact,
+                "corrected": self.corrected,
+                "unmatched": self.unmatched,
+                "memo_hits": info.hits,
+                "memo_misses": info.misses,
+                "vocabulary": {field: len(v.terms) for field, v in self.vocabularies.items()},
+            }
+
+
+_normalizer: Optional[Normalizer] = None
+_normalizer_lock = threading.Lock()
+# Vacío, para el intervalo entre reintentos; nunca queda como _normalizer
+_unavailable: Optional[Normalizer] = None
+_failed_at: Optional[float] = None
+
+
+def _catalog_products() -> List[dict]:
+    # Con el índice local activo el vocabulario sale del mismo catálogo que se busca
+    from product_index import get_product_index
+
+    index = get_product_index()
+    if index is not None:
+        return index.products()
+    return load_catalog_csv(os.getenv('NORMALIZATION_CATALOG_CSV') or None)
+
+
+def get_normalizer() -> Normalizer:
+    """
+    Normalizador compartido; el vocabulario se construye en la primera llamada.
+    Una carga fallida no se memoiza: se reintenta pasados RETRY_SECONDS.
+    """
+    global _normalizer, _unavailable, _failed_at
+    if _normalizer is not None:
+        return _normalizer
+    with _normalizer_lock:
+        if _normalizer is not None:
+            return _normalizer
+        if _failed_at is None or time.monotonic() - _failed_at >= RETRY_SECONDS:
+            try:
+                _normalizer = Normalizer(_catalog_products())
+                _failed_at = None
+                return _normalizer
+            except Exception as e:
+                logger.warning("No se pudo cargar el vocabulario del catálogo, se reintenta en %ss: %s",
+                               RETRY_SECONDS, e)
+                _failed_at = time.monotonic()
+        if _unavailable is None:
+            _unavailable = Normalizer([])
+        return _unavailable
+
+
+def normalize_search_params(params: ProductSearchParams) -> ProductSearchParams:
+    if os.getenv('SEARCH_NORMALIZATION', 'on').lower() in ('off', '0', 'false'):
+        return params
+    return get_normalizer().normalize_search(params)
+
+
+async def anormalize_search_params(params: ProductSearchParams) -> ProductSearchParams:
+    """Igual que normalize_search_params(), sin bloquear el event loop al construir el vocabulario"""
+    if _normalizer is None and os.getenv('SEARCH_NORMALIZATION', 'on').lower() not in ('off', '0', 'false'):
+        return (await asyncio.to_thread(get_normalizer)).normalize_search(params)
+    return normalize_search_params(params)
+
+
+class EntityMapper:
+    """Mapea variaciones lingüísticas a valores estándar (fachada sobre Normalizer)"""
+
+    @classmethod
+    def normalize_color(cls, color: str) -> str:
+        return get_normalizer().normalize("color", color)
+
+    @classmethod
+    def normalize_size(cls, size: str) -> str:
+        return get_normalizer().normalize("size", size)
+
+    @classmethod
+    def normalize_category(cls, category: str) -> str:
+        return get_normalizer().normalize("category", category)
+
+    @classmethod
+    def normalize_name(cls, name: str) -> str:
+        return get_normalizer().normalize("name", name)
@@ -0,0 +1,370 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from instrumentation import debug
+from response_cache import register_invalidation
+
+load_dotenv()
+
+# Prefetch especulativo (PRODUCT_PREFETCH=on): después de search_products el
+# paso siguiente casi siempre es get_product_details de alguno de los
+# resultados, así que el detalle de los primeros PRODUCT_PREFETCH_TOP_K se pide
+# en segundo plano mientras el LLM responde. Lo traído queda en un store por
+# sesión con TTL corto que get_product_details consulta primero; si el fetch
+# todavía está en vuelo se espera ese mismo request en lugar de hacer otro.
+ENABLED = os.getenv('PRODUCT_PREFETCH', 'off').lower() in ('on', '1', 'true')
+TOP_K = int(os.getenv('PRODUCT_PREFETCH_TOP_K', '3'))
+TTL = float(os.getenv('PRODUCT_PREFETCH_TTL', '60'))
+CONCURRENCY = int(os.getenv('PRODUCT_PREFETCH_CONCURRENCY', '4'))
+MAX_SESSIONS = int(os.getenv('PRODUCT_PREFETCH_MAX_SESSIONS', '1024'))
+# Tope de espera de get_product_details por un prefetch en vuelo
+JOIN_TIMEOUT = float(os.getenv('PRODUCT_PREFETCH_JOIN_TIMEOUT', '10'))
+
+DEFAULT_SESSION = "default"
+
+
+def current_session() -> str:
+    """thread_id de la sesión cuyo grafo está ejecutando la herramienta"""
+    try:
+        from langgraph.config import get_config
+        return str(get_config().get("configurable", {}).get("thread_id") or DEFAULT_SESSION)
+    except RuntimeError:
+        # Fuera de un run (herramienta invocada directamente)
+        return DEFAULT_SESSION
+
+
+class PrefetchStats:
+    """
+    hits: get_product_details respondido desde el store; joined: esperó un
+    prefetch en vuelo; misses: tuvo que ir al backend. wasted: productos
+    traídos que expiraron o se descartaron sin que nadie los leyera.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.scheduled = 0
+        self.deduplicated = 0
+        self.fetched = 0
+        self.failed = 0
+        self.hits = 0
+        self.joined = 0
+        self.misses = 0
+        self.wasted = 0
+
+    def record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.joined + self.misses
+            return {
+                "scheduled": self.scheduled,
+                "deduplicated": self.deduplicated,
+                "fetched": self.fetched,
+                "failed": self.failed,
+                "hits": self.hits,
+                "joined": self.joined,
+                "misses": self.misses,
+                "wasted": self.wasted,
+                "hit_rate": round((self.hits + self.joined) / lookups, 4) if lookups else 0.0,
+                "waste_rate": round(self.wasted / self.fetched, 4) if self.fetched else 0.0,
+            }
+
+
+class _Prefetched:
+    __slots__ = ("expires_at", "product", "used")
+
+    def __init__(self, product: dict, ttl: float):
+        self.expires_at = time.monotonic() + ttl
+        self.product = product
+        self.used = False
+
+
+class PrefetchStore:
+    """Productos prefetcheados por sesión, con TTL corto y desalojo LRU de sesiones"""
+
+    def __init__(self, stats: PrefetchStats, ttl: float = TTL, max_sessions: int = MAX_SESSIONS):
+        self.stats = stats
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, _Prefetched]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Sube con cada invalidación: un fetch que arrancó antes no guarda lo que trajo
+        self.generation = 0
+        register_invalidation(self)
+
+    def _discard(self, entries: Iterable[_Prefetched]):
+        wasted = sum(1 for entry in entries if not entry.used)
+        if wasted:
+            self.stats.record(wasted=wasted)
+
+    def _expire(self, products: Dict[str, _Prefetched]):
+        now = time.monotonic()
+        expired = [key for key, entry in products.items() if entry.expires_at < now]
+        self._discard(products.pop(key) for key in expired)
+
+    def put(self, session_id: str, product_id: str, product: dict, generation: Optional[int] = None) -> bool:
+        """Guarda el producto; False si hubo una invalidación desde que se pidió"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            products = self._sessions.get(session_id)
+            if products is None:
+                products = self._sessions[session_id] = {}
+            self._sessions.move_to_end(session_id)
+            self._expire(products)
+            previous = products.get(product_id)
+            if previous is not None:
+                self._discard([previous])
+            products[product_id] = _Prefetched(product, self.ttl)
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self._discard(evicted.values())
+            return True
+
+    def has(self, session_id: str, product_id: str) -> bool:
+        with self._lock:
+            entry = self._sessions.get(session_id, {}).get(product_id)
+            return entry is not None and entry.expires_at >= time.monotonic()
+
+    def take(self, session_id: str, product_id: str) -> Optional[dict]:
+        """Producto prefetcheado para la sesión, o None; lo marca como usado"""
+        with self._lock:
+            products = self._sessions.get(session_id)
+            if not products:
+                return None
+            self._expire(products)
+            entry = products.get(product_id)
+            if entry is None:
+                return None
+            entry.used = True
+            return entry.product
+
+    def drop_session(self, session_id: str):
+        with self._lock:
+            products = self._sessions.pop(session_id, None)
+            if products:
+                self._discard(products.values())
+
+    def invalidate(self, product_id: Optional[str] = None):
+        """Descarta el producto (o todo, si es None) de todas las sesiones"""
+        with self._lock:
+            self.generation += 1
+            for session_id in list(self._sessions):
+                products = self._sessions[session_id]
+                if product_id is None:
+                    self._discard(products.values())
+                    products.clear()
+                elif str(product_id) in products:
+                    self._discard([products.pop(str(product_id))])
+                if not products:
+                    del self._sessions[session_id]
+
+    def sweep(self):
+        """Descarta lo expirado de todas las sesiones (para que wasted esté al día)"""
+        with self._lock:
+            for session_id in list(self._sessions):
+                self._expire(self._sessions[session_id])
+                if not self._sessions[session_id]:
+                    del self._sessions[session_id]
+
+
+def _candidates(data: dict, top_k: int) -> List[str]:
+    ids = []
+    for item in (data or {}).get('data') or ():
+        if item.get('id') is not None and str(item['id']) not in ids:
+            ids.append(str(item['id']))
+        if len(ids) >= top_k:
+            break
+    return ids
+
+
+class ProductPrefetcher:
+    """Prefetch para las herramientas sync: pool de hilos acotado a `concurrency`"""
+
+    def __init__(self, fetch: Callable[[str], dict], is_cached: Callable[[str], bool],
+                 enabled: bool = ENABLED, top_k: int = TOP_K, concurrency: int = CONCURRENCY):
+        self.fetch = fetch
+        self.is_cached = is_cached
+        self.enabled = enabled
+        self.top_k = top_k
+        self.concurrency = concurrency
+        self.stats = PrefetchStats()
+        self.store = PrefetchStore(self.stats)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # product_id -> (request en vuelo, sesiones que lo esperan)
+        self._inflight: Dict[str, Tuple[Future, Set[str]]] = {}
+
+    def schedule(self, session_id: str, data: dict):
+        """Pide en segundo plano el detalle de los primeros top_k productos de la búsqueda"""
+        if not self.enabled or self.top_k <= 0:
+            return
+        for product_id in _candidates(data, self.top_k):
+            if self.store.has(session_id, product_id) or self.is_cached(product_id):
+                self.stats.record(deduplicated=1)
+                continue
+            with self._lock:
+                inflight = self._inflight.get(product_id)
+                if inflight is not None:
+                    inflight[1].add(session_id)
+                    self.stats.record(deduplicated=1)
+                    continue
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="prefetch")
+                sessions = {session_id}
+                future = self._executor.submit(self._run, product_id, sessions, self.store.generation)
+                self._inflight[product_id] = (future, sessions)
+            self.stats.record(scheduled=1)
+
+    def _run(self, product_id: str, sessions: Set[str], generation: int) -> Optional[dict]:
+        try:
+            product = self.fetch(product_id)
+        except Exception as e:
+            self.stats.record(failed=1)
+            debug("prefetch.failed", product_id=product_id, error=e)
+            with self._lock:
+                self._inflight.pop(product_id, None)
+            raise
+        # El producto queda en el store antes de salir de _inflight: un lookup()
+        # lo encuentra en uno de los dos. Con el lock tomado ninguna sesión se
+        # suma a sessions después de guardar.
+        with self._lock:
+            stored = [self.store.put(session_id, product_id, product, generation) for session_id in sessions]
+            self._inflight.pop(product_id, None)
+        self.stats.record(fetched=sum(stored))
+        # Si el producto se invalidó mientras estaba en vuelo lo traído puede ser
+        # viejo: no se guarda y quien lo esperaba va al backend
+        return product if all(stored) else None
+
+    def lookup(self, session_id: str, product_id: str) -> Optional[dict]:
+        """Detalle prefetcheado (o en vuelo) para get_product_details; None si no hay"""
+        if not self.enabled:
+            return None
+        product = self.store.take(session_id, str(product_id))
+        if product is not None:
+            self.stats.record(hits=1)
+            return product
+        with self._lock:
+            inflight = self._inflight.get(str(product_id))
+        if inflight is not None:
+            try:
+                product = inflight[0].result(timeout=JOIN_TIMEOUT)
+            except Exception:
+                product = None
+            if product is not None:
+                self.store.take(session_id, str(product_id))
+                self.stats.record(joined=1)
+                return product
+        self.stats.record(misses=1)
+        return None
+
+    def report(self) -> dict:
+        """Estadísticas con lo expirado sin usar ya contado como wasted"""
+        self.store.sweep()
+        return self.stats.as_dict()
+
+
+class _LoopPrefetch:
+    """Semáforo y requests en vuelo de un event loop"""
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.inflight: Dict[str, Tuple[asyncio.Task, Set[str]]] = {}
+
+
+class AsyncProductPrefetcher:
+    """Versión asyncio de ProductPrefetcher: tareas y semáforo por event loop"""
+
+    def __init__(self, fetch: Callable[[str], Awaitable[dict]], is_cached: Callable[[str], bool],
+                 enabled: bool = ENABLED, top_k: int = TOP_K, concurrency: int = CONCURRENCY):
+        self.fetch = fetch
+        self.is_cached = is_cached
+        self.enabled = enabled
+        self.top_k = top_k
+        self.concurrency = concurrency
+        self.stats = PrefetchStats()
+        self.store = PrefetchStore(self.stats)
+        # Por loop (el objeto, no id(): un id se reusa y el semáforo quedaría
+        # ligado al loop anterior). El semáforo y las tareas referencian al loop,
+        # así que además se descartan los loops ya cerrados.
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopPrefetch]" = weakref.WeakKeyDictionary()
+
+    def _state(self) -> _LoopPrefetch:
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            for stale in [l for l in list(self._loops.keys()) if l.is_closed()]:
+                self._loops.pop(stale, None)
+            state = self._loops[loop] = _LoopPrefetch(self.concurrency)
+        return state
+
+    def schedule(self, session_id: str, data: dict):
+        if not self.enabled or self.top_k <= 0:
+            return
+        state = self._state()
+        for product_id in _candidates(data, self.top_k):
+            if self.store.has(session_id, product_id) or self.is_cached(product_id):
+                self.stats.record(deduplicated=1)
+                continue
+            inflight = state.inflight.get(product_id)
+            if inflight is not None:
+                inflight[1].add(session_id)
+                self.stats.record(deduplicated=1)
+                continue
+            sessions = {session_id}
+            task = asyncio.get_running_loop().create_task(
+                self._run(state, product_id, sessions, self.store.generation))
+            state.inflight[product_id] = (task, sessions)
+            self.stats.record(scheduled=1)
+
+    async def _run(self, state: _LoopPrefetch, product_id: str, sessions: Set[str],
+                   generation: int) -> Optional[dict]:
+        try:
+            async with state.semaphore:
+                product = await self.fetch(product_id)
+            # Igual que en la versión sync: primero al store, después fuera de inflight
+            stored = [self.store.put(session_id, product_id, product, generation) for session_id in sessions]
+        except Exception as e:
+            self.stats.record(failed=1)
+            debug("prefetch.failed", product_id=product_id, error=e)
+            return None
+        finally:
+            state.inflight.pop(product_id, None)
+        self.stats.record(fetched=sum(stored))
+        return product if all(stored) else None
+
+    async def lookup(self, session_id: str, product_id: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        product = self.store.take(session_id, str(product_id))
+        if product is not None:
+            self.stats.record(hits=1)
+            return product
+        inflight = self._state().inflight.get(str(product_id))
+        if inflight is not None:
+            try:
+                product = await asyncio.wait_for(asyncio.shield(inflight[0]), JOIN_TIMEOUT)
+            except Exception:
+                product = None
+            if product is not None:
+                self.store.take(session_id, str(product_id))
+                self.stats.record(joined=1)
+                return product
+        self.stats.record(misses=1)
+        return None
+
+    def report(self) -> dict:
+        """Estadísticas con lo expirado sin usar ya contado como wasted"""
+        self.store.sweep()
+        return self.stats.as_dict()
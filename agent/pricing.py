@@ -0,0 +1,138 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+# Precios mayoristas por tramo de cantidad: desde 200 unidades se cobra price200U,
+# desde 100 price100U y por debajo price50U. Todo se calcula en centavos enteros
+# (exacto, sin acumular error de float) y se convierte a texto solo al mostrar.
+TIERS: Tuple[Tuple[int, str], ...] = ((200, 'price200U'), (100, 'price100U'), (50, 'price50U'))
+QUOTE_QUANTITIES: Tuple[int, ...] = (50, 100, 200)
+
+_CENT = Decimal('0.01')
+_TIER_FIELDS = tuple(field for _, field in TIERS)
+
+
+@lru_cache(maxsize=8192)
+def to_cents(value) -> int:
+    """'1058.50' / 1058.5 / Decimal -> 105850. Los precios se repiten mucho, por eso el cache"""
+    if value is None:
+        # Un precio faltante no es gratis: cotizarlo en $0 sería peor que fallar
+        raise ValueError("Precio faltante")
+    try:
+        amount = Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"Precio inválido: {value!r}")
+    return int(amount * 100)
+
+
+def format_cents(cents: int) -> str:
+    """105850 -> '1058.50'"""
+    sign = '-' if cents < 0 else ''
+    cents = abs(cents)
+    return f"{sign}{cents // 100}.{cents % 100:02d}"
+
+
+def _tier_index(qty: int) -> int:
+    for index, (min_qty, _) in enumerate(TIERS):
+        if qty >= min_qty:
+            return index
+    return len(TIERS) - 1
+
+
+def tier_for(qty: int) -> Tuple[int, str]:
+    """(cantidad mínima del tramo, campo de precio de la variante) para qty unidades"""
+    return TIERS[_tier_index(qty)]
+
+
+@lru_cache(maxsize=8192)
+def _cents_tuple(prices: Tuple) -> Tuple[int, ...]:
+    # Un tramo sin precio usa el del tramo de menos unidades que sí lo tenga
+    # (sin price200U se cobra price100U); sin price50U no hay con qué cotizar
+    cents: List[int] = []
+    fallback = None
+    for price in reversed(prices):
+        if price is not None:
+            fallback = to_cents(price)
+        elif fallback is None:
+            raise ValueError("La variante no tiene precio para el tramo mínimo")
+        cents.append(fallback)
+    return tuple(reversed(cents))
+
+
+def tier_prices(variant: dict) -> Tuple[int, ...]:
+    """
+    Precio unitario en centavos de cada tramo, en el orden de TIERS. Un tramo
+    sin precio toma el del tramo anterior; ValueError si falta price50U.
+    """
+    # Una sola consulta al cache por variante en lugar de una por tramo
+    return _cents_tuple(tuple(variant.get(field) for field in _TIER_FIELDS))
+
+
+def unit_price(variant: dict, qty: int) -> int:
+    """Precio unitario en centavos que corresponde a qty unidades de la variante"""
+    return tier_prices(variant)[_tier_index(qty)]
+
+
+class QuotedLine:
+    __slots__ = ("item", "variant", "qty", "tier", "unit_cents", "subtotal_cents")
+
+    def __init__(self, item: dict, variant: dict, qty: int, tier: int, unit_cents: int):
+        self.item = item
+        self.variant = variant
+        self.qty = qty
+        self.tier = tier
+        self.unit_cents = unit_cents
+        self.subtotal_cents = unit_cents * qty
+
+
+class CartQuote:
+    """
+    Cotización de un carrito en una pasada: precio por línea según su tramo y,
+    para los what-if, la suma por tramo de los precios unitarios de todas las
+    líneas (con esas sumas cualquier cantidad se cotiza sin volver a recorrerlas).
+    """
+
+    __slots__ = ("lines", "total_cents", "_tier_sums")
+
+    def __init__(self, lines: List[QuotedLine], tier_sums: List[int]):
+        self.lines = lines
+        self.total_cents = sum(line.subtotal_cents for line in lines)
+        self._tier_sums = tier_sums
+
+    @property
+    def total(self) -> str:
+        return format_cents(self.total_cents)
+
+    def what_if(self, quantities: Iterable[int] = QUOTE_QUANTITIES) -> Dict[int, int]:
+        """Total en centavos si cada línea tuviera qty unidades, para cada qty pedida"""
+        quotes = {}
+        for qty in quantities:
+            quotes[qty] = self._tier_sums[_tier_index(qty)] * qty
+        return quotes
+
+
+def quote_cart(cart_data: dict) -> CartQuote:
+    """Cotiza los cartItems de /carts/{id} (cada uno con su productVariant)"""
+    # Desenrollado para los tres tramos de TIERS: es el loop caliente con miles de líneas
+    lines = []
+    sum200 = sum100 = sum50 = 0
+    for item in cart_data.get('cartItems') or ():
+        variant = item.get('productVariant') or {}
+        prices = _cents_tuple((variant.get('price200U'), variant.get('price100U'), variant.get('price50U')))
+        sum200 += prices[0]
+        sum100 += prices[1]
+        sum50 += prices[2]
+        qty = item.get('qty', 0)
+        index = 0 if qty >= 200 else 1 if qty >= 100 else 2
+        lines.append(QuotedLine(item, variant, qty, TIERS[index][0], prices[index]))
+    return CartQuote(lines, [sum200, sum100, sum50])
+
+
+def quote_variant(variant: dict, quantities: Iterable[int] = QUOTE_QUANTITIES) -> Dict[int, int]:
+    """Total en centavos de qty unidades de una variante, para cada qty pedida"""
+    return {qty: unit_price(variant, qty) * qty for qty in quantities}
+
+
+def what_if_line(quotes: Dict[int, int]) -> str:
+    """'50 u: $X · 100 u: $Y · 200 u: $Z' para mostrar una cotización what-if"""
+    return " · ".join(f"{qty} u: ${format_cents(cents)}" for qty, cents in quotes.items())
@@ -0,0 +1,342 @@
+import asyncio
+import json
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from catalog import fold_text, load_catalog_csv
+from instrumentation import logger
+from schemas import ProductSearchParams
+
+load_dotenv()
+
+TOKEN_PATTERN = re.compile(r"\w+")
+PAGE_SIZE = 10
+BACKEND_PAGE_SIZE = 50  # máximo que acepta PaginationOptionsDto.take
+
+
+def _tokens(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(fold_text(text or ""))
+
+
+def _postings(product: dict):
+    """(índice, término, id) de cada entrada que aporta un producto a los índices invertidos"""
+    product_id = product['id']
+    yield 'by_category', fold_text(product.get('category') or ''), product_id
+    for token in set(_tokens(product.get('name'))):
+        yield 'by_name_token', token, product_id
+    for variant in product.get('variants', []):
+        yield 'by_color', fold_text(variant.get('color') or ''), variant['id']
+        yield 'by_size', fold_text(variant.get('size') or ''), variant['id']
+
+
+def _variant_price(variant: dict) -> float:
+    return float(variant.get('price50U') or 0)
+
+
+class _Snapshot:
+    """
+    Índices inmutables de una versión del catálogo. Un refresco arma uno nuevo
+    con updated(), que copia las estructuras y toca solo las entradas de los
+    productos que cambiaron; las búsquedas en curso siguen con el anterior.
+    """
+
+    INDEXES = ('by_category', 'by_name_token', 'by_color', 'by_size')
+
+    def __init__(self, products: Dict[int, dict]):
+        self.products = products
+        self.product_ids = sorted(products)
+        self.by_category: Dict[str, Set[int]] = {}
+        self.by_name_token: Dict[str, Set[int]] = {}
+        self.by_color: Dict[str, Set[int]] = {}
+        self.by_size: Dict[str, Set[int]] = {}
+        self.variant_product: Dict[int, int] = {}
+        prices = []
+
+        for product_id, product in products.items():
+            for index, term, entry in _postings(product):
+                getattr(self, index).setdefault(term, set()).add(entry)
+            for variant in product.get('variants', []):
+                self.variant_product[variant['id']] = product_id
+                prices.append((_variant_price(variant), variant['id']))
+
+        # Precios ordenados para resolver min_price/max_price con bisect
+        prices.sort()
+        self.prices = [p for p, _ in prices]
+        self.price_variant_ids = [v for _, v in prices]
+
+    def updated(self, changed: Dict[int, dict], removed: Set[int]) -> "_Snapshot":
+        """
+        Nuevo snapshot con los productos changed (nuevos o modificados) y sin
+        removed. Los sets de los términos afectados se copian antes de
+        modificarlos; el resto se comparte con este snapshot.
+        """
+        new = object.__new__(_Snapshot)
+        new.products = dict(self.products)
+        new.product_ids = list(self.product_ids)
+        new.variant_product = dict(self.variant_product)
+        new.prices = list(self.prices)
+        new.price_variant_ids = list(self.price_variant_ids)
+        for index in self.INDEXES:
+            setattr(new, index, dict(getattr(self, index)))
+        copied: Set[tuple] = set()
+
+        def postings(index: str, term: str) -> Set[int]:
+            table = getattr(new, index)
+            if (index, term) not in copied:
+                table[term] = set(table.get(term, ()))
+                copied.add((index, term))
+            return table[term]
+
+        for product_id in set(changed) | removed:
+            old = new.products.pop(product_id, None)
+            if old is None:
+                continue
+            for index, term, entry in _postings(old):
+                ids = postings(index, term)
+                ids.discard(entry)
+                if not ids:
+                    del getattr(new, index)[term]
+                    copied.discard((index, term))
+            for variant in old.get('variants', []):
+                new.variant_product.pop(variant['id'], None)
+                price = _variant_price(variant)
+                position = bisect_left(new.prices, price)
+                while new.price_variant_ids[position] != variant['id']:
+                    position += 1
+                del new.prices[position]
+                del new.price_variant_ids[position]
+            del new.product_ids[bisect_left(new.product_ids, product_id)]
+
+        for product_id, product in changed.items():
+            new.products[product_id] = product
+            insort(new.product_ids, product_id)
+            for index, term, entry in _postings(product):
+                postings(index, term).add(entry)
+            for variant in product.get('variants', []):
+                new.variant_product[variant['id']] = product_id
+                position = bisect_right(new.prices, _variant_price(variant))
+                new.prices.insert(position, _variant_price(variant))
+                new.price_variant_ids.insert(position, variant['id'])
+        return new
+
+    def _variants_in_price_range(self, min_price: Optional[float], max_price: Optional[float]) -> Set[int]:
+        lo = bisect_left(self.prices, min_price) if min_price is not None else 0
+        hi = bisect_right(self.prices, max_price) if max_price is not None else len(self.prices)
+        return set(self.price_variant_ids[lo:hi])
+
+    def _products_by_name(self, name: str) -> Set[int]:
+        tokens = _tokens(name)
+        if not tokens:
+            return set(self.product_ids)
+        found: Optional[Set[int]] = None
+        for token in tokens:
+            ids = self.by_name_token.get(token, set())
+            found = ids if found is None else found & ids
+        if found:
+            return found
+        # Igual que el LIKE '%name%' del backend: coincidencia parcial sobre el nombre
+        folded = fold_text(name)
+        return {pid for pid in self.product_ids if folded in fold_text(self.products[pid].get('name') or '')}
+
+    def search(self, params: ProductSearchParams, take: int = PAGE_SIZE) -> dict:
+        candidates: Optional[Set[int]] = None
+        if params.category:
+            candidates = set(self.by_category.get(fold_text(params.category), set()))
+        if params.name:
+            by_name = self._products_by_name(params.name)
+            candidates = by_name if candidates is None else candidates & by_name
+
+        variant_filter: Optional[Set[int]] = None
+        if params.color:
+            variant_filter = self.by_color.get(fold_text(params.color), set())
+        if params.size:
+            ids = self.by_size.get(fold_text(params.size), set())
+            variant_filter = ids if variant_filter is None else variant_filter & ids
+        if params.min_price is not None or params.max_price is not None:
+            ids = self._variants_in_price_range(params.min_price, params.max_price)
+            variant_filter = ids if variant_filter is None else variant_filter & ids
+
+        if variant_filter is not None:
+            with_variants = {self.variant_product[v] for v in variant_filter}
+            candidates = with_variants if candidates is None else candidates & with_variants
+
+        ordered = self.product_ids if candidates is None else sorted(candidates)
+        page = params.page or 1
+        item_count = len(ordered)
+        page_count = math.ceil(item_count / take)
+
+        data = []
+        for product_id in ordered[(page - 1) * take:page * take]:
+            product = self.products[product_id]
+            if variant_filter is not None:
+                # Como el leftJoin filtrado del backend: solo las variantes que coinciden
+                product = dict(product, variants=[v for v in product['variants'] if v['id'] in variant_filter])
+            data.append(product)
+
+        return {
+            'data': data,
+            'meta': {
+                'page': page,
+                'take': take,
+                'itemCount': item_count,
+                'pageCount': page_count,
+                'hasPreviousPage': page > 1,
+                'hasNextPage': page < page_count,
+            },
+        }
+
+
+class ProductIndex:
+    """
+    Índice del catálogo en memoria para responder search_products sin ir al backend.
+    Se carga desde el backend (paginando /products/search por cursor) o desde
+    products.csv y se refresca incrementalmente: solo se reindexan los productos
+    que cambiaron o se quitaron.
+    """
+
+    def __init__(self, source: str = 'backend', csv_path: Optional[str] = None,
+                 refresh_interval: float = 300.0):
+        self.source = source
+        self.csv_path = csv_path
+        self.refresh_interval = refresh_interval
+        self._snapshot = _Snapshot({})
+        self._versions: Dict[int, str] = {}
+        self._loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+        self.products_changed = 0
+
+    def _fetch_products(self) -> Iterable[dict]:
+        if self.source == 'csv':
+            return load_catalog_csv(self.csv_path)
+        return self._fetch_from_backend()
+
+    @staticmethod
+    def _fetch_from_backend() -> List[dict]:
+        from backend_client import get_backend_client
+
+        backend = get_backend_client()
+        products, params = [], {"take": BACKEND_PAGE_SIZE}
+        while True:
+            # Por keyset con meta.nextCursor: el backend cuenta el total solo en la
+            # primera página y no recorre el OFFSET de las anteriores
+            response = backend.get("/products/search", endpoint="products.search", params=params)
+            response.raise_for_status()
+            data = response.json()
+            products.extend(data.get('data', []))
+            meta = data.get('meta', {})
+            if not meta.get('hasNextPage'):
+                return products
+            if meta.get('nextCursor'):
+                params = {"cursor": meta['nextCursor'], "take": BACKEND_PAGE_SIZE}
+            else:
+                params = {"page": meta.get('page', 1) + 1, "take": BACKEND_PAGE_SIZE}
+
+    @staticmethod
+    def _version(product: dict) -> str:
+        # Huella del contenido sin timestamps: detecta cambios de stock o precio
+        # aunque la fuente (ej: el CSV) no tenga updatedAt confiable
+        def strip(d: dict) -> dict:
+            return {k: v for k, v in d.items() if k not in ('createdAt', 'updatedAt', 'variants')}
+        return json.dumps(
+            [strip(product), [strip(v) for v in product.get('variants', [])]],
+            sort_keys=True, default=str
+        )
+
+    def refresh(self) -> int:
+        """Recarga el catálogo y reindexa si cambió; retorna cuántos productos cambiaron"""
+        with self._refresh_lock:
+            fetched = {p['id']: p for p in self._fetch_products()}
+            versions = {pid: self._version(p) for pid, p in fetched.items()}
+            changed = {pid for pid, v in versions.items() if self._versions.get(pid) != v}
+            removed = set(self._versions) - set(versions)
+
+            if changed or removed:
+                # El swap de la referencia es atómico: las búsquedas en curso siguen con el snapshot anterior
+                if not self._snapshot.products:
+                    self._snapshot = _Snapshot(fetched)
+                else:
+                    self._snapshot = self._snapshot.updated({pid: fetched[pid] for pid in changed}, removed)
+                self._versions = versions
+
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+            self.products_changed += len(changed) + len(removed)
+            return len(changed) + len(removed)
+
+    def maybe_refresh(self) -> None:
+        """Refresca en segundo plano si el índice superó refresh_interval"""
+        if self.refresh_interval <= 0 or time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        if self._refresh_lock.locked():
+            return
+        self._loaded_at = time.monotonic()
+        threading.Thread(target=self._safe_refresh, daemon=True).start()
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning("No se pudo refrescar el índice de productos: %s", e)
+
+    def search(self, params: ProductSearchParams, take: int = PAGE_SIZE) -> dict:
+        """Resuelve una búsqueda con la misma forma de respuesta que /products/search"""
+        self.maybe_refresh()
+        return self._snapshot.search(params, take)
+
+    def products(self) -> List[dict]:
+        return list(self._snapshot.products.values())
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "products": len(self._snapshot.products),
+            "variants": len(self._snapshot.variant_product),
+            "refreshes": self.refreshes,
+            "products_changed": self.products_changed,
+        }
+
+
+_index: Optional[ProductIndex] = None
+_index_lock = threading.Lock()
+
+
+def _index_source() -> Optional[str]:
+    source = os.getenv('LOCAL_PRODUCT_INDEX', 'off').lower()
+    return None if source in ('', 'off', '0', 'false') else source
+
+
+def get_product_index() -> Optional[ProductIndex]:
+    """
+    Índice compartido según LOCAL_PRODUCT_INDEX (off | backend | csv).
+    Retorna None si está desactivado; la primera llamada hace la carga inicial.
+    """
+    global _index
+    source = _index_source()
+    if source is None:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = ProductIndex(
+                    source=source,
+                    csv_path=os.getenv('LOCAL_PRODUCT_INDEX_CSV') or None,
+                    refresh_interval=float(os.getenv('LOCAL_PRODUCT_INDEX_REFRESH', '300')),
+                )
+                index.refresh()
+                _index = index
+    return _index
+
+
+async def aget_product_index() -> Optional[ProductIndex]:
+    """Igual que get_product_index(), pero la carga inicial no bloquea el event loop"""
+    if _index is not None or _index_source() is None:
+        return get_product_index()
+    return await asyncio.to_thread(get_product_index)
@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from collections import Counter
+from math import log
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from catalog import fold_text, load_catalog_csv
+from instrumentation import metrics
+from normalization import SYNONYMS
+from schemas import ProductSearchParams
+
+load_dotenv()
+
+# Ranking BM25 de productos para consultas en texto libre ("algo cómodo para
+# correr") sobre nombre, categoría y descripción. Los pesos BM25 de cada
+# (término, producto) se calculan una vez y se guardan en un archivo que se
+# abre con mmap: postings planos (producto int32, peso float32) por término,
+# así una consulta solo suma los postings de sus términos. Cada lista está
+# ordenada por peso descendente y se recorre hasta MAX_POSTINGS entradas: con
+# catálogos grandes un término muy común (una categoría) aporta poco a cada
+# producto y recorrerlo completo no entra en el presupuesto de RANKING_BUDGET_MS.
+# Las listas más cortas que el tope se recorren completas (resultado exacto).
+K1 = 1.2
+B = 0.75
+FIELD_WEIGHTS = (("name", 3), ("category", 2), ("description", 1))
+# Un índice por catálogo en el cache del usuario (no en el tempdir compartido,
+# donde otro usuario podría dejar un archivo con ese nombre); el nombre lleva la
+# firma del catálogo, así dos catálogos no se pisan el archivo.
+INDEX_DIR = os.getenv('RANKING_INDEX_DIR') or os.path.join(
+    os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'shopping_agent')
+BUDGET_MS = float(os.getenv('RANKING_BUDGET_MS', '1.0'))
+MAX_POSTINGS = int(os.getenv('RANKING_MAX_POSTINGS', '1000'))
+
+_MAGIC = b'BM25v2\0\0'
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "al", "algo", "busco", "con", "de", "del", "el", "en", "es", "la", "las", "lo", "los",
+    "me", "mi", "necesito", "para", "por", "que", "quiero", "se", "sin", "su", "un", "una",
+    "uno", "unos", "unas", "y", "o", "ropa", "prenda",
+}
+# Intenciones frecuentes -> palabras del catálogo. Se suman con peso reducido
+# para que una coincidencia directa siga rankeando primero.
+EXPANSIONS: Dict[str, Tuple[str, ...]] = {
+    "correr": ("deportivo",), "running": ("deportivo",), "gimnasio": ("deportivo",),
+    "gym": ("deportivo",), "entrenar": ("deportivo",), "ejercicio": ("deportivo",),
+    "fiesta": ("formal", "elegante"), "oficina": ("formal",), "trabajo": ("formal",),
+    "boda": ("formal", "elegante"), "reunion": ("formal",),
+    "diario": ("casual",), "salir": ("casual",), "fin de semana": ("casual",),
+    "frio": ("sudadera", "chaqueta"), "calor": ("camiseta", "ligera", "falda"),
+    "liviano": ("ligera",), "liviana": ("ligera",), "fresco": ("ligera",),
+}
+EXPANSION_WEIGHT = 0.5
+
+
+def _stem(token: str) -> str:
+    """Stemming mínimo para español: plural y género ('cómodas' -> 'comod')"""
+    if len(token) > 4 and token.endswith('es'):
+        token = token[:-2]
+    elif len(token) > 3 and token.endswith('s'):
+        token = token[:-1]
+    if len(token) > 3 and token[-1] in 'aoe':
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in TOKEN_PATTERN.findall(fold_text(text or "")) if t not in STOPWORDS]
+
+
+def _query_terms(query: str) -> Dict[str, float]:
+    """Términos de la consulta con su peso: los propios, sinónimos y expansiones"""
+    folded = fold_text(query)
+    words = [w for w in TOKEN_PATTERN.findall(folded) if w not in STOPWORDS]
+    terms: Dict[str, float] = Counter(_stem(w) for w in words)
+
+    extra: List[str] = []
+    for phrase, expansion in EXPANSIONS.items():
+        if (" " in phrase and phrase in folded) or phrase in words:
+            extra.extend(expansion)
+    for word in words:
+        for field in ("name", "category"):
+            target = SYNONYMS[field].get(word)
+            if target:
+                extra.append(target)
+    for term in tokenize(" ".join(extra)):
+        terms[term] = terms.get(term, 0) + EXPANSION_WEIGHT
+    return terms
+
+
+def catalog_signature(products: Iterable[dict]) -> str:
+    digest = hashlib.sha1()
+    for product in products:
+        digest.update(json.dumps(
+            [product.get('id'), product.get('name'), product.get('category'), product.get('description')],
+            ensure_ascii=False,
+        ).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def index_path(signature: str, directory: Optional[str] = None) -> str:
+    """Archivo del índice de un catálogo; crea el directorio (solo para el usuario)"""
+    directory = directory or INDEX_DIR
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return os.path.join(directory, f"ranking-{signature[:20]}.idx")
+
+
+class RankedHit:
+    """Producto rankeado, con los filtros para search_products que lo encuentran"""
+
+    __slots__ = ("product_id", "name", "category", "score")
+
+    def __init__(self, product_id: int, name: str, category: str, score: float):
+        self.product_id = product_id
+        self.name = name
+        self.category = category
+        self.score = score
+
+    @property
+    def params(self) -> ProductSearchParams:
+        return ProductSearchParams(name=self.name, category=self.category or None)
+
+
+def build_index(products: List[dict], path: Optional[str] = None) -> str:
+    """Calcula los pesos BM25 del catálogo y los escribe en path (reemplazo atómico)"""
+    signature = catalog_signature(products)
+    path = path or index_path(signature)
+    docs: List[Counter] = []
+    for product in products:
+        tf: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(product.get(field) or ""):
+                tf[term] += weight
+        docs.append(tf)
+
+    lengths = [sum(tf.values()) for tf in docs]
+    avg_length = (sum(lengths) / len(lengths)) if lengths else 1.0
+    postings: Dict[str, List[Tuple[int, float]]] = {}
+    for doc, (tf, length) in enumerate(zip(docs, lengths)):
+        norm = K1 * (1 - B + B * length / avg_length)
+        for term, freq in tf.items():
+            postings.setdefault(term, []).append((doc, freq * (K1 + 1) / (freq + norm)))
+
+    n_docs = len(docs)
+    terms: Dict[str, List[int]] = {}
+    doc_ids: List[int] = []
+    weights: List[float] = []
+    for term, entries in sorted(postings.items()):
+        idf = log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+        terms[term] = [len(doc_ids), len(entries)]
+        for doc, weight in sorted(entries, key=lambda entry: -entry[1]):
+            doc_ids.append(doc)
+            weights.append(idf * weight)
+
+    header = json.dumps({
+        "signature": signature,
+        "products": [[p.get('id'), p.get('name') or '', p.get('category') or ''] for p in products],
+        "terms": terms,
+        "postings": len(doc_ids),
+    }, ensure_ascii=False).encode('utf-8')
+    header += b' ' * (-len(header) % 4)  # los arrays arrancan alineados a 4 bytes
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        # Orden de bytes nativo: el mismo que usa memoryview.cast() al leer
+        array('i', doc_ids).tofile(f)
+        array('f', weights).tofile(f)
+    os.replace(tmp_path, path)
+    return path
+
+
+class RankingIndex:
+    """Índice BM25 abierto con mmap; search() recorre solo los postings de la consulta"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(_MAGIC)] != _MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} no es un índice de ranking")
+        start = len(_MAGIC) + 4
+        (header_length,) = struct.unpack_from('<I', self._mmap, len(_MAGIC))
+        header = json.loads(bytes(self._mmap[start:start + header_length]))
+        self.signature: str = header['signature']
+        self.products: List[list] = header['products']
+        self.terms: Dict[str, List[int]] = header['terms']
+        offset = start + header_length
+        count = header['postings']
+        self._view = memoryview(self._mmap)
+        self._doc_ids = self._view[offset:offset + 4 * count].cast('i')
+        self._weights = self._view[offset + 4 * count:offset + 8 * count].cast('f')
+        self.queries = 0
+        self.over_budget = 0
+
+    def search(self, query: str, limit: int = 5) -> List[RankedHit]:
+        start = time.perf_counter()
+        scores: Dict[int, float] = {}
+        score_of = scores.get
+        for term, query_weight in _query_terms(query).items():
+            posting = self.terms.get(term)
+            if posting is None:
+                continue
+            begin, end = posting[0], posting[0] + min(posting[1], MAX_POSTINGS)
+            for doc, weight in zip(self._doc_ids[begin:end], self._weights[begin:end]):
+                scores[doc] = score_of(doc, 0.0) + weight * query_weight
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        hits = [RankedHit(*self.products[doc], round(score, 4)) for doc, score in best]
+
+        elapsed = time.perf_counter() - start
+        self.queries += 1
+        if elapsed * 1000 > BUDGET_MS:
+            self.over_budget += 1
+            metrics.inc("agent_ranking_over_budget_total")
+        metrics.observe("agent_ranking_seconds", elapsed)
+        return hits
+
+    def stats(self) -> dict:
+        return {
+            "products": len(self.products),
+            "terms": len(self.terms),
+            "postings": len(self._weights),
+            "queries": self.queries,
+            "over_budget": self.over_budget,
+            "budget_ms": BUDGET_MS,
+            "max_postings": MAX_POSTINGS,
+        }
+
+    def close(self):
+        self._doc_ids.release()
+        self._weights.release()
+        self._view.release()
+        self._mmap.close()
+
+
+def open_index(products: List[dict], directory: Optional[str] = None) -> RankingIndex:
+    """Abre el índice del catálogo; lo reconstruye si no existe o no coincide la firma"""
+    signature = catalog_signature(products)
+    path = index_path(signature, directory)
+    if os.path.exists(path):
+        try:
+            index = RankingIndex(path)
+            if index.signature == signature:
+                return index
+            index.close()
+        except (ValueError, OSError, KeyError, json.JSONDecodeError):
+            pass
+    build_index(products, path)
+    return RankingIndex(path)
+
+
+_ranking_index: Optional[RankingIndex] = None
+_ranking_lock = threading.Lock()
+
+
+def _catalog_products() -> List[dict]:
+    # Mismo catálogo que normalization: el índice local si está activo, si no el CSV
+    from product_index import get_product_index
+
+    index = get_product_index()
+    if index is not None:
+        return index.products()
+    return load_catalog_csv(os.getenv('RANKING_CATALOG_CSV') or None)
+
+
+def get_ranking_index() -> RankingIndex:
+    """Índice compartido; se abre (o se construye) en la primera llamada"""
+    global _ranking_index
+    if _ranking_index is None:
+        with _ranking_lock:
+            if _ranking_index is None:
+                _ranking_index = open_index(_catalog_products())
+    return _ranking_index
+
+
+async def aget_ranking_index() -> RankingIndex:
+    """Igual que get_ranking_index(), pero la construcción no bloquea el event loop"""
+    if _ranking_index is not None:
+        return _ranking_index
+    return await asyncio.to_thread(get_ranking_index)
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class ResponseCache:
+    """
+    Cache en memoria con TTL y desalojo LRU, acotada por cantidad de entradas
+    y por bytes aproximados (el tamaño del cuerpo HTTP de cada respuesta).
+    """
+
+    def __init__(self, name: str, ttl: float = 300.0, max_entries: int = 1024,
+                 max_bytes: int = 8 * 1024 * 1024):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (expira_en, tamaño, valor); el orden refleja el uso reciente
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor cacheado o None si no existe o expiró"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Si hay una entrada vigente para key, sin contar hit/miss ni tocar el orden LRU"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def set(self, key: Hashable, value: Any, size: int = 0):
+        """Guarda un valor; size es el peso aproximado en bytes"""
+        if self.ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Invalida todas las entradas cuya key cumpla el predicado"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Caches de proceso compartidas por las herramientas sync y async.
+# El catálogo cambia poco, así que un TTL de minutos es suficiente.
+_ttl = float(os.getenv('PRODUCT_CACHE_TTL', '300'))
+_max_entries = int(os.getenv('PRODUCT_CACHE_MAX_ENTRIES', '1024'))
+_max_bytes = int(os.getenv('PRODUCT_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+
+search_cache = ResponseCache('products.search', _ttl, _max_entries, _max_bytes)
+product_cache = ResponseCache('products.detail', _ttl, _max_entries, _max_bytes)
+# (filtros, página) -> meta.nextCursor que devolvió la página anterior
+cursor_cache = ResponseCache('products.cursor', _ttl, _max_entries, 256 * 1024)
+
+
+def next_page_cursor(params) -> Optional[str]:
+    """Cursor para pedir la página de params por keyset, si ya se vio la anterior"""
+    if (params.page or 1) <= 1:
+        return None
+    return cursor_cache.get(params.cursor_key())
+
+
+def remember_next_cursor(params, data: dict) -> None:
+    """Guarda meta.nextCursor para que la página siguiente use keyset en vez de offset"""
+    next_cursor = (data.get('meta') or {}).get('nextCursor')
+    if next_cursor:
+        cursor_cache.set(params.cursor_key((params.page or 1) + 1), next_cursor, size=len(next_cursor))
+
+
+# Otros cachés de productos (el store del prefetch) que se invalidan junto con
+# estos; invalidate(product_id) recibe None cuando se invalida todo el catálogo
+_listeners: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def register_invalidation(listener) -> None:
+    _listeners.add(listener)
+
+
+def invalidate_product(product_id) -> None:
+    """Invalida el detalle de un producto y las búsquedas, que pueden incluirlo"""
+    product_cache.invalidate(str(product_id))
+    search_cache.clear()
+    for listener in list(_listeners):
+        listener.invalidate(str(product_id))
+
+
+def invalidate_catalog() -> None:
+    """Invalida todo el catálogo cacheado (ej: después de una carga masiva)"""
+    product_cache.clear()
+    search_cache.clear()
+    cursor_cache.clear()
+    for listener in list(_listeners):
+        listener.invalidate(None)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        "search": search_cache.stats(),
+        "product": product_cache.stats(),
+        "cursor": cursor_cache.stats(),
+    }
@@ -0,0 +1,102 @@
+from typing import Optional, Dict, List, Literal
+from pydantic import BaseModel, Field, field_validator
+from langgraph.graph import MessagesState
+
+# 1. SCHEMAS ESTRUCTURADOS CON VALIDACIÓN
+class ProductSearchParams(BaseModel):
+    """Schema para parámetros de búsqueda de productos"""
+    # keyword: str = Field(description="Término de búsqueda principal, si usas el resto de los campos, este se ignora.")
+    category: Optional[str] = Field(default=None, description="Categoría del producto (ej: Casual, Deportivo, Formal)")
+    color: Optional[str] = Field(default=None, description="Color del producto")
+    size: Optional[str] = Field(default=None, description="Talla del producto")
+    name: Optional[str] = Field(default=None, description="Nombre del producto(ej: pantaolon, camisa, short)")
+    min_price: Optional[float] = Field(default=None, description="Precio mínimo")
+    max_price: Optional[float] = Field(default=None, description="Precio máximo")
+    page: Optional[int] = Field(default=1, description="Página para paginación")
+    
+    # @field_validator('keyword')
+    # @classmethod
+    # def validate_keyword(cls, v):
+    #     if not v or not v.strip():
+    #         raise ValueError("La keyword no puede estar vacía")
+    #     # Sanitizar entrada
+    #     v = re.sub(r'[<>"\'\\]', '', v)
+    #     v = html.escape(v)
+    #     return v.strip()
+    
+    @field_validator('page')
+    @classmethod
+    def validate_page(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("La página debe ser mayor a 0")
+        return v
+
+    def to_query_params(self, cursor: Optional[str] = None) -> Dict:
+        """
+        Parámetros de query para /products/search, sin los valores None.
+        Con cursor (meta.nextCursor de la página anterior) el backend pagina por
+        keyset y page no se envía.
+        """
+        params = {
+            # "keyword": keyword,
+            "category": self.category,
+            "color": self.color,
+            "size": self.size,
+            "name": self.name,
+            "minPrice": self.min_price,
+            "maxPrice": self.max_price,
+            # PaginationOptionsDto: la primera página es el default del backend
+            "page": self.page if self.page and self.page > 1 and not cursor else None,
+            "cursor": cursor,
+            # "limit": 10  # Límite por página
+        }
+        return {k: v for k, v in params.items() if v is not None}
+    
+    def cache_key(self) -> tuple:
+        """Key normalizada: mismos filtros con distinto formato comparten entrada"""
+        normalized = []
+        for key, value in sorted(self.model_dump(exclude_none=True).items()):
+            if isinstance(value, str):
+                value = " ".join(value.split()).lower()
+            normalized.append((key, value))
+        return tuple(normalized)
+
+    def variant_filters(self) -> Dict:
+        """Color y talla pedidos, para elegir la variante a mostrar de cada producto"""
+        return {"color": self.color, "size": self.size}
+
+    def cursor_key(self, page: Optional[int] = None) -> tuple:
+        """Key del cursor que lleva a la página dada (por defecto la propia) de estos filtros"""
+        filters = self.model_copy(update={"page": None}).cache_key()
+        return filters + (("page", page or self.page or 1),)
+
+class CartOperation(BaseModel):
+    """Una operación sobre los items del carrito"""
+    op: Literal["add", "update", "remove"] = Field(description="add agrega una variante, update cambia la cantidad de un item, remove lo quita")
+    product_variant_id: Optional[int] = Field(default=None, description="ID de la variante (solo para add)")
+    item_id: Optional[int] = Field(default=None, description="ID del cart-item, no de la variante (para update y remove)")
+    qty: Optional[int] = Field(default=None, description="Cantidad (para add y update)")
+
+    @field_validator('qty')
+    @classmethod
+    def validate_qty(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("La cantidad debe ser mayor a 0")
+        return v
+
+    def to_payload(self) -> Dict:
+        return self.model_dump(exclude_none=True)
+
+class BulkCartUpdateParams(BaseModel):
+    """Schema para aplicar varias operaciones al carrito en una sola llamada"""
+    cart_id: str = Field(description="ID del carrito")
+    operations: List[CartOperation] = Field(description="Operaciones a aplicar, todas o ninguna")
+
+class ShoppingSessionState(MessagesState):
+    """Estado extendido para la sesión de compras"""
+    search_history: List[Dict] = []
+    user_preferences: Dict = {}
+    active_filters: Dict = {}
+    cart_id: Optional[str] = None
+    session_context: Dict = {}
+    remaining_steps: int = 0
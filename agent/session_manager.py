@@ -0,0 +1,148 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class SessionLimitError(Exception):
+    """Se alcanzó el máximo de sesiones activas y ninguna está ociosa"""
+
+
+class _Session:
+    # __slots__: con miles de sesiones por proceso cada byte por sesión cuenta
+    __slots__ = ("last_activity", "turns", "lock", "alock")
+
+    def __init__(self):
+        self.last_activity = time.monotonic()
+        self.turns = 0
+        self.lock = threading.Lock()
+        self.alock: Optional[asyncio.Lock] = None
+
+
+class SessionManager:
+    """
+    Atiende muchas sesiones con un único ShoppingAgent: un solo LLM y un solo
+    grafo compilado, y un thread de LangGraph por session_id.
+    """
+
+    def __init__(self, agent=None, max_sessions: Optional[int] = None,
+                 idle_timeout: Optional[float] = None,
+                 max_messages: Optional[int] = None):
+        if agent is None:
+            from shopping_agent import ShoppingAgent
+            agent = ShoppingAgent()
+        self.agent = agent
+        # 0 es un valor explícito (desactiva el límite), no "usar el default"
+        if max_sessions is None:
+            max_sessions = int(os.getenv('MAX_SESSIONS', '5000'))
+        if idle_timeout is None:
+            idle_timeout = float(os.getenv('SESSION_IDLE_TIMEOUT', '1800'))
+        if max_messages is None:
+            max_messages = int(os.getenv('SESSION_MAX_MESSAGES', '40'))
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        # session_id -> _Session, de la menos a la más recientemente usada
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.rejected = 0
+
+    def _acquire(self, session_id: str) -> _Session:
+        """Registra actividad de la sesión, creándola si hay lugar"""
+        evicted: List[str] = []
+        try:
+            with self._lock:
+                session = self._sessions.get(session_id)
+                if session is None:
+                    if self._full_locked():
+                        evicted = self._evict_idle_locked()
+                    if self._full_locked():
+                        self.rejected += 1
+                        raise SessionLimitError(
+                            f"Se alcanzó el máximo de {self.max_sessions} sesiones activas"
+                        )
+                    session = self._sessions[session_id] = _Session()
+                session.last_activity = time.monotonic()
+                self._sessions.move_to_end(session_id)
+                return session
+        finally:
+            # El cierre hace I/O del checkpointer: fuera del lock global
+            self._close(evicted)
+
+    def _full_locked(self) -> bool:
+        return 0 < self.max_sessions <= len(self._sessions)
+
+    def _evict_idle_locked(self) -> List[str]:
+        """Saca del registro las sesiones ociosas; cerrarlas queda para el llamador, fuera del lock"""
+        if self.idle_timeout <= 0:
+            return []
+        deadline = time.monotonic() - self.idle_timeout
+        evicted = []
+        # El OrderedDict está ordenado por actividad: se corta en la primera sesión viva
+        for session_id, session in self._sessions.items():
+            if session.last_activity > deadline:
+                break
+            if session.lock.locked() or (session.alock is not None and session.alock.locked()):
+                continue
+            evicted.append(session_id)
+        for session_id in evicted:
+            del self._sessions[session_id]
+        self.evicted += len(evicted)
+        return evicted
+
+    def _close(self, session_ids: List[str]):
+        for session_id in session_ids:
+            self.agent.end_session(session_id)
+
+    def evict_idle(self) -> int:
+        """Cierra las sesiones sin actividad dentro de idle_timeout"""
+        with self._lock:
+            evicted = self._evict_idle_locked()
+        self._close(evicted)
+        return len(evicted)
+
+    def end_session(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        self.agent.end_session(session_id)
+
+    def chat(self, session_id: str, message: str) -> str:
+        """Procesa un mensaje dentro del thread de la sesión indicada"""
+        session = self._acquire(session_id)
+        # Los mensajes de una misma sesión se procesan en orden
+        with session.lock:
+            reply = self.agent.chat(message, session_id=session_id)
+            session.turns += 1
+            if self.max_messages > 0:
+                self.agent.trim_history(session_id, self.max_messages)
+            session.last_activity = time.monotonic()
+        return reply
+
+    async def achat(self, session_id: str, message: str) -> str:
+        """Versión async de chat(), requiere un agente con async_mode=True"""
+        session = self._acquire(session_id)
+        if session.alock is None:
+            session.alock = asyncio.Lock()
+        async with session.alock:
+            reply = await self.agent.achat(message, session_id=session_id)
+            session.turns += 1
+            if self.max_messages > 0:
+                await self.agent.atrim_history(session_id, self.max_messages)
+            session.last_activity = time.monotonic()
+        return reply
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "evicted": self.evicted,
+                "rejected": self.rejected,
+            }
@@ -1,103 +1,54 @@
+import time
+_import_start = time.perf_counter()
+
 import os
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
-from typing import Optional, Dict, List
-from pydantic import BaseModel, Field, field_validator
+from functools import lru_cache
+from typing import AsyncIterator, Iterator, List, Optional
 import requests
-import json
-import re
-import html
 from datetime import datetime
 
-# Imports actualizados para LangChain 2024-2025
+# Imports actualizados para LangChain 2024-2025. langchain_google_genai y
+# langgraph.prebuilt son los más pesados: se importan al construir el grafo
 from langchain_core.tools import tool
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.messages import HumanMessage, RemoveMessage
 from langchain_core.exceptions import OutputParserException
-from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import MessagesState
 from langchain_core.tools import ToolException
 
+from backend_client import get_backend_client
+from formatters import format_search_results, format_product_details, format_cart_details, format_ranked_products
+from product_index import get_product_index
+from response_cache import search_cache, product_cache, cache_stats, next_page_cursor, remember_next_cursor
+from checkpointers import make_checkpointer
+from compaction import make_compaction_hook, compaction_stats
+from fast_path import FastPathRouter
+from cart_batching import CartCoalescer
+from cart_mirror import cart_mirror
+from prefetch import ProductPrefetcher, current_session
+from streaming import STREAM_MODES, fast_path_events, graph_events
+from instrumentation import InstrumentationCallbackHandler, debug, metrics, react_steps
+
 load_dotenv()
 
-# 1. SCHEMAS ESTRUCTURADOS CON VALIDACIÓN
-class ProductSearchParams(BaseModel):
-    """Schema para parámetros de búsqueda de productos"""
-    # keyword: str = Field(description="Término de búsqueda principal, si usas el resto de los campos, este se ignora.")
-    category: Optional[str] = Field(default=None, description="Categoría del producto (ej: clothing, electronics)")
-    color: Optional[str] = Field(default=None, description="Color del producto")
-    size: Optional[str] = Field(default=None, description="Talla del producto")
-    name: Optional[str] = Field(default=None, description="Nombre del producto(ej: pantaolon, camisa, short)")
-    min_price: Optional[float] = Field(default=None, description="Precio mínimo")
-    max_price: Optional[float] = Field(default=None, description="Precio máximo")
-    page: Optional[int] = Field(default=1, description="Página para paginación")
-    
-    # @field_validator('keyword')
-    # @classmethod
-    # def validate_keyword(cls, v):
-    #     if not v or not v.strip():
-    #         raise ValueError("La keyword no puede estar vacía")
-    #     # Sanitizar entrada
-    #     v = re.sub(r'[<>"\'\\]', '', v)
-    #     v = html.escape(v)
-    #     return v.strip()
-    
-    @field_validator('page')
-    @classmethod
-    def validate_page(cls, v):
-        if v is not None and v < 1:
-            raise ValueError("La página debe ser mayor a 0")
-        return v
-
-class ShoppingSessionState(MessagesState):
-    """Estado extendido para la sesión de compras"""
-    search_history: List[Dict] = []
-    user_preferences: Dict = {}
-    active_filters: Dict = {}
-    cart_id: Optional[str] = None
-    session_context: Dict = {}
-    remaining_steps: int = 0
-
-# 2. MAPEO SEMÁNTICO Y NORMALIZACIÓN
-class EntityMapper:
-    """Mapea variaciones lingüísticas a valores estándar"""
-    
-    COLOR_MAPPING = {
-        "rojo": "red", "azul": "blue", "verde": "green",
-        "negro": "black", "blanco": "white", "gris": "gray",
-        "amarillo": "yellow", "rosa": "pink", "morado": "purple"
-    }
-    
-    SIZE_MAPPING = {
-        "chico": "S", "pequeño": "S", "small": "S",
-        "mediano": "M", "medium": "M",
-        "grande": "L", "large": "L",
-        "extra grande": "XL", "extra-grande": "XL"
-    }
-    
-    CATEGORY_MAPPING = {
-        "ropa": "clothing", "vestimenta": "clothing",
-        "pantalones": "clothing", "camisas": "clothing",
-        "zapatos": "footwear", "calzado": "footwear",
-        "electrónicos": "electronics", "tecnología": "electronics"
-    }
-    
-    @classmethod
-    def normalize_color(cls, color: str) -> str:
-        return cls.COLOR_MAPPING.get(color.lower(), color.lower())
-    
-    @classmethod
-    def normalize_size(cls, size: str) -> str:
-        return cls.SIZE_MAPPING.get(size.lower(), size.upper())
-    
-    @classmethod
-    def normalize_category(cls, category: str) -> str:
-        return cls.CATEGORY_MAPPING.get(category.lower(), category.lower())
+# 1. SCHEMAS ESTRUCTURADOS CON VALIDACIÓN (ver schemas.py)
+from schemas import BulkCartUpdateParams, CartOperation, ProductSearchParams, ShoppingSessionState
+
+# 2. MAPEO SEMÁNTICO Y NORMALIZACIÓN (ver normalization.py)
+from normalization import get_normalizer, normalize_search_params
+from ranking import get_ranking_index
 
 # 3. HERRAMIENTAS CON DECORADOR @tool Y MANEJO DE ERRORES
+def _fetch_product(product_id: str) -> dict:
+    """GET /products/{id} para el prefetch, con el mismo timeout que get_product_details"""
+    response = get_backend_client().get(f"/products/{product_id}", endpoint="products.detail")
+    response.raise_for_status()
+    return response.json()
+
+# Detalle de los primeros resultados de cada búsqueda en segundo plano (PRODUCT_PREFETCH)
+product_prefetcher = ProductPrefetcher(_fetch_product, lambda product_id: product_id in product_cache)
+
 @tool(args_schema=ProductSearchParams)
 def search_products( category: str = None, name:str = None, color: str = None, 
                    size: str = None, min_price: float = None, 
@@ -105,81 +56,42 @@ def search_products( category: str = None, name:str = None, color: str = None,
     """
     Busca productos en el backend con filtros avanzados.
     Soporta paginación y múltiples filtros simultáneos.
+    Cada producto trae su mejor variante disponible (con stock, del color y talla
+    pedidos) con su ID, que sirve directo para add_item_to_cart.
     """
-    backend_url = os.getenv('BACKEND_URL', 'http://localhost:3000')
+    backend = get_backend_client()
     
     try:
-        # Normalizar entidades usando el mapper
-        # if color:
-        #     color = EntityMapper.normalize_color(color)
-        # if size:
-        #     size = EntityMapper.normalize_size(size)
-        # if category:
-        #     category = EntityMapper.normalize_category(category)
-        
-        # Construir parámetros
-        params = {
-            # "keyword": keyword,
-            "category": category,
-            "color": color,
-            "size": size,
-            "name": name,
-            # "min_price": min_price,
-            # "max_price": max_price,
-            # "page": page,
-            # "limit": 10  # Límite por página
-        }
-        
-        # Filtrar parámetros None
-        params = {k: v for k, v in params.items() if v is not None}
-        
-        # Llamada con timeout y retry
-        response = requests.get(
-            f"{backend_url}/products/search",
-            params=params,
-            timeout=10,
-            headers={'User-Agent': 'Shopping-Agent/1.0'}
-        )
-        print(f"Request URL: {response.url}")  # Debugging: Ver URL completa de la solicitud
-        
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Formatear respuesta estructurada
-        if data.get('data'):
-            products = []
-            for item in data['data']:
-                # Cada producto tiene variants, tomamos el primer variant para mostrar info básica
-                variant = item.get('variants', [{}])[0] if item.get('variants') else {}
-                product_info = {
-                    'id': item.get('id'),
-                    'name': item.get('name', 'Sin nombre'),
-                    'category': item.get('category', ''),
-                    'description': item.get('description', ''),
-                    'color': variant.get('color', ''),
-                    'size': variant.get('size', ''),
-                    'price': variant.get('price50U', 'N/A'),
-                    'stock': variant.get('stock', 0)
-                }
-                products.append(f"• {product_info['name']} (ID: {product_info['id']}) - ${product_info['price']} - {product_info['category']}")
-            
-            # Información de paginación según example.json
-            meta = data.get('meta', {})
-            total_pages = meta.get('pageCount', 1)
-            current_page = meta.get('page', 1)
-            item_count = meta.get('itemCount', 0)
-            
-            result = f"Productos encontrados ({item_count} resultados):\n"
-            result += "\n".join(products)
-            result += f"\n\nPágina {current_page} de {total_pages}"
-            
-            if meta.get('hasNextPage'):
-                result += f"\n💡 Hay más resultados. Puedes pedir 'siguiente página' para ver más."
-            
-            return result
+        # Normalizar entidades a los valores del catálogo ("verde" -> "Verde", "grande" -> "L")
+        search_params = normalize_search_params(ProductSearchParams(
+            category=category, name=name, color=color, size=size,
+            min_price=min_price, max_price=max_price, page=page
+        ))
+        # Con LOCAL_PRODUCT_INDEX activo la búsqueda se resuelve en memoria
+        index = get_product_index()
+        cache_key = search_params.cache_key()
+        if index is not None:
+            data = index.search(search_params)
         else:
-            return f"No se encontraron productos con los filtros especificados."
+            data = search_cache.get(cache_key)
+        
+        if data is None:
+            # Llamada con timeout y retry (pool compartido)
+            response = backend.get(
+                "/products/search",
+                endpoint="products.search",
+                # "siguiente página" de una búsqueda ya vista va por keyset con el cursor
+                params=search_params.to_query_params(next_page_cursor(search_params))
+            )
+            response.raise_for_status()
+            
+            data = response.json()
+            search_cache.set(cache_key, data, size=len(response.content))
+            remember_next_cursor(search_params, data)
+        
+        # PRODUCT_PREFETCH: el detalle de los primeros resultados se pide en segundo plano
+        product_prefetcher.schedule(current_session(), data)
+        return format_search_results(data, **search_params.variant_filters())
             
     except requests.exceptions.Timeout:
         raise ToolException("La búsqueda tardó demasiado. Intenta de nuevo.")
@@ -190,58 +102,48 @@ def search_products( category: str = None, name:str = None, color: str = None,
     except Exception as e:
         raise ToolException(f"Error inesperado en la búsqueda: {str(e)}")
 
+@tool
+def rank_products(query: str, limit: int = 5) -> str:
+    """
+    Busca productos por una descripción en texto libre ("algo cómodo para correr",
+    "ropa para una fiesta") cuando el usuario no da nombre, categoría, color ni talla.
+    Retorna los productos más relevantes con nombre y categoría para usar en search_products.
+
+    Args:
+        query: lo que pidió el usuario, con sus palabras
+        limit: cantidad máxima de productos a retornar
+    """
+    try:
+        # Ranking BM25 local (ranking.py): no consulta al backend
+        hits = get_ranking_index().search(query, limit=limit)
+    except Exception as e:
+        raise ToolException(f"Error inesperado en la búsqueda por relevancia: {str(e)}")
+    return format_ranked_products(query, hits)
+
 @tool
 def get_product_details(product_id: str) -> str:
     """
     Obtiene detalles completos de un producto específico.
     Incluye descripción, especificaciones, disponibilidad y reseñas.
+    Para comparar varios productos pide todos en el mismo turno: se consultan en paralelo.
     """
-    backend_url = os.getenv('BACKEND_URL', 'http://localhost:3000')
+    backend = get_backend_client()
     
     try:
-        response = requests.get(
-            f"{backend_url}/products/{product_id}",
-            timeout=10,
-            headers={'User-Agent': 'Shopping-Agent/1.0'}
-        )
-        response.raise_for_status()
-        
-        product = response.json()
-        
-        # Formatear información completa
-        details = f"""
-📦 **{product.get('name', 'Sin nombre')}**
-📂 Categoría: {product.get('category', 'N/A')}
-📋 Descripción: {product.get('description', 'Sin descripción')}
-
-🎽 **Variantes disponibles:**
-"""
-        
-        # Parsear variants correctamente
-        variants = product.get('variants', [])
-        if variants:
-            # Agrupar por talla y color para mostrar disponibilidad
-            available_variants = []
-            unavailable_variants = []
-            
-            for variant in variants:
-                variant_info = f"  • Talla {variant.get('size', 'N/A')} - {variant.get('color', 'N/A')} - ${variant.get('price50U', 'N/A')} - Stock: {variant.get('stock', 0)}"
-                
-                if variant.get('isAvailable', False) and variant.get('stock', 0) > 0:
-                    available_variants.append(variant_info + " ✅")
-                else:
-                    unavailable_variants.append(variant_info + " ❌")
-            
-            if available_variants:
-                details += "\n🟢 **Disponibles:**\n" + "\n".join(available_variants)
+        product = product_prefetcher.lookup(current_session(), product_id) or product_cache.get(str(product_id))
+        if product is None:
+            response = backend.get(
+                f"/products/{product_id}",
+                endpoint="products.detail"
+            )
+            response.raise_for_status()
             
-            if unavailable_variants:
-                details += "\n\n🔴 **No disponibles:**\n" + "\n".join(unavailable_variants)
-        else:
-            details += "\nNo hay variantes disponibles"
+            product = response.json()
+            product_cache.set(str(product_id), product, size=len(response.content))
         
-        print(details)
-        return details.strip()
+        details = format_product_details(product)
+        debug("tool.get_product_details", product_id=product_id, chars=len(details))
+        return details
         
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 404:
@@ -257,14 +159,13 @@ def create_cart() -> str:
     Crea un nuevo carrito de compras para el usuario.
     Retorna el ID del carrito creado.
     """
-    backend_url = os.getenv('BACKEND_URL', 'http://localhost:3000')
+    backend = get_backend_client()
     
     try:
-        response = requests.post(
-            f"{backend_url}/carts",
-            json={'created_at': datetime.now().isoformat()},
-            timeout=10,
-            headers={'User-Agent': 'Shopping-Agent/1.0'}
+        response = backend.post(
+            "/carts",
+            endpoint="carts.create",
+            json={'created_at': datetime.now().isoformat()}
         )
         response.raise_for_status()
         
@@ -278,32 +179,63 @@ def create_cart() -> str:
     except Exception as e:
         raise ToolException(f"Error inesperado creando carrito: {str(e)}")
 
+def _send_cart_operation(cart_id: str, operation: dict) -> None:
+    """Envía una operación de carrito a su endpoint individual"""
+    backend = get_backend_client()
+    if operation['op'] == 'add':
+        response = backend.post(
+            f"/carts/{cart_id}/items",
+            endpoint="carts.add_item",
+            json={
+                'product_variant_id': operation['product_variant_id'],
+                'qty': operation['qty']
+            }
+        )
+    else:
+        response = backend.patch(
+            f"/carts/{cart_id}/items/{operation['item_id']}",
+            endpoint="carts.update_item",
+            json={'qty': operation['qty']}
+        )
+    response.raise_for_status()
+    # POST y PATCH devuelven el carrito completo: su ETag cubre también precios y stock
+    cart_mirror.store(cart_id, response.json(), response.headers.get('ETag'))
+
+def _send_cart_bulk(cart_id: str, operations: List[dict]) -> dict:
+    """Aplica varias operaciones en una sola transacción y retorna el carrito actualizado"""
+    response = get_backend_client().post(
+        f"/carts/{cart_id}/items/bulk",
+        endpoint="carts.bulk",
+        json={'operations': operations}
+    )
+    response.raise_for_status()
+    cart = response.json()
+    cart_mirror.store(cart_id, cart, response.headers.get('ETag'))
+    return cart
+
+# add_item_to_cart / update_cart_item de un mismo paso viajan en un solo request
+cart_coalescer = CartCoalescer(_send_cart_bulk, _send_cart_operation)
+
 @tool
 def add_item_to_cart(cart_id: str, product_variant_id: int, qty: int = 1) -> str:
     """
     Agrega un item específico al carrito usando el ID de la variante del producto.
+    Para agregar varias variantes haz todas las llamadas en el mismo turno: se ejecutan en paralelo.
     
     Args:
         cart_id: ID del carrito
         product_variant_id: ID de la variante del producto a agregar
         qty: Cantidad del producto (por defecto 1)
     """
-    backend_url = os.getenv('BACKEND_URL', 'http://localhost:3000')
-    
     if not cart_id:
         raise ToolException("Necesitas proporcionar un cart_id válido.")
     
     try:
-        response = requests.post(
-            f"{backend_url}/carts/{cart_id}/items",
-            json={
-                'product_variant_id': product_variant_id,
-                'qty': qty
-            },
-            timeout=10,
-            headers={'User-Agent': 'Shopping-Agent/1.0'}
-        )
-        response.raise_for_status()
+        cart_coalescer.submit(str(cart_id), {
+            'op': 'add',
+            'product_variant_id': product_variant_id,
+            'qty': qty
+        })
         
         return f"✅ Item agregado al carrito ID {cart_id}: Variante {product_variant_id} (cantidad: {qty})"
         
@@ -325,19 +257,11 @@ def update_cart_item(cart_id: str, item_id: int, qty: int) -> str:
         item_id: ID del item en el carrito(es el id del cart-item, no del product-variant)
         qty: Nueva cantidad del item
     """
-    backend_url = os.getenv('BACKEND_URL', 'http://localhost:3000')
-    
     if not cart_id:
         raise ToolException("Necesitas proporcionar un cart_id válido.")
     
     try:
-        response = requests.patch(
-            f"{backend_url}/carts/{cart_id}/items/{item_id}",
-            json={'qty': qty},
-            timeout=10,
-            headers={'User-Agent': 'Shopping-Agent/1.0'}
-        )
-        response.raise_for_status()
+        cart_coalescer.submit(str(cart_id), {'op': 'update', 'item_id': item_id, 'qty': qty})
         
         return f"✅ Item actualizado en carrito ID {cart_id}: Item {item_id} ahora tiene cantidad {qty}"
         
@@ -349,6 +273,33 @@ def update_cart_item(cart_id: str, item_id: int, qty: int) -> str:
     except Exception as e:
         raise ToolException(f"Error inesperado actualizando item: {str(e)}")
 
+@tool(args_schema=BulkCartUpdateParams)
+def bulk_update_cart(cart_id: str, operations: List[CartOperation]) -> str:
+    """
+    Aplica varias operaciones al carrito en una sola llamada y una sola transacción:
+    agregar variantes (add), cambiar cantidades (update) y quitar items (remove).
+    Úsala en lugar de varias llamadas a add_item_to_cart / update_cart_item.
+    Si una operación falla no se aplica ninguna. Retorna el carrito actualizado.
+    """
+    if not cart_id:
+        raise ToolException("Necesitas proporcionar un cart_id válido.")
+    
+    try:
+        payload = [CartOperation.model_validate(op).to_payload() for op in operations]
+        cart = _send_cart_bulk(str(cart_id), payload)
+        
+        return f"✅ {len(payload)} operaciones aplicadas al carrito ID {cart_id}\n" + format_cart_details(str(cart_id), cart)
+        
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 404:
+            raise ToolException("Carrito, item o variante no encontrada. No se aplicó ningún cambio.")
+        elif e.response.status_code == 400:
+            raise ToolException(f"Operaciones inválidas: {e.response.text}")
+        else:
+            raise ToolException(f"Error actualizando carrito: {e.response.status_code}")
+    except Exception as e:
+        raise ToolException(f"Error inesperado actualizando carrito: {str(e)}")
+
 @tool
 def update_cart_metadata(cart_id: str, cart_data: dict) -> str:
     """
@@ -358,17 +309,16 @@ def update_cart_metadata(cart_id: str, cart_data: dict) -> str:
         cart_id: ID del carrito
         cart_data: Datos del carrito a actualizar (ej: metadatos, fechas, etc.)
     """
-    backend_url = os.getenv('BACKEND_URL', 'http://localhost:3000')
+    backend = get_backend_client()
     
     if not cart_id:
         raise ToolException("Necesitas proporcionar un cart_id válido.")
     
     try:
-        response = requests.patch(
-            f"{backend_url}/carts/{cart_id}",
-            json=cart_data,
-            timeout=10,
-            headers={'User-Agent': 'Shopping-Agent/1.0'}
+        response = backend.patch(
+            f"/carts/{cart_id}",
+            endpoint="carts.update",
+            json=cart_data
         )
         response.raise_for_status()
         
@@ -391,48 +341,26 @@ def get_cart_details(cart_id: str) -> str:
     Args:
         cart_id: ID del carrito a consultar
     """
-    backend_url = os.getenv('BACKEND_URL', 'http://localhost:3000')
+    backend = get_backend_client()
     
     if not cart_id:
         raise ToolException("Necesitas proporcionar un cart_id válido.")
     
     try:
-        response = requests.get(
-            f"{backend_url}/carts/{cart_id}",
-            timeout=10,
-            headers={'User-Agent': 'Shopping-Agent/1.0'}
+        # GET condicional: con 304 se responde desde la copia local del carrito
+        response = backend.get(
+            f"/carts/{cart_id}",
+            endpoint="carts.detail",
+            headers=cart_mirror.request_headers(cart_id)
         )
+        if response.status_code == 304:
+            cached = cart_mirror.cached_details(cart_id)
+            if cached is not None:
+                return cached
+            response = backend.get(f"/carts/{cart_id}", endpoint="carts.detail")
         response.raise_for_status()
         
-        cart_data = response.json()
-        
-        # Formatear información detallada del carrito
-        if not cart_data.get('cartItems'):
-            return f"🛒 El carrito ID {cart_id} está vacío."
-        
-        cart_details = f"""
-🛒 **Carrito ID {cart_id}:**
-- Total de items: {len(cart_data.get('cartItems', []))}
-- Items detallados:"""
-        
-        total_value = 0
-        for item in cart_data.get('cartItems', []):
-            variant = item.get('productVariant', {})
-            product = variant.get('product', {})
-            item_total = float(variant.get('price50U', 0)) * item.get('qty', 0)
-            total_value += item_total
-            
-            cart_details += f"""
-  • {product.get('name', 'Producto')} (ID: {product.get('id', 'N/A')})
-    Variante: Talla {variant.get('size', 'N/A')} - Color {variant.get('color', 'N/A')}
-    Cantidad: {item.get('qty', 0)} × ${variant.get('price50U', 'N/A')} = ${item_total:.2f}"""
-        
-        cart_details += f"\n\n💰 **Total estimado: ${total_value:.2f}**"
-        
-        # Agregar contexto completo para el agente
-        cart_details += f"\n\n🔍 **Datos completos del carrito:** {json.dumps(cart_data, indent=2)}"
-        
-        return cart_details
+        return cart_mirror.refresh(cart_id, response)
         
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 404:
@@ -442,44 +370,165 @@ def get_cart_details(cart_id: str) -> str:
     except Exception as e:
         raise ToolException(f"Error inesperado obteniendo carrito: {str(e)}")
 
-# 4. AGENTE MEJORADO CON LANGGRAPH
-class ShoppingAgent:
-    def __init__(self):
-        # Configurar LLM con parámetros optimizados
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=os.getenv('GEMINI_API_KEY'),
-            temperature=0.1,  # Baja temperatura para determinismo
-            max_tokens=2048,
-            top_p=0.8,
-            top_k=40
-        )
-        
-        # Configurar memoria persistente
-        self.memory = MemorySaver()
-        
-        # Crear herramientas
-        self.tools = [
-            search_products,
-            get_product_details,
-            create_cart,
-            add_item_to_cart,        # Nueva herramienta
-            update_cart_item,        # Nuev herramienta  
-            update_cart_metadata,     # Nueva herramienta
-            get_cart_details
-        ]
-        
+# Arranque rápido (FAST_START=on): ShoppingAgent() no importa Gemini ni compila
+# el grafo hasta el primer turno (o warm_up()), y las instancias comparten el
+# cliente del LLM y el checkpointer por defecto, así reutilizan el mismo grafo
+FAST_START = os.getenv('FAST_START', 'off').lower() in ('on', '1', 'true')
+GRAPH_CACHE_SIZE = int(os.getenv('GRAPH_CACHE_SIZE', '8'))
+
+# (id(llm), id(checkpointer), async_mode, nombres de las herramientas)
+#   -> (llm, checkpointer, tool_node, grafo).
+# La entrada guarda el LLM y el checkpointer para que sus id no se reutilicen.
+_graph_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_graph_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def default_llm():
+    """Cliente de Gemini por defecto, uno por proceso"""
+    start = time.perf_counter()
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    
+    # Configurar LLM con parámetros optimizados
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        google_api_key=os.getenv('GEMINI_API_KEY'),
+        temperature=0.1,  # Baja temperatura para determinismo
+        max_tokens=2048,
+        top_p=0.8,
+        top_k=40
+    )
+    metrics.observe("agent_startup_seconds", time.perf_counter() - start, phase="llm_client")
+    return llm
+
+
+@lru_cache(maxsize=1)
+def shared_checkpointer():
+    """Checkpointer por defecto compartido entre instancias en arranque rápido"""
+    return make_checkpointer()
+
+
+def build_graph(llm, tools: List, checkpointer, async_mode: bool):
+    """
+    Retorna (tool_node, grafo) para el LLM, las herramientas y el checkpointer
+    dados; las instancias que comparten los tres reutilizan el grafo ya compilado.
+    """
+    key = (id(llm), id(checkpointer), async_mode, tuple(t.name for t in tools))
+    with _graph_cache_lock:
+        cached = _graph_cache.get(key)
+        if cached is not None:
+            _graph_cache.move_to_end(key)
+            metrics.inc("agent_graph_cache_total", result="hit")
+            return cached[2], cached[3]
+
+        start = time.perf_counter()
+        from langgraph.prebuilt import ToolNode, create_react_agent
+
+        # Las tool calls de un mismo turno corren en paralelo (hilos en sync,
+        # asyncio.gather en async); un error queda aislado en su ToolMessage
+        tool_node = ToolNode(tools, handle_tool_errors=True)
+
         # Crear agente con LangGraph
-        self.agent = create_react_agent(
-            self.llm,
-            self.tools,
-            checkpointer=self.memory,
-            state_schema=ShoppingSessionState
+        graph = create_react_agent(
+            llm,
+            tool_node,
+            checkpointer=checkpointer,
+            state_schema=ShoppingSessionState,
+            # Compacta el historial antes de cada llamada al LLM (PROMPT_TOKEN_BUDGET)
+            pre_model_hook=make_compaction_hook()
         )
+        _graph_cache[key] = (llm, checkpointer, tool_node, graph)
+        if len(_graph_cache) > GRAPH_CACHE_SIZE:
+            _graph_cache.popitem(last=False)
+    metrics.inc("agent_graph_cache_total", result="miss")
+    metrics.observe("agent_startup_seconds", time.perf_counter() - start, phase="graph_build")
+    return tool_node, graph
+
+
+# 4. AGENTE MEJORADO CON LANGGRAPH
+class ShoppingAgent:
+    def __init__(self, llm=None, async_mode: bool = False, checkpointer=None,
+                 max_concurrency: Optional[int] = None, fast_start: Optional[bool] = None):
+        start = time.perf_counter()
+        self.fast_start = FAST_START if fast_start is None else fast_start
+        # Sin llm explícito se usa default_llm(), creado recién al construir el grafo
+        self._llm = llm
+        self.async_mode = async_mode
+        
+        # Configurar memoria persistente (CHECKPOINT_BACKEND=memory|sqlite)
+        if checkpointer is None:
+            checkpointer = shared_checkpointer() if self.fast_start else make_checkpointer()
+        self.memory = checkpointer
+        
+        # Crear herramientas (en modo async no bloquean el event loop)
+        if async_mode:
+            from async_tools import ASYNC_TOOLS, cart_coalescer as async_cart_coalescer
+            from async_tools import product_prefetcher as async_product_prefetcher
+            self.tools = list(ASYNC_TOOLS)
+            self.cart_coalescer = async_cart_coalescer
+            self.prefetcher = async_product_prefetcher
+        else:
+            self.tools = [
+                search_products,
+                rank_products,
+                get_product_details,
+                create_cart,
+                add_item_to_cart,        # Nueva herramienta
+                update_cart_item,        # Nuev herramienta  
+                bulk_update_cart,
+                update_cart_metadata,     # Nueva herramienta
+                get_cart_details
+            ]
+            self.cart_coalescer = cart_coalescer
+            self.prefetcher = product_prefetcher
+        
+        # Tope de hilos por turno en modo sync (TOOL_MAX_CONCURRENCY)
+        self.max_concurrency = max_concurrency or int(os.getenv('TOOL_MAX_CONCURRENCY', '8'))
+        
+        self.tool_node = None
+        self._graph = None
+        self._graph_lock = threading.Lock()
+        
+        # Comandos simples ("ver carrito", "siguiente página") sin pasar por el LLM
+        self.router = FastPathRouter(lambda: self.agent, self.tools)
+        self.instrumentation = InstrumentationCallbackHandler()
         
         # ID de sesión para memoria persistente
         self.session_id = "shopping_session_1"
         
+        if not self.fast_start:
+            self.warm_up()
+        metrics.observe("agent_startup_seconds", time.perf_counter() - start, phase="init")
+    
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = default_llm()
+        return self._llm
+    
+    @property
+    def agent(self):
+        """Grafo ReAct compilado; en arranque rápido se construye en el primer uso"""
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    self.tool_node, self._graph = build_graph(
+                        self.llm, self.tools, self.memory, self.async_mode
+                    )
+        return self._graph
+    
+    def warm_up(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Crea el cliente del LLM y compila el grafo por adelantado. Con
+        background=True lo hace en un hilo, así el worker atiende mientras tanto.
+        """
+        if not background:
+            self.agent
+            return None
+        thread = threading.Thread(target=self.warm_up, name="agent-warm-up", daemon=True)
+        thread.start()
+        return thread
+        
     def _update_session_context(self, state: ShoppingSessionState, 
                               user_message: str) -> ShoppingSessionState:
         """Actualiza el contexto de la sesión con información relevante"""
@@ -506,47 +555,244 @@ class ShoppingAgent:
         
         return state
     
-    def chat(self, message: str) -> str:
+    def _config(self, session_id: Optional[str] = None) -> dict:
+        """Config de LangGraph para el thread de la sesión"""
+        config = {
+            "configurable": {"thread_id": session_id or self.session_id},
+            "max_concurrency": self.max_concurrency,
+        }
+        if metrics.enabled:
+            config["callbacks"] = [self.instrumentation]
+        return config
+    
+    @staticmethod
+    def _extract_reply(response) -> str:
+        """Extrae el texto del último mensaje del agente"""
+        if response and "messages" in response:
+            last_message = response["messages"][-1]
+            if hasattr(last_message, 'content'):
+                return last_message.content
+        
+        return "Lo siento, no pude procesar tu mensaje correctamente."
+    
+    def chat(self, message: str, session_id: Optional[str] = None) -> str:
         """
         Procesa un mensaje del usuario con contexto mejorado
         """
         try:
-            # Configurar thread para memoria persistente
-            config = {"configurable": {"thread_id": self.session_id}}
+            config = self._config(session_id)
+            reply = self.router.route(message, config)
+            if reply is not None:
+                return reply
             
             # Procesar mensaje con el agente
+            start = time.perf_counter()
             response = self.agent.invoke(
                 {"messages": [HumanMessage(content=message)]},
                 config=config
             )
+            self.router.stats.record_llm_turn(time.perf_counter() - start)
+            metrics.observe("agent_react_steps", react_steps(response["messages"]))
+            
+            return self._extract_reply(response)
+            
+        except OutputParserException as e:
+            return f"Hubo un problema interpretando tu mensaje: {str(e)}"
+        except Exception as e:
+            return f"Error procesando tu mensaje: {str(e)}"
+    
+    async def achat(self, message: str, session_id: Optional[str] = None) -> str:
+        """
+        Versión async de chat(): varias sesiones pueden compartir el mismo event loop
+        """
+        try:
+            config = self._config(session_id)
+            reply = await self.router.aroute(message, config)
+            if reply is not None:
+                return reply
             
-            # Extraer respuesta del agente
-            if response and "messages" in response:
-                last_message = response["messages"][-1]
-                if hasattr(last_message, 'content'):
-                    return last_message.content
+            start = time.perf_counter()
+            response = await self.agent.ainvoke(
+                {"messages": [HumanMessage(content=message)]},
+                config=config
+            )
+            self.router.stats.record_llm_turn(time.perf_counter() - start)
+            metrics.observe("agent_react_steps", react_steps(response["messages"]))
             
-            return "Lo siento, no pude procesar tu mensaje correctamente."
+            return self._extract_reply(response)
             
         except OutputParserException as e:
             return f"Hubo un problema interpretando tu mensaje: {str(e)}"
         except Exception as e:
             return f"Error procesando tu mensaje: {str(e)}"
     
-    def get_session_info(self) -> dict:
+    def stream_events(self, message: str, session_id: Optional[str] = None) -> Iterator[dict]:
+        """
+        Procesa un mensaje emitiendo eventos a medida que ocurren: tokens del LLM,
+        inicio y fin de cada herramienta y la respuesta final (ver streaming.py)
+        """
+        config = self._config(session_id)
+        try:
+            routed = self.router.resolve(message, config)
+            if routed is not None:
+                yield from fast_path_events(routed)
+                return
+            
+            start, steps = time.perf_counter(), 0
+            for mode, payload in self.agent.stream(
+                {"messages": [HumanMessage(content=message)]},
+                config=config,
+                stream_mode=STREAM_MODES
+            ):
+                if mode == "updates" and "agent" in (payload or {}):
+                    steps += 1
+                yield from graph_events(mode, payload)
+            self.router.stats.record_llm_turn(time.perf_counter() - start)
+            metrics.observe("agent_react_steps", steps)
+            
+        except Exception as e:
+            yield {"type": "error", "message": f"Error procesando tu mensaje: {str(e)}"}
+    
+    async def astream_events(self, message: str, session_id: Optional[str] = None) -> AsyncIterator[dict]:
+        """Versión async de stream_events()"""
+        config = self._config(session_id)
+        try:
+            routed = await self.router.aresolve(message, config)
+            if routed is not None:
+                for event in fast_path_events(routed):
+                    yield event
+                return
+            
+            start, steps = time.perf_counter(), 0
+            async for mode, payload in self.agent.astream(
+                {"messages": [HumanMessage(content=message)]},
+                config=config,
+                stream_mode=STREAM_MODES
+            ):
+                if mode == "updates" and "agent" in (payload or {}):
+                    steps += 1
+                for event in graph_events(mode, payload):
+                    yield event
+            self.router.stats.record_llm_turn(time.perf_counter() - start)
+            metrics.observe("agent_react_steps", steps)
+            
+        except Exception as e:
+            yield {"type": "error", "message": f"Error procesando tu mensaje: {str(e)}"}
+    
+    async def astream(self, message: str, session_id: Optional[str] = None):
+        """
+        Genera el texto de la respuesta del agente a medida que el LLM lo produce
+        """
+        streamed = False
+        async for event in self.astream_events(message, session_id):
+            if event["type"] == "token":
+                streamed = True
+                yield event["text"]
+            elif event["type"] == "final" and not streamed and event["text"]:
+                # Camino rápido o un LLM que no genera por tokens
+                yield event["text"]
+            elif event["type"] == "error":
+                yield event["message"]
+    
+    def get_session_info(self, session_id: Optional[str] = None) -> dict:
         """Retorna información de la sesión actual"""
         try:
-            config = {"configurable": {"thread_id": self.session_id}}
-            state = self.agent.get_state(config)
+            state = self.agent.get_state(self._config(session_id))
             return {
-                "session_id": self.session_id,
+                "session_id": session_id or self.session_id,
                 "message_count": len(state.values.get("messages", [])),
-                "last_activity": datetime.now().isoformat()
+                "last_activity": datetime.now().isoformat(),
+                "backend_pool": get_backend_client().pool_stats(),
+                "response_cache": cache_stats(),
+                "cart_id": state.values.get("cart_id"),
+                "active_filters": state.values.get("active_filters", {}),
+                "prompt_compaction": compaction_stats.as_dict(),
+                "search_normalization": get_normalizer().stats(),
+                "fast_path": self.router.stats.as_dict(),
+                "cart_batching": self.cart_coalescer.stats.as_dict(),
+                "cart_mirror": cart_mirror.stats(),
+                "product_prefetch": self.prefetcher.report()
             }
         except Exception as e:
             return {"error": str(e)}
+    
+    @staticmethod
+    def _trim_update(messages: List, max_messages: int) -> Optional[dict]:
+        """
+        Update que descarta los turnos más viejos para dejar a lo sumo
+        max_messages. Corta siempre al inicio de un mensaje humano, para no
+        dejar resultados de herramientas sin la tool call que los originó.
+        """
+        if len(messages) <= max_messages:
+            return None
+        
+        cut = len(messages) - max_messages
+        while cut < len(messages) and not isinstance(messages[cut], HumanMessage):
+            cut += 1
+        if cut >= len(messages):
+            return None
+        return {"messages": [RemoveMessage(id=m.id) for m in messages[:cut]]}
+    
+    def trim_history(self, session_id: str, max_messages: int) -> int:
+        """
+        Descarta los turnos más viejos del thread para acotar su memoria.
+        Retorna la cantidad de mensajes eliminados.
+        """
+        config = self._config(session_id)
+        messages = self.agent.get_state(config).values.get("messages", [])
+        update = self._trim_update(messages, max_messages)
+        if update is None:
+            return 0
+        self.agent.update_state(config, update)
+        return len(update["messages"])
+    
+    async def atrim_history(self, session_id: str, max_messages: int) -> int:
+        """Versión async de trim_history(), no bloquea el event loop"""
+        config = self._config(session_id)
+        messages = (await self.agent.aget_state(config)).values.get("messages", [])
+        update = self._trim_update(messages, max_messages)
+        if update is None:
+            return 0
+        await self.agent.aupdate_state(config, update)
+        return len(update["messages"])
+    
+    def end_session(self, session_id: str) -> None:
+        """Borra los checkpoints del thread de la sesión y lo que tenga prefetcheado"""
+        self.memory.delete_thread(session_id)
+        self.prefetcher.store.drop_session(session_id)
+
+metrics.observe("agent_startup_seconds", time.perf_counter() - _import_start, phase="import")
 
 # 5. EJEMPLO DE USO CON MANEJO DE ERRORES
+def print_stream(events) -> None:
+    """Imprime los eventos de stream_events() a medida que llegan"""
+    streamed = False
+    at_line_start = True  # falta el prefijo "Agente:" antes del próximo texto
+    for event in events:
+        text = None
+        if event["type"] == "token":
+            streamed = True
+            text = event["text"]
+        elif event["type"] == "final" and not streamed:
+            text = event["text"]
+        elif event["type"] == "error":
+            text = event["message"]
+        elif event["type"] in ("tool_start", "tool_end"):
+            if not at_line_start:
+                print()
+                at_line_start = True
+            if event["type"] == "tool_start":
+                print(f"   🔧 {event['name']}({event['args']})", flush=True)
+            else:
+                preview = str(event["output"]).strip().split("\n")[0][:80]
+                print(f"   ✓ {event['name']}: {preview}", flush=True)
+        if text:
+            if at_line_start:
+                print("Agente: ", end="")
+                at_line_start = False
+            print(text, end="", flush=True)
+    print("\n")
+
 if __name__ == "__main__":
     print("🤖 Agente de compras con LangChain mejorado iniciado!")
     print("✨ Funciones disponibles:")
@@ -556,7 +802,7 @@ if __name__ == "__main__":
     print("   • Paginación automática")
     print("   • Gestión de carritos")
     print("   • Memoria conversacional")
-    print("\nEscribe 'salir' para terminar, 'info' para ver estado de sesión.\n")
+    print("\nEscribe 'salir' para terminar, 'info' para ver estado de sesión, 'metrics' para métricas.\n")
     
     try:
         agent = ShoppingAgent()
@@ -568,6 +814,10 @@ if __name__ == "__main__":
                 print("¡Hasta luego!")
                 break
             
+            if user_input.lower() == 'metrics':
+                print(metrics.to_prometheus() if metrics.enabled else "Instrumentación desactivada (INSTRUMENTATION=on)\n")
+                continue
+            
             if user_input.lower() == 'info':
                 info = agent.get_session_info()
                 print(f"📊 Info de sesión: {info}\n")
@@ -576,8 +826,7 @@ if __name__ == "__main__":
             if not user_input:
                 continue
                 
-            response = agent.chat(user_input)
-            print(f"Agente: {response}\n")
+            print_stream(agent.stream_events(user_input))
             
     except KeyboardInterrupt:
         print("\n¡Hasta luego!")
@@ -0,0 +1,49 @@
+from typing import Dict, Iterator
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+# Eventos que emiten ShoppingAgent.stream_events() / astream_events():
+#   {"type": "token", "text": ...}                            texto del LLM a medida que se genera
+#   {"type": "tool_start", "name": ..., "args": ..., "id": ...}  el LLM decidió llamar una herramienta
+#   {"type": "tool_end", "name": ..., "id": ..., "output": ..., "status": ...}
+#   {"type": "final", "text": ..., "fast_path": bool}         respuesta completa del turno
+#   {"type": "error", "message": ...}
+STREAM_MODES = ["messages", "updates"]
+
+
+def graph_events(mode: str, payload) -> Iterator[Dict]:
+    """Traduce un item de graph.stream(stream_mode=STREAM_MODES) a eventos"""
+    if mode == "messages":
+        chunk, metadata = payload
+        # Solo texto del nodo del LLM, los resultados de herramientas llegan como tool_end
+        if metadata.get("langgraph_node") == "agent" and isinstance(chunk.content, str) and chunk.content:
+            yield {"type": "token", "text": chunk.content}
+        return
+
+    for node, update in (payload or {}).items():
+        if not isinstance(update, dict):
+            continue
+        for message in update.get("messages", []):
+            if node == "agent" and isinstance(message, AIMessage):
+                if message.tool_calls:
+                    for call in message.tool_calls:
+                        yield {"type": "tool_start", "name": call["name"], "args": call["args"], "id": call["id"]}
+                else:
+                    yield {"type": "final", "text": message.content, "fast_path": False}
+            elif node == "tools" and isinstance(message, ToolMessage):
+                yield {
+                    "type": "tool_end",
+                    "name": message.name,
+                    "id": message.tool_call_id,
+                    "output": message.content,
+                    "status": getattr(message, "status", "success"),
+                }
+
+
+def fast_path_events(result: Dict) -> Iterator[Dict]:
+    """Eventos de un comando resuelto por FastPathRouter, con la misma forma que los del grafo"""
+    # El mismo id que quedó guardado en el thread
+    call_id = result["call_id"]
+    yield {"type": "tool_start", "name": result["tool"], "args": result["args"], "id": call_id}
+    yield {"type": "tool_end", "name": result["tool"], "id": call_id, "output": result["output"], "status": result["status"]}
+    yield {"type": "final", "text": result["reply"], "fast_path": True}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos del agente se importan como top-level (igual que en benchmarks)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from backend_client import BackendClient
+from benchmarks.stub_backend import start_stub_backend
+from cart_batching import CartCoalescer
+
+# El alta directa tarda LATENCY en el backend: las que llegan mientras tanto se agrupan
+LATENCY_MS = 60
+WINDOW = 0.02
+
+
+@pytest.fixture
+def backend():
+    server, url = start_stub_backend(latency_ms=LATENCY_MS)
+    handler = server.RequestHandlerClass
+    handler.calls = {"add_item": 0, "bulk": 0}
+    for name in ("add_item", "bulk"):
+        original = getattr(handler, f"_handle_{name}")
+
+        def counted(self, *args, _name=name, _original=original):
+            type(self).calls[_name] += 1
+            return _original(self, *args)
+
+        setattr(handler, f"_handle_{name}", counted)
+    handler.cart_id = handler.store.create_cart()['id']
+    client = BackendClient(base_url=url, max_retries=0)
+    yield handler, client
+    server.shutdown()
+    server.server_close()
+
+
+def _coalescer(client: BackendClient, timeout: float = 2.0) -> CartCoalescer:
+    def send_one(cart_id, operation):
+        response = client.post(f"/carts/{cart_id}/items", timeout=timeout, json={
+            'product_variant_id': operation['product_variant_id'], 'qty': operation['qty']})
+        response.raise_for_status()
+
+    def send_bulk(cart_id, operations):
+        response = client.post(f"/carts/{cart_id}/items/bulk", timeout=timeout, json={'operations': operations})
+        response.raise_for_status()
+
+    return CartCoalescer(send_bulk, send_one, window=WINDOW)
+
+
+def _submit_concurrently(coalescer: CartCoalescer, cart_id: int, count: int = 4) -> list:
+    """Como el ToolNode: un hilo por llamada; retorna la excepción de cada una (o None)"""
+    errors = [None] * count
+
+    def run(i):
+        try:
+            coalescer.submit(str(cart_id), {'op': 'add', 'product_variant_id': i + 1, 'qty': 10})
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    threads[0].start()
+    time.sleep(0.01)  # la primera sale directa; el resto llega con ella en vuelo
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return errors
+
+
+def _items(handler) -> int:
+    return len(handler.store.carts[handler.cart_id]['cartItems'])
+
+
+def test_lone_operation_is_sent_directly(backend):
+    handler, client = backend
+    _coalescer(client).submit(str(handler.cart_id), {'op': 'add', 'product_variant_id': 1, 'qty': 1})
+    assert handler.calls == {"add_item": 1, "bulk": 0}
+
+
+def test_concurrent_adds_travel_in_one_bulk(backend):
+    handler, client = backend
+    coalescer = _coalescer(client)
+    assert _submit_concurrently(coalescer, handler.cart_id) == [None] * 4
+    assert handler.calls == {"add_item": 1, "bulk": 1}
+    assert _items(handler) == 4
+    assert coalescer.stats.as_dict()["batched_operations"] == 3
+
+
+@pytest.mark.parametrize("status, body, still_supported", [
+    (404, {"message": "Cannot POST /carts/1/items/bulk", "error": "Not Found", "statusCode": 404}, False),
+    (400, {"message": ["operations.0.qty must not be less than 1"], "statusCode": 400}, True),
+])
+def test_rejected_bulk_falls_back_to_one_request_per_operation(backend, status, body, still_supported):
+    handler, client = backend
+    calls = handler.calls
+
+    def reject(self, url, cart_id):
+        calls["bulk"] += 1
+        self._body()
+        self._send(status, body)
+
+    handler._handle_bulk = reject
+    coalescer = _coalescer(client)
+    assert _submit_concurrently(coalescer, handler.cart_id) == [None] * 4
+    assert calls == {"add_item": 4, "bulk": 1}
+    assert _items(handler) == 4
+    assert coalescer.bulk_supported is still_supported
+
+
+def test_bulk_server_error_is_not_resent(backend):
+    handler, client = backend
+    calls = handler.calls
+
+    def fail(self, url, cart_id):
+        calls["bulk"] += 1
+        self._body()
+        self._send(500, {"statusCode": 500, "message": "Internal server error"})
+
+    handler._handle_bulk = fail
+    errors = _submit_concurrently(_coalescer(client), handler.cart_id)
+    assert errors[0] is None
+    assert all(isinstance(e, requests.HTTPError) for e in errors[1:])
+    assert calls == {"add_item": 1, "bulk": 1}
+
+
+def test_bulk_timeout_is_not_resent(backend):
+    handler, client = backend
+    calls = handler.calls
+    apply_bulk = handler._handle_bulk
+
+    def slow(self, url, cart_id):
+        # Se aplica, pero la respuesta llega después del timeout del cliente
+        time.sleep(0.5)
+        return apply_bulk(self, url, cart_id)
+
+    handler._handle_bulk = slow
+    errors = _submit_concurrently(_coalescer(client, timeout=0.3), handler.cart_id)
+    assert errors[0] is None
+    assert all(isinstance(e, requests.Timeout) for e in errors[1:])
+    time.sleep(0.4)
+    assert calls == {"add_item": 1, "bulk": 1}
+    # Reenviar las operaciones habría duplicado los items
+    assert _items(handler) == 4
@@ -0,0 +1,28 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from compaction import compact_messages
+
+
+def _details_turn(question: str, product_ids, prefix: str):
+    calls = [{"name": "get_product_details", "args": {"product_id": pid}, "id": f"{prefix}{pid}"}
+             for pid in product_ids]
+    return [HumanMessage(question), AIMessage("", tool_calls=calls)] + [
+        ToolMessage("x" * 1000, tool_call_id=f"{prefix}{pid}", name="get_product_details")
+        for pid in product_ids
+    ]
+
+
+def test_current_turn_tool_results_are_never_summarized():
+    messages = _details_turn("compará los productos 1, 2 y 3", [1, 2, 3], "now")
+    compacted = compact_messages(messages, budget=100000, keep_tool_results=2)
+    assert [len(m.content) for m in compacted if isinstance(m, ToolMessage)] == [1000, 1000, 1000]
+
+
+def test_previous_turn_results_are_summarized_except_the_last():
+    messages = (_details_turn("detalles de 1, 2 y 3", [1, 2, 3], "old")
+                + [AIMessage("Listo.")]
+                + _details_turn("y del 4 y el 5", [4, 5], "now"))
+    compacted = compact_messages(messages, budget=100000, keep_tool_results=1)
+    lengths = [len(m.content) for m in compacted if isinstance(m, ToolMessage)]
+    assert all(length < 1000 for length in lengths[:2])
+    assert lengths[2:] == [1000, 1000, 1000]
@@ -0,0 +1,39 @@
+import pytest
+
+from fast_path import FastPathRouter
+from response_cache import search_cache
+from schemas import ProductSearchParams
+
+FILTERS = {"category": "Deportivo", "page": 1}
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setenv('SEARCH_NORMALIZATION', 'off')
+    monkeypatch.setenv('LOCAL_PRODUCT_INDEX', 'off')
+    search_cache.clear()
+    yield FastPathRouter(lambda: None, [], enabled=True)
+    search_cache.clear()
+
+
+def _seen_page(has_next: bool):
+    params = ProductSearchParams(**FILTERS)
+    search_cache.set(params.cache_key(), {'data': [], 'meta': {'page': 1, 'hasNextPage': has_next}})
+
+
+def test_next_page_only_when_the_last_page_had_one(router):
+    facts = {"active_filters": FILTERS}
+    _seen_page(has_next=False)
+    assert router.match("siguiente página", facts) is None
+    _seen_page(has_next=True)
+    assert router.match("siguiente página", facts) == (
+        "next_page", "search_products", dict(FILTERS, page=2))
+
+
+def test_unknown_next_page_goes_to_the_llm(router):
+    assert router.match("siguiente página", {"active_filters": FILTERS}) is None
+
+
+def test_other_messages_skip_the_state_read(router):
+    # get_graph devuelve None: si resolve() leyera el estado fallaría
+    assert router.resolve("busco zapatillas rojas", {"configurable": {"thread_id": "t"}}) is None
@@ -0,0 +1,21 @@
+import normalization
+
+
+def test_failed_vocabulary_load_is_retried(monkeypatch):
+    monkeypatch.setattr(normalization, '_normalizer', None)
+    monkeypatch.setattr(normalization, '_failed_at', None)
+    monkeypatch.setattr(normalization, 'RETRY_SECONDS', 0.0)
+    catalog = [{'id': 1, 'name': 'Pantalón', 'category': 'Deportivo', 'description': '',
+                'variants': [{'id': 1, 'color': 'Negro', 'size': 'M'}]}]
+    calls = []
+
+    def load():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("backend caído")
+        return catalog
+
+    monkeypatch.setattr(normalization, '_catalog_products', load)
+    assert normalization.get_normalizer().canonical('category', 'deportivo') is None
+    assert normalization.get_normalizer().canonical('category', 'deportivo') == 'Deportivo'
+    assert len(calls) == 2
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+from prefetch import AsyncProductPrefetcher, ProductPrefetcher
+
+SEARCH = {"data": [{"id": 1}]}
+
+
+def test_product_is_stored_before_leaving_inflight():
+    prefetcher = ProductPrefetcher(lambda product_id: {"id": product_id}, lambda _: False, enabled=True, top_k=1)
+    put, still_inflight = prefetcher.store.put, []
+
+    def spy(session_id, product_id, product, generation=None):
+        # Sin ventana en la que lookup() no lo encuentre ni en el store ni en vuelo
+        still_inflight.append(product_id in prefetcher._inflight)
+        return put(session_id, product_id, product, generation)
+
+    prefetcher.store.put = spy
+    prefetcher.schedule("s", SEARCH)
+    prefetcher._executor.shutdown(wait=True)
+    assert still_inflight == [True]
+    assert prefetcher.lookup("s", "1") == {"id": "1"}
+    report = prefetcher.report()
+    assert (report["hits"], report["misses"], report["wasted"]) == (1, 0, 0)
+
+
+def test_every_waiting_session_gets_the_product():
+    release = threading.Event()
+
+    def fetch(product_id):
+        release.wait(5)
+        return {"id": product_id}
+
+    prefetcher = ProductPrefetcher(fetch, lambda _: False, enabled=True, top_k=1)
+    for session_id in ("a", "b", "c"):
+        prefetcher.schedule(session_id, SEARCH)
+    release.set()
+    for session_id in ("a", "b", "c"):
+        assert prefetcher.lookup(session_id, "1") == {"id": "1"}
+    assert prefetcher.report()["fetched"] == 3
+
+
+def test_async_invalidation_in_flight_is_not_stored():
+    async def run():
+        release = asyncio.Event()
+
+        async def fetch(product_id):
+            await release.wait()
+            return {"id": product_id}
+
+        prefetcher = AsyncProductPrefetcher(fetch, lambda _: False, enabled=True, top_k=1)
+        prefetcher.schedule("s", SEARCH)
+        prefetcher.store.invalidate("1")
+        release.set()
+        return await prefetcher.lookup("s", "1"), prefetcher.report()
+
+    product, report = asyncio.run(run())
+    assert product is None
+    assert (report["fetched"], report["misses"]) == (0, 1)
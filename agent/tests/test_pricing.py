@@ -0,0 +1,32 @@
+import pytest
+
+from pricing import quote_cart, tier_prices, to_cents, unit_price
+
+
+def test_to_cents_rejects_missing_price():
+    with pytest.raises(ValueError):
+        to_cents(None)
+
+
+def test_missing_tier_falls_back_to_smaller_tier():
+    variant = {'price50U': '10.00', 'price100U': '9.50', 'price200U': None}
+    assert tier_prices(variant) == (950, 950, 1000)
+    assert unit_price(variant, 250) == 950
+
+
+def test_missing_base_price_is_not_quoted_as_free():
+    variant = {'price50U': None, 'price100U': '9.50', 'price200U': '9.00'}
+    with pytest.raises(ValueError):
+        unit_price(variant, 10)
+    with pytest.raises(ValueError):
+        quote_cart({'cartItems': [{'qty': 10, 'productVariant': variant}]})
+
+
+def test_quote_uses_tier_of_each_line():
+    variant = {'price50U': '10.00', 'price100U': '9.50', 'price200U': '9.00'}
+    quote = quote_cart({'cartItems': [
+        {'qty': 60, 'productVariant': variant},
+        {'qty': 200, 'productVariant': variant},
+    ]})
+    assert [line.unit_cents for line in quote.lines] == [1000, 900]
+    assert quote.total == '2400.00'
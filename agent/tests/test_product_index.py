@@ -0,0 +1,55 @@
+import copy
+import random
+
+from catalog import load_catalog_csv
+from product_index import ProductIndex, _Snapshot
+from schemas import ProductSearchParams
+
+
+def _state(snapshot: _Snapshot) -> dict:
+    return {
+        "products": snapshot.products,
+        "product_ids": snapshot.product_ids,
+        "variant_product": snapshot.variant_product,
+        "prices": sorted(zip(snapshot.prices, snapshot.price_variant_ids)),
+        **{index: getattr(snapshot, index) for index in _Snapshot.INDEXES},
+    }
+
+
+def test_updated_snapshot_matches_a_full_rebuild():
+    rng = random.Random(3)
+    products = {p['id']: p for p in load_catalog_csv()}
+    before = _Snapshot(copy.deepcopy(products))
+    frozen = copy.deepcopy(_state(before))
+
+    after = copy.deepcopy(products)
+    changed_id, removed_id = sorted(after)[:2]
+    after[changed_id]['name'] = 'Chaqueta térmica'
+    after[changed_id]['category'] = 'Invierno'
+    for variant in after[changed_id]['variants']:
+        variant['color'] = rng.choice(['Rojo', 'Morado'])
+        variant['price50U'] = '1.00'
+    del after[removed_id]
+    added = copy.deepcopy(products[removed_id])
+    added['id'] = max(products) + 1
+    for offset, variant in enumerate(added['variants']):
+        variant['id'] = 10_000 + offset
+    after[added['id']] = added
+
+    updated = before.updated({changed_id: after[changed_id], added['id']: added}, {removed_id})
+    assert _state(updated) == _state(_Snapshot(after))
+    # El snapshot anterior no se modificó (puede haber búsquedas en curso sobre él)
+    assert _state(before) == frozen
+
+
+def test_refresh_reindexes_only_changes(monkeypatch):
+    catalog = load_catalog_csv()
+    index = ProductIndex(source='csv', refresh_interval=0)
+    monkeypatch.setattr(index, '_fetch_products', lambda: copy.deepcopy(catalog))
+    assert index.refresh() == len(catalog)
+    assert index.refresh() == 0
+
+    catalog[0]['category'] = 'Invierno'
+    assert index.refresh() == 1
+    found = index.search(ProductSearchParams(category='Invierno'))
+    assert [p['id'] for p in found['data']] == [catalog[0]['id']]
@@ -0,0 +1,46 @@
+import pytest
+
+from session_manager import SessionLimitError, SessionManager
+
+
+class FakeAgent:
+    def __init__(self):
+        self.ended = []
+        self.trimmed = []
+
+    def chat(self, message, session_id):
+        return f"ok {session_id}"
+
+    def trim_history(self, session_id, max_messages):
+        self.trimmed.append((session_id, max_messages))
+
+    def end_session(self, session_id):
+        self.ended.append(session_id)
+
+
+def test_zero_disables_idle_eviction_and_trimming(monkeypatch):
+    monkeypatch.setenv('SESSION_IDLE_TIMEOUT', '1800')
+    manager = SessionManager(FakeAgent(), max_sessions=2, idle_timeout=0, max_messages=0)
+    assert (manager.idle_timeout, manager.max_messages) == (0, 0)
+    manager.chat("a", "hola")
+    manager.chat("b", "hola")
+    assert manager.evict_idle() == 0
+    with pytest.raises(SessionLimitError):
+        manager.chat("c", "hola")
+    assert manager.agent.ended == [] and manager.agent.trimmed == []
+
+
+def test_zero_max_sessions_means_no_limit():
+    manager = SessionManager(FakeAgent(), max_sessions=0, idle_timeout=60, max_messages=10)
+    for i in range(5):
+        manager.chat(str(i), "hola")
+    assert manager.stats()["active_sessions"] == 5
+    assert manager.agent.trimmed[-1] == ("4", 10)
+
+
+def test_none_uses_the_environment(monkeypatch):
+    monkeypatch.setenv('MAX_SESSIONS', '7')
+    monkeypatch.setenv('SESSION_IDLE_TIMEOUT', '12')
+    monkeypatch.setenv('SESSION_MAX_MESSAGES', '3')
+    manager = SessionManager(FakeAgent())
+    assert (manager.max_sessions, manager.idle_timeout, manager.max_messages) == (7, 12.0, 3)
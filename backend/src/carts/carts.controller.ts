@@ -2,15 +2,20 @@ import {
   Body,
   Controller,
   Get,
+  Headers,
+  HttpStatus,
   Param,
   ParseIntPipe,
   Patch,
   Post,
+  Res,
 } from '@nestjs/common';
-import { CartsService } from './carts.service';
+import { Response } from 'express';
+import { CartsService, cartVersionTag } from './carts.service';
 import { LoggerService } from '@/common/modules/logger/services/logger.service';
 import { CartEntity } from './entities';
-import { ApiOperation } from '@nestjs/swagger';
+import { ApiHeader, ApiOperation } from '@nestjs/swagger';
+import { BulkCartOperationsDto } from './dtos/bulk-cart-operations.dto';
 
 @Controller('carts')
 export class CartsController {
@@ -21,6 +26,13 @@ export class CartsController {
     private readonly logger: LoggerService,
   ) {}
 
+  /** Envía el ETag del carrito; el cliente revalida con If-None-Match */
+  private setVersionTag(res: Response, cart: CartEntity): string {
+    const etag = cartVersionTag(cart);
+    res.setHeader('ETag', etag);
+    return etag;
+  }
+
   @ApiOperation({ summary: 'Create a new cart' })
   @Post()
   async create(): Promise<CartEntity> {
@@ -69,14 +81,18 @@ export class CartsController {
   async addItem(
     @Param('id', ParseIntPipe) cartId: number,
     @Body() itemData: { product_variant_id: number; qty: number },
-  ): Promise<void> {
+    @Res({ passthrough: true }) res: Response,
+  ): Promise<CartEntity> {
     try {
       this.logger.log({
         className: this.className,
         method: 'addItem',
         payload: { cartId, itemData },
       });
-      await this.cartsService.addItem(cartId, itemData);
+      // Devuelve el carrito recargado: el cliente actualiza su copia sin otro GET
+      const cart = await this.cartsService.addItem(cartId, itemData);
+      this.setVersionTag(res, cart);
+      return cart;
     } catch (error) {
       this.logger.error({
         className: this.className,
@@ -87,12 +103,44 @@ export class CartsController {
     }
   }
 
+  @ApiOperation({
+    summary: 'Add, update or remove several cart items in one transaction',
+  })
+  @Post(':id/items/bulk')
+  async bulkUpdate(
+    @Param('id', ParseIntPipe) cartId: number,
+    @Body() bulkData: BulkCartOperationsDto,
+    @Res({ passthrough: true }) res: Response,
+  ): Promise<CartEntity> {
+    try {
+      this.logger.log({
+        className: this.className,
+        method: 'bulkUpdate',
+        payload: { cartId, bulkData },
+      });
+      const cart = await this.cartsService.bulkUpdate(
+        cartId,
+        bulkData.operations,
+      );
+      this.setVersionTag(res, cart);
+      return cart;
+    } catch (error) {
+      this.logger.error({
+        className: this.className,
+        method: 'bulkUpdate',
+        payload: error instanceof Error ? error.message : String(error),
+      });
+      throw error;
+    }
+  }
+
   @ApiOperation({ summary: 'Update item quantity in cart' })
   @Patch(':id/items/:itemId')
   async updateItem(
     @Param('id', ParseIntPipe) cartId: number,
     @Param('itemId', ParseIntPipe) itemId: number,
     @Body() updateData: { qty: number },
+    @Res({ passthrough: true }) res: Response,
   ): Promise<CartEntity> {
     try {
       this.logger.log({
@@ -100,7 +148,13 @@ export class CartsController {
         method: 'updateItem',
         payload: { cartId, itemId, updateData },
       });
-      return this.cartsService.updateItem(cartId, itemId, updateData);
+      const cart = await this.cartsService.updateItem(
+        cartId,
+        itemId,
+        updateData,
+      );
+      this.setVersionTag(res, cart);
+      return cart;
     } catch (error) {
       this.logger.error({
         className: this.className,
@@ -112,17 +166,33 @@ export class CartsController {
   }
 
   @ApiOperation({ summary: 'Get cart details' })
+  @ApiHeader({
+    name: 'If-None-Match',
+    required: false,
+    description: 'ETag from a previous response; 304 if the cart is unchanged',
+  })
   @Get(':id')
   async getCartDetails(
     @Param('id', ParseIntPipe) cartId: number,
-  ): Promise<CartEntity> {
+    @Headers('if-none-match') ifNoneMatch: string | undefined,
+    @Res({ passthrough: true }) res: Response,
+  ): Promise<CartEntity | void> {
     try {
       this.logger.log({
         className: this.className,
         method: 'getCartDetails',
-        payload: { cartId },
+        payload: { cartId, ifNoneMatch },
       });
-      return await this.cartsService.findOne(cartId);
+      // Una sola consulta: el ETag se calcula sobre el mismo carrito cargado
+      const cart = await this.cartsService.findOne(cartId);
+      const etag = this.setVersionTag(res, cart);
+      const known = (ifNoneMatch ?? '').split(',').map((tag) => tag.trim());
+      if (known.includes(etag) || known.includes('*')) {
+        // Sin cambios: no se reenvía el carrito con sus productos
+        res.status(HttpStatus.NOT_MODIFIED);
+        return;
+      }
+      return cart;
     } catch (error) {
       this.logger.error({
         className: this.className,
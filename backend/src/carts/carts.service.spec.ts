@@ -1,12 +1,58 @@
+import { NotFoundException } from '@nestjs/common';
 import { Test, TestingModule } from '@nestjs/testing';
+import { getRepositoryToken } from '@nestjs/typeorm';
+import { LoggerService } from '@/common/modules/logger/services/logger.service';
 import { CartsService } from './carts.service';
+import { CartEntity, CartItemEntity } from './entities';
+import { CartOperationType } from './dtos/bulk-cart-operations.dto';
 
 describe('CartsService', () => {
   let service: CartsService;
+  let manager: Record<string, jest.Mock>;
+  let cartRepository: {
+    findOne: jest.Mock;
+    manager: { transaction: jest.Mock };
+  };
+  // Items que existen en el carrito 1, por id
+  let items: Record<number, Partial<CartItemEntity>>;
 
   beforeEach(async () => {
+    items = { 5: { id: 5, cart_id: 1 }, 6: { id: 6, cart_id: 1 } };
+    manager = {
+      findOneBy: jest.fn((entity: unknown, where: { id: number }) =>
+        Promise.resolve(
+          entity === CartEntity
+            ? where.id === 1
+              ? { id: 1 }
+              : null
+            : (items[where.id] ?? null),
+        ),
+      ),
+      countBy: jest.fn().mockResolvedValue(1),
+      insert: jest.fn().mockResolvedValue(undefined),
+      update: jest.fn().mockResolvedValue(undefined),
+      delete: jest.fn().mockResolvedValue(undefined),
+    };
+    cartRepository = {
+      findOne: jest.fn().mockResolvedValue({ id: 1, cartItems: [] }),
+      // Un error dentro del callback hace rollback de la transacción
+      manager: {
+        transaction: jest.fn(
+          (work: (m: typeof manager) => Promise<unknown>) => work(manager),
+        ),
+      },
+    };
+
     const module: TestingModule = await Test.createTestingModule({
-      providers: [CartsService],
+      providers: [
+        CartsService,
+        {
+          provide: LoggerService,
+          useValue: { log: jest.fn(), error: jest.fn() },
+        },
+        { provide: getRepositoryToken(CartEntity), useValue: cartRepository },
+        { provide: getRepositoryToken(CartItemEntity), useValue: {} },
+      ],
     }).compile();
 
     service = module.get<CartsService>(CartsService);
@@ -15,4 +61,61 @@ describe('CartsService', () => {
   it('should be defined', () => {
     expect(service).toBeDefined();
   });
+
+  describe('bulkUpdate', () => {
+    it('applies every operation in one transaction', async () => {
+      const cart = await service.bulkUpdate(1, [
+        { op: CartOperationType.ADD, product_variant_id: 3, qty: 2 },
+        { op: CartOperationType.UPDATE, item_id: 5, qty: 4 },
+        { op: CartOperationType.REMOVE, item_id: 6 },
+      ]);
+
+      expect(cartRepository.manager.transaction).toHaveBeenCalledTimes(1);
+      expect(manager.insert).toHaveBeenCalledWith(CartItemEntity, {
+        cart_id: 1,
+        product_variant_id: 3,
+        qty: 2,
+      });
+      expect(manager.update).toHaveBeenCalledWith(
+        CartItemEntity,
+        { id: 5 },
+        { qty: 4 },
+      );
+      expect(manager.delete).toHaveBeenCalledWith(CartItemEntity, { id: 6 });
+      expect(cart).toEqual({ id: 1, cartItems: [] });
+    });
+
+    it('rejects the batch if a variant does not exist', async () => {
+      // De las dos variantes pedidas existe una sola
+      manager.countBy.mockResolvedValue(1);
+
+      await expect(
+        service.bulkUpdate(1, [
+          { op: CartOperationType.ADD, product_variant_id: 3, qty: 1 },
+          { op: CartOperationType.ADD, product_variant_id: 999, qty: 1 },
+        ]),
+      ).rejects.toBeInstanceOf(NotFoundException);
+      expect(manager.insert).not.toHaveBeenCalled();
+      expect(cartRepository.findOne).not.toHaveBeenCalled();
+    });
+
+    it('rolls back if an item is not in the cart', async () => {
+      await expect(
+        service.bulkUpdate(1, [
+          { op: CartOperationType.ADD, product_variant_id: 3, qty: 1 },
+          { op: CartOperationType.UPDATE, item_id: 77, qty: 2 },
+        ]),
+      ).rejects.toBeInstanceOf(NotFoundException);
+      // El insert previo se deshace con el rollback; no se devuelve el carrito
+      expect(manager.update).not.toHaveBeenCalled();
+      expect(cartRepository.findOne).not.toHaveBeenCalled();
+    });
+
+    it('returns 404 for an unknown cart', async () => {
+      await expect(
+        service.bulkUpdate(2, [{ op: CartOperationType.REMOVE, item_id: 5 }]),
+      ).rejects.toBeInstanceOf(NotFoundException);
+      expect(manager.delete).not.toHaveBeenCalled();
+    });
+  });
 });
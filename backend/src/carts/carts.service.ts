@@ -1,8 +1,44 @@
 import { LoggerService } from '@/common/modules/logger/services/logger.service';
 import { Injectable, NotFoundException } from '@nestjs/common';
-import { Repository } from 'typeorm';
+import { createHash } from 'crypto';
+import { In, Repository } from 'typeorm';
 import { CartEntity, CartItemEntity } from './entities';
 import { InjectRepository } from '@nestjs/typeorm';
+import { ProductVariantEntity } from '@/products/entities/product-variant.entity';
+import {
+  CartOperationDto,
+  CartOperationType,
+} from './dtos/bulk-cart-operations.dto';
+
+/**
+ * ETag del carrito calculado sobre lo que devuelve findOne: cambia cuando se
+ * agrega, edita o quita un item, se edita el carrito, o cambia el precio, el
+ * stock o la disponibilidad de alguna variante (o el producto) del carrito.
+ */
+export function cartVersionTag(cart: CartEntity): string {
+  const hash = createHash('sha1');
+  hash.update(`${cart.id}|${cart.updatedAt?.toISOString()}`);
+  const items = [...(cart.cartItems ?? [])].sort((a, b) => a.id - b.id);
+  for (const item of items) {
+    const variant = item.productVariant;
+    hash.update(
+      [
+        item.id,
+        item.qty,
+        item.updatedAt?.toISOString(),
+        variant?.id,
+        variant?.price50U,
+        variant?.price100U,
+        variant?.price200U,
+        variant?.stock,
+        variant?.isAvailable,
+        variant?.updatedAt?.toISOString(),
+        variant?.product?.updatedAt?.toISOString(),
+      ].join('|'),
+    );
+  }
+  return `W/"${cart.id}-${hash.digest('hex').slice(0, 20)}"`;
+}
 
 @Injectable()
 export class CartsService {
@@ -98,7 +134,7 @@ export class CartsService {
   async addItem(
     cartId: number,
     itemData: { product_variant_id: number; qty: number },
-  ): Promise<void> {
+  ): Promise<CartEntity> {
     try {
       this.logger.log({
         className: this.className,
@@ -114,6 +150,8 @@ export class CartsService {
         cart,
       });
       await this.cartItemRepository.save(cartItem);
+      // El carrito completo, con las variantes: es lo que cubre su ETag
+      return await this.findOne(cartId);
     } catch (error) {
       this.logger.error({
         className: this.className,
@@ -135,10 +173,7 @@ export class CartsService {
         method: 'updateItem',
         payload: { cartId, itemId, itemData },
       });
-      const cart = await this.cartRepository.findOne({
-        where: { id: cartId },
-        relations: ['cartItems'],
-      });
+      const cart = await this.cartRepository.findOneBy({ id: cartId });
       if (!cart) {
         throw new NotFoundException(`Cart with ID ${cartId} not found`);
       }
@@ -150,13 +185,9 @@ export class CartsService {
         throw new NotFoundException(`Cart item with ID ${itemId} not found`);
       }
       Object.assign(cartItem, itemData);
-      const itemUpdated = await this.cartItemRepository.save(cartItem);
-      return {
-        ...cart,
-        cartItems: cart.cartItems.map((item) =>
-          item.id === itemUpdated.id ? itemUpdated : item,
-        ),
-      };
+      await this.cartItemRepository.save(cartItem);
+      // El carrito completo, con las variantes: es lo que cubre su ETag
+      return await this.findOne(cartId);
     } catch (error) {
       this.logger.error({
         className: this.className,
@@ -166,4 +197,73 @@ export class CartsService {
       throw error;
     }
   }
+
+  async bulkUpdate(
+    cartId: number,
+    operations: CartOperationDto[],
+  ): Promise<CartEntity> {
+    try {
+      this.logger.log({
+        className: this.className,
+        method: 'bulkUpdate',
+        payload: { cartId, operations },
+      });
+      // Todas las operaciones se aplican o ninguna
+      await this.cartRepository.manager.transaction(async (manager) => {
+        const cart = await manager.findOneBy(CartEntity, { id: cartId });
+        if (!cart) {
+          throw new NotFoundException(`Cart with ID ${cartId} not found`);
+        }
+
+        const variantIds = operations
+          .filter((operation) => operation.op === CartOperationType.ADD)
+          .map((operation) => operation.product_variant_id);
+        if (variantIds.length) {
+          const found = await manager.countBy(ProductVariantEntity, {
+            id: In([...new Set(variantIds)]),
+          });
+          if (found !== new Set(variantIds).size) {
+            throw new NotFoundException(`Product variant not found`);
+          }
+        }
+
+        for (const operation of operations) {
+          if (operation.op === CartOperationType.ADD) {
+            await manager.insert(CartItemEntity, {
+              cart_id: cartId,
+              product_variant_id: operation.product_variant_id,
+              qty: operation.qty,
+            });
+            continue;
+          }
+          const cartItem = await manager.findOneBy(CartItemEntity, {
+            id: operation.item_id,
+            cart_id: cartId,
+          });
+          if (!cartItem) {
+            throw new NotFoundException(
+              `Cart item with ID ${operation.item_id} not found`,
+            );
+          }
+          if (operation.op === CartOperationType.UPDATE) {
+            await manager.update(
+              CartItemEntity,
+              { id: cartItem.id },
+              { qty: operation.qty },
+            );
+          } else {
+            await manager.delete(CartItemEntity, { id: cartItem.id });
+          }
+        }
+      });
+      return await this.findOne(cartId);
+    } catch (error) {
+      this.logger.error({
+        className: this.className,
+        method: 'bulkUpdate',
+        payload: error instanceof Error ? error.message : String(error),
+      });
+      throw error;
+    }
+  }
 }
@@ -0,0 +1,41 @@
+import { plainToInstance } from 'class-transformer';
+import { validate } from 'class-validator';
+import { BulkCartOperationsDto } from './bulk-cart-operations.dto';
+
+async function errorsFor(body: unknown) {
+  return validate(plainToInstance(BulkCartOperationsDto, body));
+}
+
+describe('BulkCartOperationsDto', () => {
+  it('accepts add, update and remove with their required fields', async () => {
+    const errors = await errorsFor({
+      operations: [
+        { op: 'add', product_variant_id: 3, qty: 2 },
+        { op: 'update', item_id: 5, qty: 1 },
+        { op: 'remove', item_id: 6 },
+      ],
+    });
+    expect(errors).toHaveLength(0);
+  });
+
+  it.each([
+    ['add without product_variant_id', { op: 'add', qty: 1 }],
+    ['update without item_id', { op: 'update', qty: 1 }],
+    ['remove without item_id', { op: 'remove' }],
+    ['qty below 1', { op: 'add', product_variant_id: 3, qty: 0 }],
+    ['update without qty', { op: 'update', item_id: 5 }],
+    ['unknown op', { op: 'replace', item_id: 5, qty: 1 }],
+  ])('rejects %s', async (_, operation) => {
+    const errors = await errorsFor({ operations: [operation] });
+    expect(errors).not.toHaveLength(0);
+  });
+
+  it('rejects an empty batch and one over 100 operations', async () => {
+    expect(await errorsFor({ operations: [] })).not.toHaveLength(0);
+    const operations = Array.from({ length: 101 }, () => ({
+      op: 'remove',
+      item_id: 1,
+    }));
+    expect(await errorsFor({ operations })).not.toHaveLength(0);
+  });
+});
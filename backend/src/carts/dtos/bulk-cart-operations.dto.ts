@@ -0,0 +1,51 @@
+import { ApiProperty, ApiPropertyOptional } from '@nestjs/swagger';
+import { Type } from 'class-transformer';
+import {
+  ArrayMaxSize,
+  ArrayMinSize,
+  IsEnum,
+  IsInt,
+  Min,
+  ValidateIf,
+  ValidateNested,
+} from 'class-validator';
+
+export enum CartOperationType {
+  ADD = 'add',
+  UPDATE = 'update',
+  REMOVE = 'remove',
+}
+
+export class CartOperationDto {
+  @ApiProperty({ enum: CartOperationType })
+  @IsEnum(CartOperationType)
+  readonly op: CartOperationType;
+
+  @ApiPropertyOptional({ description: 'Required for add' })
+  @ValidateIf((o: CartOperationDto) => o.op === CartOperationType.ADD)
+  @Type(() => Number)
+  @IsInt()
+  readonly product_variant_id?: number;
+
+  @ApiPropertyOptional({ description: 'Required for update and remove' })
+  @ValidateIf((o: CartOperationDto) => o.op !== CartOperationType.ADD)
+  @Type(() => Number)
+  @IsInt()
+  readonly item_id?: number;
+
+  @ApiPropertyOptional({ minimum: 1, description: 'Required for add and update' })
+  @ValidateIf((o: CartOperationDto) => o.op !== CartOperationType.REMOVE)
+  @Type(() => Number)
+  @IsInt()
+  @Min(1)
+  readonly qty?: number;
+}
+
+export class BulkCartOperationsDto {
+  @ApiProperty({ type: [CartOperationDto] })
+  @ValidateNested({ each: true })
+  @ArrayMinSize(1)
+  @ArrayMaxSize(100)
+  @Type(() => CartOperationDto)
+  readonly operations: CartOperationDto[];
+}
@@ -1,4 +1,4 @@
-import { ApiProperty } from '@nestjs/swagger';
+import { ApiProperty, ApiPropertyOptional } from '@nestjs/swagger';
 import { PaginationMetaDtoParams } from '../interfaces/pagination-meta-dto-params.interface';
 
 export class PaginationMetaDto {
@@ -20,7 +20,16 @@ export class PaginationMetaDto {
   @ApiProperty()
   readonly hasNextPage: boolean;
 
-  constructor({ paginationOptions, itemCount }: PaginationMetaDtoParams) {
+  @ApiPropertyOptional({
+    description: 'Cursor for the next page, if the endpoint supports it',
+  })
+  readonly nextCursor?: string;
+
+  constructor({
+    paginationOptions,
+    itemCount,
+    nextCursor,
+  }: PaginationMetaDtoParams) {
     const { page, take } = paginationOptions;
     this.page = page;
     this.take = take;
@@ -28,5 +37,6 @@ export class PaginationMetaDto {
     this.pageCount = Math.ceil(this.itemCount / this.take);
     this.hasPreviousPage = this.page > 1;
     this.hasNextPage = this.page < this.pageCount;
+    this.nextCursor = nextCursor;
   }
 }
@@ -1,6 +1,13 @@
 import { ApiPropertyOptional } from '@nestjs/swagger';
 import { Type } from 'class-transformer';
-import { IsEnum, IsInt, IsOptional, Max, Min } from 'class-validator';
+import {
+  IsEnum,
+  IsInt,
+  IsOptional,
+  IsString,
+  Max,
+  Min,
+} from 'class-validator';
 
 import { Order } from '../consts/order.const';
 
@@ -32,6 +39,14 @@ export class PaginationOptionsDto {
   @IsOptional()
   readonly take?: number = 10;
 
+  @ApiPropertyOptional({
+    description: 'meta.nextCursor of the previous page; takes precedence over page',
+  })
+  @Type(() => String)
+  @IsString()
+  @IsOptional()
+  readonly cursor?: string;
+
   constructor(params?: PaginationOptionsDto) {
     Object.assign(this, params);
   }
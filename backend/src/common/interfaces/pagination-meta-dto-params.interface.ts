@@ -3,4 +3,5 @@ import { PaginationOptionsDto } from '../dtos/pagination-options.dto';
 export interface PaginationMetaDtoParams {
   paginationOptions: PaginationOptionsDto;
   itemCount: number;
+  nextCursor?: string;
 }
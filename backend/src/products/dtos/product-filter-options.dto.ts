@@ -1,6 +1,6 @@
 import { ApiPropertyOptional } from '@nestjs/swagger';
 import { Type } from 'class-transformer';
-import { IsOptional, IsString } from 'class-validator';
+import { IsNumber, IsOptional, IsString, Min } from 'class-validator';
 
 export class ProductFilterOptionsDto {
   @ApiPropertyOptional()
@@ -9,19 +9,28 @@ export class ProductFilterOptionsDto {
   @IsString()
   readonly keyword?: string;
 
-  @ApiPropertyOptional()
+  @ApiPropertyOptional({
+    description: 'Exact catalog value (case-sensitive)',
+    example: 'Deportivo',
+  })
   @Type(() => String)
   @IsOptional()
   @IsString()
   readonly category?: string;
 
-  @ApiPropertyOptional()
+  @ApiPropertyOptional({
+    description: 'Exact catalog value (case-sensitive)',
+    example: 'XXL',
+  })
   @Type(() => String)
   @IsOptional()
   @IsString()
   readonly size?: string;
 
-  @ApiPropertyOptional()
+  @ApiPropertyOptional({
+    description: 'Exact catalog value (case-sensitive)',
+    example: 'Verde',
+  })
   @Type(() => String)
   @IsOptional()
   @IsString()
@@ -33,6 +42,20 @@ export class ProductFilterOptionsDto {
   @IsString()
   readonly name?: string;
 
+  @ApiPropertyOptional({ minimum: 0, description: 'Minimum variant price50U' })
+  @Type(() => Number)
+  @IsOptional()
+  @IsNumber()
+  @Min(0)
+  readonly minPrice?: number;
+
+  @ApiPropertyOptional({ minimum: 0, description: 'Maximum variant price50U' })
+  @Type(() => Number)
+  @IsOptional()
+  @IsNumber()
+  @Min(0)
+  readonly maxPrice?: number;
+
   constructor(params: ProductFilterOptionsDto) {
     Object.assign(this, params);
   }
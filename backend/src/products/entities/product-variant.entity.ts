@@ -6,10 +6,14 @@ import {
   CreateDateColumn,
   UpdateDateColumn,
   JoinColumn,
+  Index,
 } from 'typeorm';
 import { ProductEntity } from './product.entity';
 
 @Entity('product_variants')
+// Filtros de /products/search: color y talla exactos, rango de precio
+@Index(['color', 'size', 'price50U'])
+@Index(['product'])
 export class ProductVariantEntity {
   @PrimaryGeneratedColumn()
   id: number;
@@ -5,10 +5,13 @@ import {
   OneToMany,
   CreateDateColumn,
   UpdateDateColumn,
+  Index,
 } from 'typeorm';
 import { ProductVariantEntity } from './product-variant.entity';
 
 @Entity('products')
+// Orden y cursor de la paginación por keyset
+@Index(['createdAt', 'id'])
 export class ProductEntity {
   @PrimaryGeneratedColumn()
   id: number;
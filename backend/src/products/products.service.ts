@@ -1,14 +1,27 @@
 import { LoggerService } from '@/common/modules/logger/services/logger.service';
-import { Injectable, NotFoundException } from '@nestjs/common';
+import {
+  BadRequestException,
+  Injectable,
+  NotFoundException,
+} from '@nestjs/common';
 import { InjectRepository } from '@nestjs/typeorm';
 import { ProductEntity, ProductVariantEntity } from './entities';
-import { Repository } from 'typeorm';
+import { ObjectLiteral, Repository, SelectQueryBuilder } from 'typeorm';
 import { PaginationOptionsDto } from '@/common/dtos/pagination-options.dto';
 import { PaginationResponseDto } from '@/common/dtos/pagination-response.dto';
 import { ProductResponseDto } from './dtos/product-response.dto';
 import { PaginationMetaDto } from '@/common/dtos/pagination-meta.dto';
 import { ProductFilterOptionsDto } from './dtos/product-filter-options.dto';
 import { ProductQueryParamsDto } from './dtos/product-query-params.dto';
+import { Order } from '@/common/consts/order.const';
+
+/** Último producto de una página (keyset) y el total contado en la primera */
+interface SearchCursor {
+  createdAt: string;
+  id: number;
+  page: number;
+  itemCount: number;
+}
 
 @Injectable()
 export class ProductsService {
@@ -31,58 +44,81 @@ export class ProductsService {
         method: 'search',
         payload: queryParams,
       });
-      const { order, take, page, ...others } = queryParams;
-      const paginationOptions = new PaginationOptionsDto({ order, page, take });
+      const { order, take, page, cursor, ...others } = queryParams;
       const filters = new ProductFilterOptionsDto(others);
+      const position = cursor ? this.decodeCursor(cursor) : undefined;
+      const currentPage = position ? position.page : page;
+      const variantFilter = this.variantFilter(filters);
 
-      const skip = (page - 1) * take;
-
-      const queryBuilder = this.productRepository.createQueryBuilder('product');
-
-      queryBuilder
-        .leftJoinAndSelect('product.variants', 'variant')
-        .skip(skip)
-        .take(take)
-        .orderBy('product.createdAt', order);
-
-      if (filters.keyword) {
-        queryBuilder.andWhere(
-          '(product.name LIKE :keyword OR product.description LIKE :keyword OR product.category LIKE :keyword)',
-          {
-            keyword: `%${filters.keyword}%`,
-          },
+      // 1) Ids de la página sin join: los filtros de variantes van en un EXISTS
+      const idsQuery = this.productRepository
+        .createQueryBuilder('product')
+        .select('product.id', 'id')
+        .addSelect('CAST(product.createdAt AS text)', 'createdAt');
+      this.applyProductFilters(idsQuery, filters);
+      if (variantFilter) {
+        idsQuery.andWhere(
+          `EXISTS (SELECT 1 FROM product_variants variant WHERE variant.product_id = product.id AND ${variantFilter.condition})`,
+          variantFilter.parameters,
         );
       }
 
-      if (filters.category) {
-        queryBuilder.andWhere('product.category = :category', {
-          category: filters.category.toLowerCase(),
-        });
-      }
-
-      if (filters.size) {
-        queryBuilder.andWhere('variant.size = :size', {
-          size: filters.size.toLowerCase(),
-        });
-      }
+      // El total se cuenta en la primera página y viaja dentro del cursor
+      const itemCount = position
+        ? position.itemCount
+        : await idsQuery.getCount();
 
-      if (filters.color) {
-        queryBuilder.andWhere('variant.color = :color', {
-          color: filters.color.toLowerCase(),
-        });
+      if (position) {
+        idsQuery.andWhere(
+          `(product.createdAt, product.id) ${order === Order.DESC ? '<' : '>'} (CAST(:cursorCreatedAt AS timestamp), :cursorId)`,
+          { cursorCreatedAt: position.createdAt, cursorId: position.id },
+        );
+      } else {
+        idsQuery.offset((page - 1) * take);
       }
+      const rows = await idsQuery
+        .orderBy('product.createdAt', order)
+        .addOrderBy('product.id', order)
+        .limit(take + 1)
+        .getRawMany<{ id: number; createdAt: string }>();
+      const pageRows = rows.slice(0, take);
 
-      if (filters.name) {
-        queryBuilder.andWhere('product.name LIKE :name', {
-          name: `%${filters.name.toLowerCase()}%`,
-        });
+      // 2) Productos de la página con sus variantes (solo las que coinciden)
+      let entities: ProductEntity[] = [];
+      if (pageRows.length) {
+        entities = await this.productRepository
+          .createQueryBuilder('product')
+          .leftJoinAndSelect(
+            'product.variants',
+            'variant',
+            variantFilter?.condition,
+            variantFilter?.parameters,
+          )
+          .whereInIds(pageRows.map((row) => row.id))
+          .orderBy('product.createdAt', order)
+          .addOrderBy('product.id', order)
+          .getMany();
       }
 
-      const [entities, itemCount] = await queryBuilder.getManyAndCount();
+      const last = pageRows[pageRows.length - 1];
+      const nextCursor =
+        rows.length > take
+          ? this.encodeCursor({
+              createdAt: last.createdAt,
+              id: Number(last.id),
+              page: currentPage + 1,
+              itemCount,
+            })
+          : undefined;
 
       const paginationMeta = new PaginationMetaDto({
-        paginationOptions,
+        paginationOptions: new PaginationOptionsDto({
+          order,
+          page: currentPage,
+          take,
+        }),
         itemCount,
+        nextCursor,
       });
       const paginatedResponse = new PaginationResponseDto<ProductResponseDto>(
         entities,
@@ -99,6 +135,94 @@ export class ProductsService {
     }
   }
 
+  private applyProductFilters(
+    queryBuilder: SelectQueryBuilder<ProductEntity>,
+    filters: ProductFilterOptionsDto,
+  ): void {
+    if (filters.keyword) {
+      queryBuilder.andWhere(
+        '(product.name ILIKE :keyword OR product.description ILIKE :keyword OR product.category ILIKE :keyword)',
+        {
+          keyword: `%${filters.keyword}%`,
+        },
+      );
+    }
+
+    // category, size y color se comparan exactos contra el valor canónico del
+    // catálogo ('Deportivo', 'XXL', 'Verde'), así usan los índices; el agente
+    // ya normaliza lo que escribe el usuario antes de buscar
+    if (filters.category) {
+      queryBuilder.andWhere('product.category = :category', {
+        category: filters.category,
+      });
+    }
+
+    if (filters.name) {
+      queryBuilder.andWhere('product.name ILIKE :name', {
+        name: `%${filters.name}%`,
+      });
+    }
+  }
+
+  /**
+   * Condición sobre el alias `variant` con nombres de columna, así sirve
+   * tanto en el EXISTS de los ids como en el join de las variantes.
+   */
+  private variantFilter(
+    filters: ProductFilterOptionsDto,
+  ): { condition: string; parameters: ObjectLiteral } | undefined {
+    const conditions: string[] = [];
+    const parameters: ObjectLiteral = {};
+
+    if (filters.size) {
+      conditions.push('variant.size = :size');
+      parameters.size = filters.size;
+    }
+
+    if (filters.color) {
+      conditions.push('variant.color = :color');
+      parameters.color = filters.color;
+    }
+
+    if (filters.minPrice !== undefined) {
+      conditions.push('variant.price_50_u >= :minPrice');
+      parameters.minPrice = filters.minPrice;
+    }
+
+    if (filters.maxPrice !== undefined) {
+      conditions.push('variant.price_50_u <= :maxPrice');
+      parameters.maxPrice = filters.maxPrice;
+    }
+
+    if (!conditions.length) {
+      return undefined;
+    }
+    return { condition: conditions.join(' AND '), parameters };
+  }
+
+  private encodeCursor(position: SearchCursor): string {
+    return Buffer.from(JSON.stringify(position)).toString('base64url');
+  }
+
+  private decodeCursor(cursor: string): SearchCursor {
+    try {
+      const position = JSON.parse(
+        Buffer.from(cursor, 'base64url').toString('utf8'),
+      ) as SearchCursor;
+      if (
+        typeof position.createdAt !== 'string' ||
+        !Number.isInteger(position.id) ||
+        !Number.isInteger(position.page) ||
+        !Number.isInteger(position.itemCount)
+      ) {
+        throw new Error('Malformed cursor');
+      }
+      return position;
+    } catch {
+      throw new BadRequestException('Invalid cursor');
+    }
+  }
+
   async findOne(id: string): Promise<ProductResponseDto> {
     try {
       this.logger.log({